@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Import time budget of the GTK-free core
+# python3 benchmarks/check_importtime.py [budget in ms]
+# Exits with 1 when core imports GTK, psutil or distro or is over budget
+
+import os
+import subprocess
+import sys
+
+app_dir = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "usr", "share", "arcolinux-app-glade"
+)
+
+module = "core"
+budget_ms = 150
+runs = 5
+forbidden = ["gi", "psutil", "distro"]
+
+
+def measure():
+    # (cumulative ms of the module, every module imported on the way)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=app_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    cumulative = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line.split("|")
+        name = fields[2].strip()
+        if not fields[1].strip().isdigit():
+            continue
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(fields[1]) / 1000
+    return cumulative, imported
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else budget_ms
+    # the first run compiles the .pyc files - it does not count
+    measure()
+    timings = []
+    for _ in range(runs):
+        cumulative, imported = measure()
+        timings.append(cumulative)
+
+    failed = False
+    for name in forbidden:
+        if name in imported:
+            print("{} imports {}".format(module, name))
+            failed = True
+
+    best = min(timings)
+    print("import {}: best {:.1f} ms of {} runs - budget {:.0f} ms".format(
+        module, best, runs, budget
+    ))
+    if best > budget:
+        print("{} is over its import time budget".format(module))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+#!/bin/bash
+set -e
+##################################################################################################################
+# Author    : Erik Dubois
+# Website   : https://www.arcolinuxiso.com
+##################################################################################################################
+#
+#   Compile the ui files and the images into arcolinux-app-glade.gresource
+#   Run it after changing gGui.ui, about.ui or one of the images in the manifest
+#
+##################################################################################################################
+
+workdir=$(dirname "$(realpath "$0")")
+appdir=$workdir/usr/share/arcolinux-app-glade
+
+glib-compile-resources \
+	--sourcedir="$appdir" \
+	--target="$appdir/arcolinux-app-glade.gresource" \
+	"$appdir/arcolinux-app-glade.gresource.xml"
+
+echo "Compiled $appdir/arcolinux-app-glade.gresource"
@@ -0,0 +1,27 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# the modules of the app are not a package - they import each other by name
+import os
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "usr", "share", "arcolinux-app-glade"
+    ),
+)
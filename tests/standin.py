@@ -0,0 +1,144 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# A stand-in for an Arch Linux mirror - serves files from a dict on 127.0.0.1
+
+import asyncio
+import threading
+
+MODIFIED = "Mon, 02 Jan 2023 10:00:00 GMT"
+
+
+class Upstream:
+    """
+    files maps a path like /core/os/x86_64/core.db to its bytes - any other
+    path is a 404. requests lists (method, path) of what was asked.
+    delay is waited before the answer, pause between the two halves of a
+    body. A path in short gets half its body and a closed connection.
+    """
+
+    def __init__(self, files=None, delay=0.0, pause=0.0, short=()):
+        self.files = dict(files or {})
+        self.delay = delay
+        self.pause = pause
+        self.short = set(short)
+        self.requests = []
+        self.server = None
+        self.port = None
+
+    @property
+    def url(self):
+        # a mirrorlist server line
+        return "http://127.0.0.1:{}/$repo/os/$arch".format(self.port)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            self.requests.append((method, path))
+            await asyncio.sleep(self.delay)
+            body = self.files.get(path)
+            if body is None:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                return
+            writer.write(
+                "HTTP/1.1 200 OK\r\nContent-Length: {}\r\nLast-Modified: {}\r\n\r\n".format(
+                    len(body), MODIFIED
+                ).encode("latin-1")
+            )
+            if method == "HEAD":
+                return
+            half = len(body) // 2
+            writer.write(body[:half])
+            await writer.drain()
+            await asyncio.sleep(self.pause)
+            if path in self.short:
+                return
+            writer.write(body[half:])
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def get(port, path, headers=()):
+    # a plain GET to 127.0.0.1:port - (status, headers, body)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = ["GET {} HTTP/1.1".format(path), "Host: 127.0.0.1"]
+    lines.extend("{}: {}".format(key, value) for key, value in headers)
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    answer = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        answer[key.strip().lower()] = value.strip()
+    body = await reader.read()
+    writer.close()
+    return status, answer, body
+
+
+class Background:
+    """
+    Runs stand-ins on an event loop of their own thread - for code that
+    calls asyncio.run itself. Use as a context manager.
+    """
+
+    def __init__(self, *upstreams):
+        self.upstreams = upstreams
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(10)
+
+    async def _cancel(self):
+        # handlers still waiting out a delay
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __enter__(self):
+        self.thread.start()
+        for upstream in self.upstreams:
+            self._call(upstream.start())
+        return self.upstreams
+
+    def __exit__(self, *error):
+        for upstream in self.upstreams:
+            self._call(upstream.stop())
+        self._call(self._cancel())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
@@ -0,0 +1,100 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+import os
+
+import pytest
+
+import artifacts
+
+
+def tree(top):
+    (top / "sub").mkdir(parents=True)
+    (top / "a.iso").write_bytes(b"a" * 5000)
+    (top / "sub" / "b.txt").write_bytes(b"b" * 10)
+    os.symlink("a.iso", str(top / "link"))
+
+
+def listing(top):
+    found = {}
+    for folder, dirs, files in os.walk(str(top)):
+        for name in files:
+            path = os.path.join(folder, name)
+            found[os.path.relpath(path, str(top))] = (
+                os.readlink(path) if os.path.islink(path) else open(path, "rb").read()
+            )
+    return found
+
+
+def test_relocate_renames_on_the_same_filesystem(tmp_path):
+    tree(tmp_path / "out")
+    expected = listing(tmp_path / "out")
+    stats = artifacts.relocate(str(tmp_path / "out"), str(tmp_path / "home" / "iso"))
+    assert not (tmp_path / "out").exists()
+    assert listing(tmp_path / "home" / "iso") == expected
+    assert stats.methods[artifacts.RENAMED] == stats.files == 3
+
+
+def test_relocate_merges_into_an_existing_folder(tmp_path):
+    tree(tmp_path / "out")
+    expected = listing(tmp_path / "out")
+    (tmp_path / "home" / "sub").mkdir(parents=True)
+    (tmp_path / "home" / "old.iso").write_bytes(b"old")
+    artifacts.relocate(str(tmp_path / "out"), str(tmp_path / "home"))
+    expected["old.iso"] = b"old"
+    assert listing(tmp_path / "home") == expected
+    assert not (tmp_path / "out").exists()
+
+
+def test_copy_keeps_mode_and_removes_the_source(tmp_path):
+    source = tmp_path / "a.iso"
+    source.write_bytes(os.urandom(100000))
+    os.chmod(str(source), 0o640)
+    body = source.read_bytes()
+    stats = artifacts.Stats()
+    artifacts._copy_file(str(source), str(tmp_path / "b.iso"), None, None, stats)
+    assert (tmp_path / "b.iso").read_bytes() == body
+    assert os.stat(str(tmp_path / "b.iso")).st_mode & 0o777 == 0o640
+    assert not source.exists() and stats.bytes == len(body)
+
+
+def test_failed_copy_leaves_no_part_file(tmp_path, monkeypatch):
+    def broken(src_fd, dst_fd, size):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(artifacts, "_clone", broken)
+    source = tmp_path / "a.iso"
+    source.write_bytes(b"a" * 5000)
+    with pytest.raises(OSError):
+        artifacts._copy_file(str(source), str(tmp_path / "b.iso"), None, None, artifacts.Stats())
+    assert sorted(os.listdir(str(tmp_path))) == ["a.iso"]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_chown_tree_counts_and_skips(tmp_path, workers):
+    tree(tmp_path / "out")
+    uid, gid = os.getuid(), os.getgid()
+    changed, skipped, files, size = artifacts.chown_tree(str(tmp_path / "out"), uid, gid, workers)
+    # the top, a folder, two files and a link
+    assert (changed, skipped, files) == (0, 5, 3)
+    assert size == 5000 + 10 + len("a.iso")
+    if uid == 0:
+        changed, skipped, files, size = artifacts.chown_tree(
+            str(tmp_path / "out"), 1234, 1234, workers
+        )
+        assert (changed, skipped) == (5, 0)
+        assert os.lstat(str(tmp_path / "out" / "link")).st_uid == 1234
@@ -0,0 +1,108 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+import buildqueue
+import builds
+
+
+def flavor(name, workdir, output, checkout=None, clean=(), work=None):
+    return builds.Flavor(
+        name,
+        name,
+        ["true"],
+        workdir,
+        output,
+        name + ".iso",
+        checkout=checkout,
+        clean=clean,
+        work=work,
+    )
+
+
+def test_shipped_flavors_do_not_conflict():
+    names = list(builds.flavors)
+    for one in names:
+        for other in names:
+            if one != other:
+                assert not buildqueue.conflicts(builds.flavors[one], builds.flavors[other])
+
+
+def test_workdir_alone_is_no_conflict():
+    # archlinux runs in /root, next to the output folders of the others
+    first = flavor("first", "/root", "/root/first-Out", checkout="/tmp/first")
+    second = flavor("second", "/tmp/second", "/root/second-Out", checkout="/tmp/second")
+    assert not buildqueue.conflicts(first, second)
+
+
+def test_shared_and_nested_folders_conflict():
+    first = flavor("first", "/tmp/first", "/tmp/archlive/out", clean=["/tmp/archlive"])
+    second = flavor("second", "/tmp/second", "/tmp/archlive/", checkout="/tmp/second")
+    assert buildqueue.conflicts(first, second)
+    third = flavor("third", "/tmp/third", "/tmp/archlive-other")
+    assert not buildqueue.conflicts(first, third)
+
+
+def test_queue_runs_again_after_the_scheduler_finished(monkeypatch):
+    monkeypatch.setattr(buildqueue, "poll_seconds", 0.05)
+    built = []
+    queue = buildqueue.BuildQueue(
+        lambda flavor: built.append(flavor.name), max_parallel=1, dispatch=lambda f, *a: f(*a)
+    )
+    try:
+        assert queue.add(["arconet"]) == ["arconet"]
+        scheduler = queue.thread
+        queue.wait()
+        scheduler.join(5)
+        assert queue.thread is None
+        queue.add(["arconet"])
+        queue.wait()
+        assert built == ["arconet", "arconet"]
+    finally:
+        queue.stop()
+
+
+def fits_queue(monkeypatch, memory, disk):
+    monkeypatch.setattr(buildqueue, "available_memory", lambda: memory)
+    monkeypatch.setattr(buildqueue, "free_disk", lambda path: disk)
+    return buildqueue.BuildQueue(lambda flavor: None, max_parallel=3, dispatch=lambda f, *a: f(*a))
+
+
+def test_first_build_always_fits(monkeypatch):
+    queue = fits_queue(monkeypatch, 0, 0)
+    assert queue._fits("arconet", 0.0)
+
+
+def test_ramping_builds_keep_memory_aside(monkeypatch):
+    queue = fits_queue(monkeypatch, 7 << 30, 1 << 40)
+    queue.running = {"arconet": 1000.0}
+    # arconet still ramps up - 7 GiB free is not enough for two
+    assert not queue._fits("arcopro", 1000.0 + 10)
+    # it has taken its memory - what is free now is for the next one
+    assert queue._fits("arcopro", 1000.0 + buildqueue.ramp_up_seconds)
+
+
+def test_ramping_builds_keep_disk_aside(monkeypatch):
+    queue = fits_queue(monkeypatch, 1 << 40, 30 << 30)
+    queue.running = {"arconet": 1000.0}
+    assert not queue._fits("arcopro", 1000.0 + 10)
+    assert queue._fits("arcopro", 1000.0 + buildqueue.ramp_up_seconds)
+
+
+def test_max_parallel(monkeypatch):
+    queue = fits_queue(monkeypatch, 1 << 40, 1 << 40)
+    queue.running = {"arconet": 0.0, "arcopro": 0.0, "arcoplasma": 0.0}
+    assert not queue._fits("ariser", 1000.0)
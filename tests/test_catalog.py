@@ -0,0 +1,85 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import hashlib
+from contextlib import closing
+
+import catalog
+
+
+def test_migrations_run_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "db" / "catalog.db")
+    with closing(catalog.connect(path)) as connection:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+    assert version == len(catalog.MIGRATIONS)
+    catalog.add_build("arconet", catalog.DONE, 100.0, 200.0, path=path)
+    # a later version adds a column - the rows that are there stay
+    migrations = catalog.MIGRATIONS + ["ALTER TABLE builds ADD COLUMN host TEXT;"]
+    monkeypatch.setattr(catalog, "MIGRATIONS", migrations)
+    for _ in range(2):
+        with closing(catalog.connect(path)) as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            rows = [tuple(row) for row in connection.execute("SELECT flavor, host FROM builds")]
+        assert version == len(migrations)
+        assert rows == [("arconet", None)]
+
+
+def test_builds_and_their_isos(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    iso = tmp_path / "arconet.iso"
+    iso.write_bytes(b"iso")
+    digest = hashlib.sha256(b"iso").hexdigest()
+    first = catalog.add_build(
+        "arconet",
+        catalog.DONE,
+        100.0,
+        160.0,
+        phases={"build": 50.0},
+        artifacts=[str(iso)],
+        path=path,
+    )
+    catalog.add_build("arconet", catalog.FAILED, 200.0, 210.0, error="no space", path=path)
+    catalog.add_build("arcopro", catalog.DONE, 300.0, 400.0, path=path)
+
+    flavors = [row["flavor"] for row in catalog.history(path=path)]
+    assert flavors == ["arcopro", "arconet", "arconet"]
+    done = catalog.history("arconet", catalog.DONE, path=path)
+    assert len(done) == 1 and done[0]["artifacts"] == 1 and done[0]["size"] == 3
+    assert done[0]["seconds"] == 60.0
+    assert catalog.latest("arconet", path=path)["id"] == first
+    assert catalog.latest("arconet", catalog.FAILED, path=path)["error"] == "no space"
+    assert catalog.latest("sierra", path=path) is None
+    assert catalog.latest_iso("arconet", path=path)["sha256"] == digest
+    assert [row["flavor"] for row in catalog.find_artifact(digest, path=path)] == ["arconet"]
+    iso.unlink()
+    assert catalog.latest_iso("arconet", path=path) is None
+
+
+def test_known_sha256_is_not_hashed_again(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    iso = tmp_path / "arconet.iso"
+    iso.write_bytes(b"iso")
+    build = catalog.add_build(
+        "arconet",
+        catalog.DONE,
+        100.0,
+        artifacts=[str(iso)],
+        sha256={str(iso): "ab" * 32},
+        path=path,
+    )
+    assert [row["sha256"] for row in catalog.artifacts(build, path=path)] == ["ab" * 32]
@@ -0,0 +1,91 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import hashlib
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import checksums
+
+
+@pytest.fixture
+def isos(tmp_path):
+    paths = []
+    for name, size in (("arconet.iso", 3 << 20), ("arcopro.iso", 100)):
+        (tmp_path / name).write_bytes(os.urandom(size))
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+def test_sidecars_match_hashlib(isos, monkeypatch):
+    monkeypatch.setattr(checksums, "buffer_size", 1 << 20)
+    sums = checksums.write_sidecars(isos)
+    for path in isos:
+        body = open(path, "rb").read()
+        assert sums[path] == {
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "b2": hashlib.blake2b(body).hexdigest(),
+        }
+        assert checksums.read_sidecar(path + ".sha256") == [
+            (sums[path]["sha256"], os.path.basename(path))
+        ]
+
+
+@pytest.mark.skipif(shutil.which("sha256sum") is None, reason="no coreutils")
+def test_sha256sum_reads_the_sidecars(isos, tmp_path):
+    checksums.write_sidecars(isos)
+    for path in isos:
+        subprocess.run(["sha256sum", "-c", path + ".sha256"], cwd=str(tmp_path), check=True)
+
+
+def test_verify_reads_every_file_once(isos, monkeypatch):
+    checksums.write_sidecars(isos)
+    read = []
+    hash_file = checksums.hash_file
+    monkeypatch.setattr(
+        checksums, "hash_file", lambda path, names: read.append(path) or hash_file(path, names)
+    )
+    checks = checksums.verify([os.path.dirname(isos[0])])
+    assert sorted(read) == sorted(isos)
+    assert len(checks) == 4 and {check.state for check in checks} == {"ok"}
+
+
+def test_verify_finds_changed_and_missing_files(isos):
+    checksums.write_sidecars(isos)
+    with open(isos[0], "r+b") as f:
+        f.write(b"x")
+    os.unlink(isos[1])
+    states = {
+        (os.path.basename(check.path), check.algorithm): check.state
+        for check in checksums.verify([os.path.dirname(isos[0])])
+    }
+    assert states == {
+        ("arconet.iso", "sha256"): "mismatch",
+        ("arconet.iso", "b2"): "mismatch",
+        ("arcopro.iso", "sha256"): "missing",
+        ("arcopro.iso", "b2"): "missing",
+    }
+
+
+def test_read_sidecar_binary_mode(tmp_path):
+    sidecar = tmp_path / "a.iso.sha256"
+    sidecar.write_text("AB" * 32 + " *a.iso\n\nbroken\n")
+    assert checksums.read_sidecar(str(sidecar)) == [("ab" * 32, "a.iso")]
@@ -0,0 +1,64 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import os
+
+import pytest
+
+import core
+
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    db = tmp_path / "local"
+    db.mkdir()
+    (db / "ALPM_DB_VERSION").write_text("9\n")
+    for name in ("pacman-6.0.2-8", "lib32-gcc-libs-13.2.1-3", "arcolinux-keyring-20251209-3"):
+        (db / name).mkdir()
+    monkeypatch.setattr(core, "pacman_local_db", str(db))
+    monkeypatch.setattr(core, "_package_index", {})
+    monkeypatch.setattr(core, "_package_index_mtime", None)
+    return db
+
+
+def test_index_of_the_local_db(local_db):
+    assert core.get_installed_packages() == {
+        "pacman": "6.0.2-8",
+        "lib32-gcc-libs": "13.2.1-3",
+        "arcolinux-keyring": "20251209-3",
+    }
+    assert core.check_package_installed("lib32-gcc-libs")
+    assert not core.check_package_installed("lib32-gcc")
+
+
+def test_index_is_read_again_when_pacman_changed_the_db(local_db, monkeypatch):
+    reads = []
+    read = core._read_local_db
+    monkeypatch.setattr(
+        core, "_read_local_db", lambda directory: reads.append(1) or read(directory)
+    )
+    core.get_installed_packages()
+    core.get_installed_packages()
+    assert len(reads) == 1
+
+    (local_db / "pacman-6.0.2-8").rmdir()
+    (local_db / "pacman-6.1.0-1").mkdir()
+    info = os.stat(str(local_db))
+    os.utime(str(local_db), ns=(info.st_atime_ns, info.st_mtime_ns + 1000))
+    assert core.get_installed_packages()["pacman"] == "6.1.0-1"
+    assert len(reads) == 2
@@ -0,0 +1,120 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import copy
+
+import pytest
+
+import fingerprint
+
+BOOT_MARKERS = ["iso._make_boot_on_iso9660", "iso._build_iso_image"]
+AIROOTFS_MARKERS = ["iso._make_packages", "iso._mkairootfs_squashfs"]
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(fingerprint, "state_dir", str(tmp_path / "state"))
+
+
+def values(**changes):
+    result = {
+        "command": ["./build.sh"],
+        "url": "https://example.org/iso.git",
+        "commit": "abc",
+        "packages": {"archiso": ["base-1-1-x86_64.pkg.tar.zst"]},
+        "files": {"archiso": {"airootfs/etc/hostname": "1", "efiboot/loader.conf": "2"}},
+    }
+    result.update(changes)
+    return result
+
+
+def with_file(path, digest):
+    result = values()
+    result["files"] = copy.deepcopy(result["files"])
+    result["files"]["archiso"][path] = digest
+    return result
+
+
+def work_folder(tmp_path):
+    work = tmp_path / "work"
+    work.mkdir(exist_ok=True)
+    for marker in BOOT_MARKERS + AIROOTFS_MARKERS:
+        (work / marker).touch()
+    return work
+
+
+def test_no_work_folder_is_fresh(tmp_path):
+    assert fingerprint.prepare_work("arconet", values(), str(tmp_path / "work")) == "fresh"
+    assert fingerprint.load("arconet")["work"] == values()
+
+
+def test_unknown_work_folder_is_wiped(tmp_path):
+    work = work_folder(tmp_path)
+    assert fingerprint.prepare_work("arconet", values(), str(work)) == "fresh"
+    assert not work.exists()
+
+
+def test_broken_off_build_is_kept(tmp_path):
+    fingerprint.prepare_work("arconet", values(), str(tmp_path / "work"))
+    work = work_folder(tmp_path)
+    assert fingerprint.prepare_work("arconet", values(), str(work)) == "kept"
+    assert sorted(p.name for p in work.iterdir()) == sorted(BOOT_MARKERS + AIROOTFS_MARKERS)
+
+
+def test_boot_change_keeps_the_airootfs(tmp_path):
+    fingerprint.prepare_work("arconet", values(), str(tmp_path / "work"))
+    work = work_folder(tmp_path)
+    changed = with_file("efiboot/loader.conf", "3")
+    assert fingerprint.prepare_work("arconet", changed, str(work)) == "partial"
+    assert sorted(p.name for p in work.iterdir()) == sorted(AIROOTFS_MARKERS)
+
+
+def test_same_inputs_as_the_last_success_rebuild_the_iso(tmp_path):
+    fingerprint.prepare_work("arconet", values(), str(tmp_path / "work"))
+    fingerprint.record_success("arconet", values(), str(tmp_path), {})
+    work = work_folder(tmp_path)
+    assert fingerprint.prepare_work("arconet", values(), str(work)) == "partial"
+    assert sorted(p.name for p in work.iterdir()) == sorted(AIROOTFS_MARKERS)
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        with_file("airootfs/etc/hostname", "3"),
+        with_file("packages.x86_64", "4"),
+        values(commit="def"),
+        values(packages={"archiso": ["base-2-1-x86_64.pkg.tar.zst"]}),
+        values(commit=None),
+    ],
+)
+def test_airootfs_changes_start_from_scratch(tmp_path, changed):
+    fingerprint.prepare_work("arconet", values(), str(tmp_path / "work"))
+    work = work_folder(tmp_path)
+    assert fingerprint.prepare_work("arconet", changed, str(work)) == "fresh"
+    assert not work.exists()
+
+
+def test_up_to_date_needs_the_same_isos(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "arconet.iso").write_bytes(b"iso")
+    fingerprint.record_success("arconet", values(), str(out), fingerprint.isos(str(out)))
+    assert fingerprint.up_to_date("arconet", values(), str(out))
+    assert not fingerprint.up_to_date("arconet", values(commit="def"), str(out))
+    (out / "arconet.iso").write_bytes(b"other")
+    assert not fingerprint.up_to_date("arconet", values(), str(out))
@@ -0,0 +1,89 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+import asyncio
+
+import mirrors
+from standin import Upstream
+
+DB = "/core/os/x86_64/core.db"
+
+
+def rank(delays, files=None, **options):
+    # rank stand-in mirrors that answer after delays - returns them as well
+    async def main():
+        upstreams = [
+            await Upstream({DB: b"x" * 50000} if files is None else files, delay=delay).start()
+            for delay in delays
+        ]
+        try:
+            good, failed = await mirrors.rank_async([u.url for u in upstreams], **options)
+        finally:
+            for upstream in upstreams:
+                await upstream.stop()
+        return upstreams, good, failed
+
+    return asyncio.run(main())
+
+
+def test_fastest_first_and_only_the_quickest_download():
+    upstreams, good, failed = rank([0.3, 0.0, 0.1, 0.05, 0.2], top=3)
+    assert [result.server for result in good] == [upstreams[n].url for n in (1, 3, 2)]
+    assert failed == []
+    for number, upstream in enumerate(upstreams):
+        methods = [method for method, path in upstream.requests]
+        # everyone is asked for the headers, only the top three download
+        assert methods == (["HEAD", "GET"] if number in (1, 2, 3) else ["HEAD"])
+
+
+def test_missing_file_fails():
+    upstreams, good, failed = rank([0.0], files={})
+    assert good == []
+    assert [result.error for result in failed] == ["HTTP 404"]
+
+
+def test_slow_mirror_times_out_in_the_first_pass(monkeypatch):
+    monkeypatch.setattr(mirrors, "latency_timeout", 0.2)
+    upstreams, good, failed = rank([0.0, 1.0])
+    assert [result.server for result in good] == [upstreams[0].url]
+    assert [result.error for result in failed] == ["timeout"]
+
+
+def test_candidates_enabled_first_and_capped(tmp_path):
+    path = tmp_path / "mirrorlist"
+    path.write_text(
+        "#Server = http://disabled.example/$repo/os/$arch\n"
+        "Server = https://enabled.example/$repo/os/$arch\n"
+        "#Server = https://other.example/$repo/os/$arch\n"
+    )
+    servers = mirrors.candidate_servers([str(path)])
+    assert servers[0] == "https://enabled.example/$repo/os/$arch"
+    assert servers[1 : 1 + len(mirrors.default_servers)] == mirrors.default_servers
+    assert servers[-2:] == [
+        "http://disabled.example/$repo/os/$arch",
+        "https://other.example/$repo/os/$arch",
+    ]
+    assert len(mirrors.candidate_servers([str(path)], limit=2)) == 2
+    https = mirrors.candidate_servers([str(path)], https_only=True)
+    assert all(server.startswith("https://") for server in https)
+
+
+def test_write_mirrorlist(tmp_path):
+    path = tmp_path / "mirrorlist"
+    result = mirrors.Result("https://fast.example/$repo/os/$arch", 0.01, 2 << 20, 1000, 0.02)
+    mirrors.write_mirrorlist([result], str(path))
+    assert mirrors.read_servers(str(path), include_disabled=False) == [result.server]
@@ -0,0 +1,118 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import os
+
+import pacman_conf as pconf
+
+TEXT = """\
+[options]
+HoldPkg = pacman glibc
+Architecture = auto
+#IgnorePkg =
+ParallelDownloads = 5
+
+#[core-testing]
+#Include = /etc/pacman.d/mirrorlist
+
+[core]
+Include = /etc/pacman.d/mirrorlist
+
+# An example of a custom package repository.
+#[custom]
+#SigLevel = Optional TrustAll
+#Server = file:///home/custompkgs
+
+[extra]
+Include = /etc/pacman.d/mirrorlist
+"""
+
+ARCO = [("SigLevel", "Optional TrustAll"), ("Include", "/etc/pacman.d/arcolinux-mirrorlist")]
+
+
+def conf():
+    return pconf.PacmanConf(TEXT.splitlines(True))
+
+
+def test_lookups():
+    c = conf()
+    assert c.sections() == [
+        ("options", True),
+        ("core-testing", False),
+        ("core", True),
+        ("custom", False),
+        ("extra", True),
+    ]
+    assert c.has_section("custom") and not c.has_section("custom", include_disabled=False)
+    assert c.get_value("options", "ParallelDownloads") == "5"
+    assert c.get_value("options", "IgnorePkg") is None
+    assert c.get_values("extra", "Include") == ["/etc/pacman.d/mirrorlist"]
+    assert c.get_values("custom", "Server") == []
+
+
+def test_add_before_goes_above_the_comment():
+    c = conf()
+    assert c.add_section("arcolinux_repo", ARCO, before="custom")
+    lines = c.text().splitlines()
+    start = lines.index("[arcolinux_repo]")
+    assert lines[start : start + 4] == [
+        "[arcolinux_repo]",
+        "SigLevel = Optional TrustAll",
+        "Include = /etc/pacman.d/arcolinux-mirrorlist",
+        "",
+    ]
+    assert lines[start + 4] == "# An example of a custom package repository."
+    assert not c.add_section("arcolinux_repo", ARCO)
+
+
+def test_add_and_remove_give_back_the_file():
+    c = conf()
+    c.add_section("arcolinux_repo", ARCO)
+    assert c.is_enabled("arcolinux_repo")
+    assert c.remove_section("arcolinux_repo")
+    assert c.text() == TEXT
+
+
+def test_enable_and_disable():
+    c = conf()
+    assert c.set_enabled("core-testing", True)
+    assert c.get_values("core-testing", "Include") == ["/etc/pacman.d/mirrorlist"]
+    assert not c.set_enabled("core-testing", True)
+    assert c.set_enabled("core-testing", False)
+    assert c.text() == TEXT
+
+
+def test_set_value():
+    c = conf()
+    assert c.set_value("options", "ParallelDownloads", "10")
+    assert c.set_value("core", "SigLevel", "Required")
+    assert not c.set_value("custom", "SigLevel", "Never")
+    assert c.get_value("options", "ParallelDownloads") == "10"
+    assert c.text().splitlines()[9:11] == ["[core]", "SigLevel = Required"]
+
+
+def test_save_keeps_the_mode(tmp_path):
+    path = tmp_path / "pacman.conf"
+    path.write_text(TEXT)
+    os.chmod(str(path), 0o640)
+    c = pconf.PacmanConf.load(str(path))
+    c.set_value("options", "ParallelDownloads", "10")
+    c.save()
+    assert os.stat(str(path)).st_mode & 0o777 == 0o640
+    assert pconf.PacmanConf.load(str(path)).get_value("options", "ParallelDownloads") == "10"
+    assert os.listdir(str(tmp_path)) == ["pacman.conf"]
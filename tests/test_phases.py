@@ -0,0 +1,76 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import pytest
+
+import phases
+
+
+@pytest.mark.parametrize(
+    "line, phase",
+    [
+        (":: Retrieving packages...", "download"),
+        ("(  3/412) installing linux-firmware", "install"),
+        ("\x1b[1m:: Running post-transaction hooks...\x1b(B\x1b[m", "hooks"),
+        ("==> Building image from preset: /etc/mkinitcpio.d/linux.preset: 'default'", "mkinitcpio"),
+        ("[mkarchiso] INFO: Installing packages to '/root/work/x86_64/airootfs/'...", "install"),
+        ("[mkarchiso] INFO: Creating a squashfs image, this may take some time...", "squashfs"),
+        ("[mkarchiso] INFO: Creating ISO image...", "iso"),
+        ("Phase 3 : Renaming the ArcoLinux iso", "script-phase-3"),
+        ("   ", None),
+        ("warning: directory permissions differ", None),
+    ],
+)
+def test_classify(line, phase):
+    assert phases.classify(line) == phase
+
+
+def test_tracker_adds_up_phases_that_come_back():
+    tracker = phases.Tracker()
+    tracker.enter("download", now=100.0)
+    tracker.enter("install", now=130.0)
+    tracker.enter("install", now=140.0)
+    tracker.enter("download", now=200.0)
+    tracker.enter(None, now=210.0)
+    assert tracker.finish() == {"download": 40.0, "install": 70.0}
+    assert [span["phase"] for span in tracker.timeline()] == ["download", "install", "download"]
+
+
+def test_tracker_follows_the_output():
+    tracker = phases.Tracker()
+    tracker.feed("build", [":: Retrieving packages...", "foo downloading..."])
+    assert tracker.current == "download"
+    tracker.feed("build", ["[mkarchiso] INFO: Creating ISO image..."])
+    assert tracker.current == "iso"
+    assert set(tracker.finish()) == {"download", "iso"}
+
+
+def test_compare_needs_ratio_and_seconds():
+    previous = {"download": 100.0, "squashfs": 10.0, "iso": 50.0, "build": 600.0}
+    current = {"download": 200.0, "squashfs": 30.0, "iso": 60.0, "build": 900.0, "delta": 99.0}
+    # squashfs tripled but by 20 s only, iso by 10 s - the new delta step has no before
+    assert phases.compare(current, previous) == [
+        {"phase": "build", "seconds": 900.0, "previous": 600.0, "change": 1.5},
+        {"phase": "download", "seconds": 200.0, "previous": 100.0, "change": 2.0},
+    ]
+    assert phases.compare(current, None) == []
+    assert [item["phase"] for item in phases.compare(current, previous, seconds=10)] == [
+        "build",
+        "download",
+        "squashfs",
+    ]
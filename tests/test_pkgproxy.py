@@ -0,0 +1,185 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+import asyncio
+import os
+
+import pkgproxy
+from standin import Upstream, get
+
+PACKAGE = "/core/os/x86_64/foo-1-1-x86_64.pkg.tar.zst"
+DB = "/core/os/x86_64/core.db"
+
+
+def run(test, tmp_path, files, upstreams=1, **proxy_options):
+    # test(proxy, port, upstreams) with a proxy in front of stand-in mirrors
+    async def main():
+        # only the last mirror has the files
+        mirrors = [
+            await Upstream(files if number == upstreams - 1 else {}).start()
+            for number in range(upstreams)
+        ]
+        proxy = pkgproxy.PackageProxy(
+            [mirror.url for mirror in mirrors], store=str(tmp_path), **proxy_options
+        )
+        await proxy.start("127.0.0.1", 0)
+        port = proxy.server.sockets[0].getsockname()[1]
+        try:
+            return await test(proxy, port, mirrors)
+        finally:
+            proxy.server.close()
+            await proxy.server.wait_closed()
+            for mirror in mirrors:
+                await mirror.stop()
+
+    return asyncio.run(main())
+
+
+def stored(tmp_path):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), tmp_path)
+        for root, dirs, names in os.walk(tmp_path)
+        for name in names
+    )
+
+
+def test_miss_then_hit(tmp_path):
+    body = os.urandom(100000)
+
+    async def test(proxy, port, mirrors):
+        first = await get(port, PACKAGE)
+        second = await get(port, PACKAGE)
+        assert first[0] == second[0] == 200
+        assert first[2] == second[2] == body
+        assert mirrors[0].requests == [("GET", PACKAGE)]
+        assert proxy.stats["misses"] == 1 and proxy.stats["hits"] == 1
+
+    run(test, tmp_path, {PACKAGE: body})
+    assert stored(tmp_path) == ["core/x86_64/foo-1-1-x86_64.pkg.tar.zst"]
+
+
+def test_joined_requests_fetch_once(tmp_path):
+    body = os.urandom(300000)
+
+    async def test(proxy, port, mirrors):
+        mirrors[0].pause = 0.3
+        answers = await asyncio.gather(*(get(port, PACKAGE) for _ in range(3)))
+        assert [answer[2] for answer in answers] == [body] * 3
+        assert mirrors[0].requests == [("GET", PACKAGE)]
+        assert proxy.stats["joined"] == 2
+
+    run(test, tmp_path, {PACKAGE: body})
+
+
+def test_not_found(tmp_path):
+    async def test(proxy, port, mirrors):
+        status, headers, body = await get(port, PACKAGE)
+        assert status == 404
+
+    run(test, tmp_path, {})
+    assert stored(tmp_path) == []
+
+
+def test_next_upstream_when_the_first_has_no_file(tmp_path):
+    body = os.urandom(1000)
+
+    async def test(proxy, port, mirrors):
+        status, headers, answer = await get(port, PACKAGE)
+        assert status == 200 and answer == body
+        assert mirrors[0].requests == mirrors[1].requests == [("GET", PACKAGE)]
+
+    run(test, tmp_path, {PACKAGE: body}, upstreams=2)
+
+
+def test_short_body_is_aborted_and_not_stored(tmp_path):
+    body = os.urandom(100000)
+
+    async def test(proxy, port, mirrors):
+        mirrors[0].short.add(PACKAGE)
+        status, headers, answer = await get(port, PACKAGE)
+        # the client sees the connection cut before content-length bytes
+        assert status == 200
+        assert len(answer) < int(headers["content-length"])
+        assert proxy.stats["errors"] == 1
+
+    run(test, tmp_path, {PACKAGE: body})
+    assert stored(tmp_path) == []
+
+
+def test_range_and_not_modified(tmp_path):
+    body = os.urandom(5000)
+
+    async def test(proxy, port, mirrors):
+        await get(port, PACKAGE)
+        status, headers, answer = await get(port, PACKAGE, [("Range", "bytes=100-199")])
+        assert status == 206 and answer == body[100:200]
+        assert headers["content-range"] == "bytes 100-199/5000"
+        for wrong in ("bytes=200-100", "bytes=5000-"):
+            status, refused, answer = await get(port, PACKAGE, [("Range", wrong)])
+            assert status == 416 and refused["content-range"] == "bytes */5000"
+        status, headers, answer = await get(
+            port, PACKAGE, [("If-Modified-Since", headers["last-modified"])]
+        )
+        assert status == 304 and answer == b""
+
+    run(test, tmp_path, {PACKAGE: body})
+
+
+def test_database_fetched_again_after_ttl(tmp_path):
+    async def test(proxy, port, mirrors):
+        await get(port, DB)
+        await get(port, DB)
+        return len(mirrors[0].requests)
+
+    assert run(test, tmp_path / "fresh", {DB: b"db"}, db_ttl=60) == 1
+    assert run(test, tmp_path / "stale", {DB: b"db"}, db_ttl=0) == 2
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    names = ["/core/os/x86_64/{}-1-1-any.pkg.tar.zst".format(name) for name in "abc"]
+    files = {name: os.urandom(1000) for name in names}
+
+    async def test(proxy, port, mirrors):
+        await get(port, names[0])
+        await get(port, names[1])
+        # a is used again - b is now the least recently used
+        await get(port, names[0])
+        await get(port, names[2])
+        assert proxy.stats["evicted"] == 1
+        assert proxy.total <= proxy.max_bytes
+
+    run(test, tmp_path, files, max_bytes=2500)
+    assert stored(tmp_path) == [
+        "core/x86_64/a-1-1-any.pkg.tar.zst",
+        "core/x86_64/c-1-1-any.pkg.tar.zst",
+    ]
+
+
+def test_point_and_unpoint_mirrorlist(tmp_path):
+    path = tmp_path / "mirrorlist"
+    original = "Server = https://mirror.example/archlinux/$repo/os/$arch\n"
+    path.write_text(original)
+    pkgproxy.point_mirrorlist("http://buildhost:7878", str(path))
+    pointed = path.read_text()
+    assert pointed.splitlines()[1] == "Server = http://buildhost:7878/$repo/os/$arch"
+    pkgproxy.point_mirrorlist("http://buildhost:7878", str(path))
+    assert path.read_text() == pointed
+    assert pkgproxy.upstream_servers(str(path), exclude=["http://buildhost:7878"]) == [
+        "https://mirror.example/archlinux/$repo/os/$arch"
+    ]
+    pkgproxy.unpoint_mirrorlist("http://buildhost:7878", str(path))
+    assert path.read_text() == original
@@ -0,0 +1,143 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+import hashlib
+import io
+import os
+import tarfile
+
+import pacman_conf as pconf
+import prefetch
+from standin import Background, Upstream
+
+FILENAME = "foo-1-1-x86_64.pkg.tar.zst"
+PATH = "/core/os/x86_64/" + FILENAME
+
+
+def package(body, upstreams, sha256=None, size=None):
+    urls = [
+        upstream.url.replace("$repo", "core").replace("$arch", "x86_64") + "/" + FILENAME
+        for upstream in upstreams
+    ]
+    return prefetch.Package(
+        "foo",
+        "core",
+        FILENAME,
+        urls,
+        hashlib.sha256(body).hexdigest() if sha256 is None else sha256,
+        len(body) if size is None else size,
+    )
+
+
+def leftovers(folder):
+    return sorted(name for name in os.listdir(folder) if name.endswith(".part"))
+
+
+def test_download_checks_the_sha256(tmp_path):
+    body = os.urandom(100000)
+    with Background(Upstream({PATH: body})) as upstreams:
+        result = prefetch.download([package(body, upstreams)], [str(tmp_path)])
+    assert result.fetched == [FILENAME] and result.failed == []
+    assert (tmp_path / FILENAME).read_bytes() == body
+    assert result.bytes == len(body)
+
+
+def test_sha256_mismatch_falls_back_to_the_next_server(tmp_path):
+    body = os.urandom(100000)
+    bad = bytes(reversed(body))
+    with Background(Upstream({PATH: bad}), Upstream({PATH: body})) as upstreams:
+        result = prefetch.download([package(body, upstreams)], [str(tmp_path)])
+        assert [len(upstream.requests) for upstream in upstreams] == [1, 1]
+    assert result.fetched == [FILENAME]
+    assert (tmp_path / FILENAME).read_bytes() == body
+    assert leftovers(tmp_path) == []
+
+
+def test_missing_and_short_files_fall_back(tmp_path):
+    body = os.urandom(100000)
+    upstreams = Upstream({}), Upstream({PATH: body}, short=[PATH]), Upstream({PATH: body})
+    with Background(*upstreams):
+        result = prefetch.download([package(body, upstreams)], [str(tmp_path)])
+    assert result.fetched == [FILENAME]
+    assert [len(upstream.requests) for upstream in upstreams] == [1, 1, 1]
+
+
+def test_silent_server_is_given_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(prefetch, "idle_timeout", 0.2)
+    body = os.urandom(1000)
+    with Background(Upstream({PATH: body}, delay=3.0), Upstream({PATH: body})) as upstreams:
+        result = prefetch.download([package(body, upstreams)], [str(tmp_path)])
+        assert [len(upstream.requests) for upstream in upstreams] == [1, 1]
+    assert result.fetched == [FILENAME]
+    assert leftovers(tmp_path) == []
+
+
+def test_all_servers_fail(tmp_path):
+    body = os.urandom(1000)
+    with Background(Upstream({PATH: body})) as upstreams:
+        result = prefetch.download([package(body, upstreams, sha256="0" * 64)], [str(tmp_path)])
+    assert result.failed == [FILENAME] and result.fetched == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_cached_file_is_reused(tmp_path):
+    body = os.urandom(1000)
+    shared, host = tmp_path / "shared", tmp_path / "host"
+    host.mkdir()
+    (host / FILENAME).write_bytes(body)
+    with Background(Upstream({PATH: body})) as upstreams:
+        result = prefetch.download([package(body, upstreams)], [str(shared), str(host)])
+        assert upstreams[0].requests == []
+    assert result.reused == [FILENAME] and result.fetched == []
+
+
+def test_read_sync_db(tmp_path):
+    desc = "%FILENAME%\n{}\n\n%CSIZE%\n1234\n\n%SHA256SUM%\n{}\n\n".format(FILENAME, "ab" * 32)
+    path = tmp_path / "core.db"
+    with tarfile.open(str(path), "w:gz") as tar:
+        data = desc.encode("utf-8")
+        info = tarfile.TarInfo("foo-1-1/desc")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    assert prefetch.read_sync_db(str(path)) == {FILENAME: ("ab" * 32, 1234)}
+
+
+def test_repo_servers_and_cache_dirs(tmp_path):
+    mirrorlist = tmp_path / "mirrorlist"
+    mirrorlist.write_text(
+        "#Server = https://off.example/$repo/os/$arch\n"
+        "Server = https://on.example/$repo/os/$arch\n"
+    )
+    config = tmp_path / "pacman.conf"
+    config.write_text(
+        "[options]\n"
+        "Architecture = x86_64\n"
+        "CacheDir = /var/cache/arcolinux-app-glade/pkg /var/cache/pacman/pkg/\n"
+        "\n"
+        "[core]\n"
+        "Server = https://first.example/$repo/os/$arch\n"
+        "Include = {}\n".format(mirrorlist)
+    )
+    conf = pconf.PacmanConf.load(str(config))
+    assert prefetch.repo_servers(conf, "core") == [
+        "https://first.example/core/os/x86_64",
+        "https://on.example/core/os/x86_64",
+    ]
+    assert prefetch.cache_dirs(conf) == [
+        "/var/cache/arcolinux-app-glade/pkg",
+        "/var/cache/pacman/pkg/",
+    ]
@@ -0,0 +1,94 @@
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+
+import os
+import shutil
+import time
+
+import pytest
+
+import trash
+
+
+@pytest.fixture(autouse=True)
+def plenty_of_space(monkeypatch):
+    monkeypatch.setattr(trash, "min_free_bytes", 0)
+
+
+def trashed(tmp_path, name, hours_ago):
+    # a build folder trashed some hours ago
+    stamp = int((time.time() - hours_ago * 3600) * 1000)
+    folder = tmp_path / trash.TRASH_NAME / "{}-{}".format(stamp, name)
+    (folder / "work" / "x86_64").mkdir(parents=True)
+    (folder / "work" / "x86_64" / "airootfs.sfs").write_bytes(b"x" * 1000)
+    return folder
+
+
+def names(tmp_path):
+    folder = tmp_path / trash.TRASH_NAME
+    if not folder.exists():
+        return []
+    return sorted(path.name.split("-", 1)[1] for path in folder.iterdir())
+
+
+def test_move_to_trash(tmp_path):
+    (tmp_path / "arconet-Out").mkdir()
+    target = trash.move_to_trash(str(tmp_path / "arconet-Out") + "/")
+    assert not (tmp_path / "arconet-Out").exists()
+    assert os.path.dirname(target) == trash.trash_dir_for(str(tmp_path / "arconet-Out"))
+    assert names(tmp_path) == ["arconet-Out"]
+    assert trash.move_to_trash(str(tmp_path / "missing")) is None
+
+
+def test_only_old_entries_expire(tmp_path):
+    old = trashed(tmp_path, "old", trash.keep_hours + 1)
+    trashed(tmp_path, "new", 0)
+    assert trash.expired([str(tmp_path / trash.TRASH_NAME)]) == [str(old)]
+
+
+def test_purge_keeps_recent_entries(tmp_path):
+    trashed(tmp_path, "old", trash.keep_hours + 1)
+    trashed(tmp_path, "new", 0)
+    calls = []
+    removed = trash.purge(
+        [str(tmp_path / trash.TRASH_NAME)], lambda left, total: calls.append((left, total))
+    )
+    assert removed == 1 and names(tmp_path) == ["new"]
+    assert calls == [(1, 1), (0, 1)]
+
+
+def test_purge_frees_space_oldest_first(tmp_path, monkeypatch):
+    first = trashed(tmp_path, "first", 0.5)
+    trashed(tmp_path, "second", 0.4)
+    trashed(tmp_path, "third", 0.3)
+    # short on space until the first entry is gone
+    usage = shutil.disk_usage(str(tmp_path))
+    monkeypatch.setattr(
+        trash.shutil,
+        "disk_usage",
+        lambda path: usage._replace(free=0 if first.exists() else trash.min_free_bytes),
+    )
+    monkeypatch.setattr(trash, "min_free_bytes", 20 << 30)
+    assert trash.purge([str(tmp_path / trash.TRASH_NAME)]) == 1
+    assert names(tmp_path) == ["second", "third"]
+
+
+def test_purge_removes_the_empty_trash_folder(tmp_path):
+    trashed(tmp_path, "old", trash.keep_hours + 1)
+    trash.purge([str(tmp_path / trash.TRASH_NAME)])
+    assert os.listdir(str(tmp_path)) == []
@@ -76,6 +76,9 @@ echo "get script"
 wget https://raw.githubusercontent.com/arcolinux/arcolinux-system-config/refs/heads/master/usr/local/bin/arcolinux-probe -O $workdir/usr/share/arcolinux-app-glade/scripts/arcolinux-probe
 chmod +x $workdir/usr/share/arcolinux-app-glade/scripts/arcolinux-probe
 
+echo "Compile the Gui resources"
+$workdir/make-resources.sh
+
 # Below command will backup everything inside the project folder
 git add --all .
 
@@ -20,19 +20,18 @@
 import gi
 import webbrowser
 import functions as fn
+import resources
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk
 
 # constant values
-BASE_DIR = fn.path.dirname(fn.path.realpath(__file__))
-GUI_UI_FILE = fn.os.path.join(BASE_DIR + "/about.ui")
+GUI_UI_FILE = "about.ui"
 
 
 class About(Gtk.Window):
     def __init__(self):
-        self.builder = Gtk.Builder()
-        self.builder.add_from_file(GUI_UI_FILE)
+        self.builder = resources.builder(GUI_UI_FILE)
 
         self.win_about = self.builder.get_object("about")
         # self.win_about.set_transient_for(self.main)
@@ -17,33 +17,66 @@
 # along with Gufw; if not, see http://www.gnu.org/licenses for more
 # information.
 
-import os
-import re
+# the startup profiler goes first - it times the imports below
+from profiler import profiler
 import logging
+import time
 from datetime import datetime
-from time import sleep
-import subprocess
+import buildqueue
+import builds
+import catalog
 import functions as fn
+import jobs
+import logpane
+import resources
+import trash
 
 # Importing gi
 import gi
-import splash
-import about
 
 # https://docs.gtk.org/gtk3/
 gi.require_version("Gtk", "3.0")
 # https://docs.gtk.org/gdk3/
-from gi.repository import Gdk, GdkPixbuf, GLib, Gtk  # noqa
+from gi.repository import GLib, Gtk  # noqa
+
+profiler.since_start("imports")
 
 # constant values
 BASE_DIR = fn.path.dirname(fn.path.realpath(__file__))
-GUI_UI_FILE = os.path.join(BASE_DIR + "/gGui.ui")
+GUI_UI_FILE = "gGui.ui"
+# the stack pages that are built the first time they are shown
+LAZY_PAGES = ["installing", "scripting", "history"]
 LOGGING_FORMAT = "%Y-%m-%d-%H-%M-%S"
 LOGGING_LEVEL = logging.DEBUG
 LOG_FILE = "/var/log/arcolinux-app-glade/arcolinux-app-{}.log".format(
     datetime.now().strftime(LOGGING_FORMAT)
 )
 
+# old build folders - moved to the trash at start, see trash.py
+TMP_BUILD_DIRS = [
+    "/tmp/arconet",
+    "/tmp/arcopro",
+    "/tmp/arcoplasma",
+    "/tmp/ariser",
+    "/tmp/sierra",
+    "/tmp/archlive",
+    "/tmp/archlinux",
+    "/tmp/arcoinstall",
+]
+ROOT_BUILD_DIRS = [
+    "/root/arconet-build",
+    "/root/arconet-Out",
+    "/root/arcopro-build",
+    "/root/arcopro-Out",
+    "/root/arcoplasma-build",
+    "/root/arcoplasma-Out",
+    "/root/Ariser-build",
+    "/root/Ariser-Out",
+    "/root/Sierra-build",
+    "/root/Sierra-Out",
+    "/root/archlinux-Out",
+]
+
 if not fn.path.exists(fn.log_dir):
     fn.mkdir(fn.log_dir)
 
@@ -56,21 +89,57 @@ class Main:
 
     def __init__(self):
         # Setup intialization for logging and Gui
-        self.splash()
-        self.setup_logging()
-        self.back_ups()
-        self.cleanup()
-        self.cleanuptmp()
-        self.versioning()
-        self.setup_gui()
+        # the window comes first - the rest of the start runs in the background
+        with profiler.phase("splash"):
+            self.splash()
+        with profiler.phase("logging setup"):
+            self.setup_logging()
+        # the old build folders go to the trash before any button can start
+        # a build in them - renames only, the deleting waits for empty_trash
+        with profiler.phase("cleanup"):
+            self.cleanup()
+            self.cleanuptmp()
+        with profiler.phase("builder load"):
+            self.setup_gui()
+
+        # first frame and initialization both report back - then we are done
+        self.startup_pending = 2
+        self.executor.submit(
+            "Starting up", self.initialize, on_done=self.on_initialized
+        )
 
     def splash(self):
-        # splash screen
-        splScr = splash.splashScreen()
+        # splash screen - it stays until the initialization is finished
+        import splash
+
+        self.splash_screen = splash.splashScreen()
         while Gtk.events_pending():
             Gtk.main_iteration()
-        sleep(1)
-        splScr.destroy()
+
+    def initialize(self):
+        # everything that does not need the Gui - runs on the executor
+        with profiler.phase("back_ups"):
+            self.back_ups()
+        with profiler.phase("versioning"):
+            self.versioning()
+
+    def on_initialized(self, job):
+        self.empty_trash()
+        if self.splash_screen is not None:
+            self.splash_screen.destroy()
+            self.splash_screen = None
+        self.startup_finished()
+
+    def on_first_frame(self, window, cairo_context):
+        window.disconnect(self.first_frame_handler)
+        profiler.record("first frame", self.show_started)
+        self.startup_finished()
+        return False
+
+    def startup_finished(self):
+        self.startup_pending -= 1
+        if self.startup_pending == 0:
+            profiler.report()
 
     def setup_logging(self):
         # defining handlers for terminal and log file
@@ -134,154 +203,34 @@ class Main:
                     logging.error(error)
 
     def cleanuptmp(self):
-        # making sure /tmp is clean
-
-        # arcolinux
-        if fn.path.isdir("/tmp/arconet/"):
-            try:
-                fn.remove_dir(self, "/tmp/arconet")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/tmp/arcopro/"):
-            try:
-                fn.remove_dir(self, "/tmp/arcopro")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/tmp/arcoplasma/"):
-            try:
-                fn.remove_dir(self, "/tmp/arcoplasma")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # ariser
-        if fn.path.isdir("/tmp/ariser/"):
-            try:
-                fn.remove_dir(self, "/tmp/ariser")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # sierra
-        if fn.path.isdir("/tmp/sierra/"):
-            try:
-                fn.remove_dir(self, "/tmp/sierra")
+        # making sure /tmp is clean - the old githubs go to the trash
+        for directory in TMP_BUILD_DIRS:
+            if trash.move_to_trash(directory):
                 logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # archlive
-        if fn.path.isdir("/tmp/archlive/"):
-            try:
-                fn.remove_dir(self, "/tmp/archlive")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # arcoinstall
-        if fn.path.isdir("/tmp/arcoinstall/"):
-            try:
-                fn.remove_dir(self, "/tmp/arcoinstall")
-                logging.info("Removing old githubs in /tmp")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
 
     def cleanup(self):
-        # making sure /root is clean
-        # arconet
-        if fn.path.isdir("/root/arconet-build/"):
-            try:
-                fn.remove_dir(self, "/root/arconet-build/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/root/arconet-Out/"):
-            try:
-                fn.remove_dir(self, "/root/arconet-Out/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # arcopro
-        if fn.path.isdir("/root/arcopro-build/"):
-            try:
-                fn.remove_dir(self, "/root/arcopro-build/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/root/arcopro-Out/"):
-            try:
-                fn.remove_dir(self, "/root/arcopro-Out/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # arcoplasma
-        if fn.path.isdir("/root/arcoplasma-build/"):
-            try:
-                fn.remove_dir(self, "/root/arcoplasma-build/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/root/arcoplasma-Out/"):
-            try:
-                fn.remove_dir(self, "/root/arcoplasma-Out/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-        # ariser
-        if fn.path.isdir("/root/Ariser-build/"):
-            try:
-                fn.remove_dir(self, "/root/Ariser-build/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        if fn.path.isdir("/root/Ariser-Out/"):
-            try:
-                fn.remove_dir(self, "/root/Ariser-Out/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
-
-        # sierra
-        if fn.path.isdir("/root/Sierra-build/"):
-            try:
-                fn.remove_dir(self, "/root/Sierra-build/")
+        # making sure /root is clean - the old builds go to the trash
+        for directory in ROOT_BUILD_DIRS:
+            if trash.move_to_trash(directory):
                 logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
 
-        if fn.path.isdir("/root/Sierra-Out/"):
-            try:
-                fn.remove_dir(self, "/root/Sierra-Out/")
-                logging.info("Removing old builds")
-                logging.info("This may take a while - be patient")
-            except Exception as error:
-                logging.error(error)
+    def empty_trash(self):
+        # deleting what is in the trash happens in the background
+        trash_dirs = {
+            trash.trash_dir_for(directory)
+            for directory in TMP_BUILD_DIRS + ROOT_BUILD_DIRS
+        }
+        trash.start_purge(sorted(trash_dirs), self.on_trash_progress)
+
+    def on_trash_progress(self, left, total):
+        # called from the trash thread - the statusbar is updated on the main loop
+        if total == 0:
+            return
+        if left:
+            message = "Removing old build folders in the background - {} left".format(left)
+        else:
+            message = "Old build folders removed"
+        GLib.idle_add(fn.show_in_app_notification, self, message, False)
 
     def versioning(self):
         logging.info("App Started")
@@ -306,17 +255,31 @@ class Main:
     def setup_gui(self):
         self.timeout_id = None
 
+        # long running work is handed to the executor - see jobs.py
+        self.executor = jobs.JobExecutor()
+        self.executor.add_listener(self.on_job_changed)
+
+        # the isos are built by their own queue - see buildqueue.py
+        self.build_queue = buildqueue.BuildQueue(self.build_iso)
+        self.build_queue.executor.add_listener(self.on_job_changed)
+        # the output of the builds - see logpane.py
+        self.log_pane = logpane.LogPane()
+
         # https://python-gtk-3-tutorial.readthedocs.io/en/latest/builder.html
         logging.info("Building the Gui from the glade file")
-        self.builder = Gtk.Builder()
-        self.builder.add_from_file(GUI_UI_FILE)
+        self.builder = resources.builder(GUI_UI_FILE)
 
         logging.info("Connecting the glade signals")
         self.builder.connect_signals(self)
 
+        # only the landing page is built now - see on_stack_page_changed
+        self.page_builders = {}
+        stack = self.builder.get_object("stack1")
+        stack.connect("notify::visible-child", self.on_stack_page_changed)
+
         logging.info("Referencing the Gtk window 'hwindow' ID")
         window = self.builder.get_object("hWindow")
-        window.connect("delete-event", Gtk.main_quit)
+        window.connect("delete-event", self.on_close_clicked)
 
         self.statusbar = self.builder.get_object("statusbar")
 
@@ -329,11 +292,94 @@ class Main:
         combobox.set_wrap_width(1)
 
         logging.info("Display main window")
+        self.show_started = time.perf_counter()
+        self.first_frame_handler = window.connect("draw", self.on_first_frame)
         window.show()
 
-    def on_close_clicked(self, widget):
+    def on_stack_page_changed(self, stack, param):
+        name = stack.get_visible_child_name()
+        if name in LAZY_PAGES and name not in self.page_builders:
+            self.build_page(name)
+        if name == "history":
+            self.refresh_history()
+
+    def refresh_history(self):
+        # the last builds from the catalog - see catalog.py
+        builder = self.page_builders.get("history")
+        if builder is None:
+            return False
+        try:
+            rows = catalog.history(limit=200)
+        except Exception as error:
+            logging.error(error)
+            rows = []
+        store = builder.get_object("history_store")
+        store.clear()
+        for row in rows:
+            store.append(
+                [
+                    row["flavor"],
+                    row["state"],
+                    datetime.fromtimestamp(row["finished"]).strftime("%Y-%m-%d %H:%M"),
+                    "{:.0f} min".format(row["seconds"] / 60),
+                    (row["git_commit"] or "")[:10],
+                    "{:.2f} GiB".format(row["size"] / (1 << 30)) if row["size"] else "",
+                    row["target"] or "",
+                ]
+            )
+        builder.get_object("history_status").set_text(
+            "The last {} builds".format(len(rows)) if rows else "No builds yet"
+        )
+        return False
+
+    def build_page(self, name):
+        # build pages/<name>.ui into the empty box of its stack page
+        start = time.perf_counter()
+        builder = resources.builder("pages/" + name + ".ui")
+        builder.connect_signals(self)
+        self.builder.get_object(name).pack_start(
+            builder.get_object(name + "_page"), True, True, 0
+        )
+        self.page_builders[name] = builder
+        logging.info(
+            "Built the %s page in %.1f ms", name, (time.perf_counter() - start) * 1000
+        )
+        return builder
+
+    def get_object(self, name):
+        # like Gtk.Builder.get_object - over the main window and all pages
+        # pages that were not shown yet are built on the way
+        widget = self.builder.get_object(name)
+        if widget is not None:
+            return widget
+        for page in LAZY_PAGES:
+            builder = self.page_builders.get(page) or self.build_page(page)
+            widget = builder.get_object(name)
+            if widget is not None:
+                return widget
+        return None
+
+    def on_job_changed(self, job):
+        # Called on the main loop whenever a background job changes state
+        if job.state == jobs.RUNNING:
+            fn.show_in_app_notification(self, "Running : " + job.name, False)
+        elif job.state == jobs.FAILED:
+            fn.show_in_app_notification(
+                self, "Failed : " + job.name + " - check the log", True
+            )
+
+    def on_close_clicked(self, widget, *args):
+        self.stop_executor()
         Gtk.main_quit()
 
+    def stop_executor(self):
+        # running jobs are allowed to finish - we do not kill a build halfway
+        for job in self.executor.active_jobs() + self.build_queue.executor.active_jobs():
+            logging.warning("Job '%s' is still %s - it will finish first", job.name, job.state)
+        self.executor.shutdown(wait=False)
+        # queued isos that did not start yet are dropped
+        self.build_queue.stop()
+
     ############################################################################
     ############################################################################
     ############################################################################
@@ -355,534 +401,109 @@ class Main:
         else:
             logging.info("--hold for Alacritty is off")
 
-    def on_create_arco_clicked(self, widget):
-        # Creation of the ArcoLinux iso
-        logging.info("ArcoLinux iso selection is: %s", self.choice)
-
-        # installing archiso if needed
-        package = "archiso"
-        fn.install_package(self, package)
-
-        # installing grub if needed
-        package = "grub"
-        fn.install_package(self, package)
-
-        # if arcolinux mirror and key not installed
-        if not fn.check_package_installed(
-            "arcolinux-keyring"
-        ) or not fn.check_package_installed("arcolinux-mirrorlist-git"):
-            logging.info("Installing the ArcoLinux keyring and mirrorlist")
-
-            fn.install_arcolinux_key_mirror(self)
-            fn.add_repos()
-
-        # making sure we start with a clean slate
-        logging.info("Let's remove any old previous building folders")
-        fn.remove_dir(self, "/root/arconet-Out")
-        fn.remove_dir(self, "/root/arcopro-Out")
-        fn.remove_dir(self, "/root/arcoplasma-Out")
-
-        # git clone the iso scripts
-        if "arconet" in self.choice:
-            # https://github.com/arconetpro/arconet-iso
-            command = (
-                "git clone https://github.com/arconetpro/arconet-iso"
-                + " /tmp/"
-                + self.choice
-            )
-        if "arcopro" in self.choice:
-            # https://github.com/arconetpro/arcopro-iso
-            command = (
-                "git clone https://github.com/arconetpro/arcopro-iso"
-                + " /tmp/"
-                + self.choice
-            )
-        if "arcoplasma" in self.choice:
-            # https://github.com/arconetpro/arcoplasma-iso
-            command = (
-                "git clone https://github.com/arconetpro/arcoplasma-iso"
-                + " /tmp/"
-                + self.choice
-            )
-        logging.info("git cloning the build folder")
-        try:
-            fn.run_command(command)
-        except Exception as error:
-            logging.error(error)
-
-        # launch the scripts
-        # /tmp/arcopro/installation-scripts/40-build-the-iso-local-again.sh
-        logging.info("Start building the iso in Alacritty")
-        logging.info(
-            "#################################################################"
-        )
-        logging.info("Sometimes you have to try and build it a second time")
-        logging.info(
-            "for it to work because of the special packages from AUR and repos"
-        )
-        logging.info(
-            "##################################################################"
-        )
-        logging.info(
-            "Changed to /tmp/" + self.choice + "/installation-scripts/" + " folder"
-        )
-        fn.os.chdir("/tmp/" + self.choice + "/installation-scripts/")
-
-        # Preparing to launch the build
-        command = (
-            "/tmp/"
-            + self.choice
-            + "/installation-scripts/40-build-the-iso-local-again.sh"
-        )
-
-        logging.info("Launching the building script")
-
-        # Checking whether switch is on
-        if self.enabled_hold:
-            critty = "alacritty --hold -e"
-            logging.info("Using the hold option")
-        else:
-            logging.info("Not using the hold option")
-            critty = "alacritty -e"
-
-        # Launching the build
-        try:
-            fn.subprocess.call(
-                critty + command,
-                shell=True,
-                stdout=fn.subprocess.PIPE,
-                stderr=fn.subprocess.STDOUT,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # change the output - foldername
-        if self.choice == "arconet":
-            dir = "arconet-Out"
-        elif self.choice == "arcopro":
-            dir = "arcopro-Out"
+    def on_zsync_toggled(self, widget):
+        # .zsync files and the overlap with the last iso - see delta.py
+        builds.use_delta = widget.get_active()
+        if builds.use_delta:
+            logging.info("zsync files for the isos are on")
         else:
-            dir = "arcoplasma-Out"
+            logging.info("zsync files for the isos are off")
 
-        # Moving the iso to home directory of the user
-        path_dir = "/root/" + dir
-        destination = fn.home + "/" + dir
-        logging.info("Move folder to home directory of the user")
-        try:
-            fn.shutil.copytree(path_dir, destination, dirs_exist_ok=True)
-
-            # Sending an in-app message
-            GLib.idle_add(
-                fn.show_in_app_notification,
-                self,
-                "The creation of the ArcoLinux iso is finished",
-                False,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # changing permission
-        fn.permissions(destination)
-        logging.info("Check your home directory for the iso")
+    def on_create_arco_clicked(self, widget):
+        # the choice is read now - changing the dropdown later is safe
+        self.queue_isos([self.choice])
 
     def on_create_arch_clicked(self, widget):
-        # Building the Arch Linux iso
+        # Building the Arch Linux iso with the releng profile
         logging.info("Let's build an Arch Linux iso")
-
-        # installing archiso if needed
-        package = "archiso"
-        fn.install_package(self, package)
-
-        # making sure we start with a clean slate
-        if fn.path_check(fn.base_dir + "/work"):
-            fn.remove_dir(self, "fn.base_dir" + "/work")
-            logging.info("Cleanup - Removing : " + fn.base_dir + "/work")
-        if fn.path_check("/root/work"):
-            fn.remove_dir(self, "/root/work")
-            logging.info("Cleanup - Removing : /root/work")
-
-        # # Define the path to the file
-        # file_path = "/usr/share/archiso/configs/releng/pacman.conf"
-        # print("We make a backup of the original pacman.conf in releng")
-        # backup_file_path = "/usr/share/archiso/configs/releng/pacman.conf.bak"
-        # fn.shutil.copyfile(file_path, backup_file_path)
-
-        # # Read the contents of the file
-        # with open(file_path, "r") as file:
-        #     lines = file.readlines()
-
-        # # Modify the lines by commenting out the line containing "DownloadUser = alpm"
-        # new_lines = [
-        #     re.sub(r"^(DownloadUser\s*=\s*alpm)", r"#\1", line) for line in lines
-        # ]
-
-        # # Write the modified content back to the file
-        # with open(file_path, "w") as file:
-        #     file.writelines(new_lines)
-
-        # print(
-        #     "The line 'DownloadUser = alpm' has been commented out successfully in /etc/pacman.conf"
-        # )
-        # print("We change this so we can build the Arch Linux iso via AAG")
-
-        # starting the Arch Linux build script
-        critty = ["alacritty", "-e"]
-        command = f"mkarchiso -v -r -o {fn.home} /usr/share/archiso/configs/releng/"
-        full_command = critty + ["bash", "-c", command]
-        try:
-            subprocess.run(
-                full_command,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-            )
-            logging.info("Command executed successfully.")
-        except subprocess.CalledProcessError as error:
-            logging.error("Command failed with return code %s: %s", error.returncode, error.output)
-        except FileNotFoundError:
-            logging.error("Alacritty is not installed or not available in PATH.")
-        except Exception as error:
-            logging.error("Unexpected error: %s", error)
-
-        # fn.shutil.move(backup_file_path, file_path)
-        # print("The original pacman.conf has been restored.")
-
-        # changing permission and add date
-        x = datetime.now()
-        year = str(x.year)
-        month = str(x.strftime("%m"))
-        day = str(x.strftime("%d"))
-        iso_name = "/archlinux-" + year + "." + month + "." + day + "-x86_64.iso"
-        destination = fn.home + iso_name
-        fn.permissions(destination)
-
-        # Configuration
-        FOLDER_NAME = "archlinux-Out"
-
-        # Define source and destination paths
-        iso_source = destination  # Source ISO file path
-        destination_folder = os.path.join(fn.home, FOLDER_NAME)  # Destination folder path
-        destination_file = os.path.join(destination_folder, os.path.basename(iso_name))  # Full path in destination folder
-
-        logging.info("Moving ISO file into the user's home directory folder.")
-
-        try:
-            # Ensure the destination folder exists
-            os.makedirs(destination_folder, exist_ok=True)
-
-            # Copy the ISO file into the folder
-            fn.shutil.move(iso_source, destination_file)
-            logging.info(f"Successfully moved file from {iso_source} to {destination_file}")
-
-        except FileNotFoundError:
-            logging.error(f"Source file '{iso_source}' does not exist.")
-        except PermissionError:
-            logging.error("Permission denied. Ensure you have the necessary permissions.")
-        except fn.shutil.SameFileError:
-            logging.error("Source and destination represent the same file.")
-        except Exception as error:
-            logging.error(f"An unexpected error occurred: {error}")
-
-        logging.info("Check your home directory for the iso")
-
-        fn.permissions(destination_folder)
-
-        # making sure we start with a clean slate
-        if fn.path_check(fn.base_dir + "/work"):
-            fn.remove_dir(self, "fn.base_dir" + "/work")
-            logging.info("Cleanup - Removing : " + fn.base_dir + "/work")
-        if fn.path_check("/root/work"):
-            fn.remove_dir(self, "/root/work")
-            logging.info("Cleanup - Removing : /root/work")
-
-        # Sending an in-app message
-        GLib.idle_add(
-            fn.show_in_app_notification,
-            self,
-            "The creation of the Arch Linux iso is finished",
-            False,
-        )
+        self.queue_isos(["archlinux"])
 
     def on_create_ariser_clicked(self, widget):
         # Creation of the Ariser iso
         logging.info("Ariser iso selected")
-
-        # installing archiso if needed
-        package = "archiso"
-        fn.install_package(self, package)
-
-        # making sure we start with a clean slate
-        logging.info("Let's remove any old previous building folders")
-        fn.remove_dir(self, "/root/Ariser-Out")
-        fn.remove_dir(self, "/root/Ariser-build")
-
-        # git clone the iso scripts
-        command = (
-            "git clone https://github.com/ariser-installer/ariser.git" + " /tmp/ariser"
-        )
-
-        logging.info("git cloning the build folder")
-        try:
-            fn.run_command(command)
-        except Exception as error:
-            logging.error(error)
-
-        # launch the scripts
-        logging.info("Start building the iso in Alacritty")
-        logging.info(
-            "#################################################################"
-        )
-        logging.info("Sometimes you have to try and build it a second time")
-        logging.info("for it to work because of servers and network connections")
-        logging.info(
-            "##################################################################"
-        )
-        logging.info("Changed to /tmp/ariser")
-        fn.os.chdir("/tmp/ariser")
-
-        # Preparing to launch the build
-        command = "/tmp/ariser/build-archlinux-with-alis.sh"
-
-        logging.info("Launching the building script")
-
-        # Checking whether switch is on
-        critty = "alacritty -e"
-
-        # Launching the build
-        try:
-            fn.subprocess.call(
-                critty + command,
-                shell=True,
-                stdout=fn.subprocess.PIPE,
-                stderr=fn.subprocess.STDOUT,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # change the output - foldername
-        dir = "Ariser-Out"
-
-        # Moving the iso to home directory of the user
-        path_dir = "/root/" + dir
-        destination = fn.home + "/" + dir
-        logging.info("Move folder to home directory of the user")
-        try:
-            fn.shutil.copytree(path_dir, destination, dirs_exist_ok=True)
-
-            # Sending an in-app message
-            GLib.idle_add(
-                fn.show_in_app_notification,
-                self,
-                "The creation of the Ariser iso is finished",
-                False,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # changing permission
-        fn.permissions(destination)
-        logging.info("Check your home directory for the iso")
+        self.queue_isos(["ariser"])
 
     def on_create_sierra_clicked(self, widget):
         # Creation of the Sierra iso
         logging.info("Sierra iso selected")
-
-        # installing archiso if needed
-        package = "archiso"
-        fn.install_package(self, package)
-
-        # making sure we start with a clean slate
-        logging.info("Let's remove any old previous building folders")
-        fn.remove_dir(self, "/root/Sierra-Out")
-        fn.remove_dir(self, "/root/Sierra-build")
-
-        # git clone the iso scripts
-        command = (
-            "git clone https://github.com/ariser-installer/sierra.git" + " /tmp/sierra"
-        )
-
-        logging.info("git cloning the build folder")
-        try:
-            fn.run_command(command)
-        except Exception as error:
-            logging.error(error)
-
-        # launch the scripts
-        logging.info("Start building the iso in Alacritty")
-        logging.info(
-            "#################################################################"
-        )
-        logging.info("Sometimes you have to try and build it a second time")
-        logging.info("for it to work because of servers and network connections")
-        logging.info(
-            "##################################################################"
-        )
-        logging.info("Changed to /tmp/sierra")
-        fn.os.chdir("/tmp/sierra")
-
-        # Preparing to launch the build
-        command = "/tmp/sierra/build-archlinux-with-alis.sh"
-
-        logging.info("Launching the building script")
-
-        # Checking whether switch is on
-        critty = "alacritty -e"
-
-        # Launching the build
-        try:
-            fn.subprocess.call(
-                critty + command,
-                shell=True,
-                stdout=fn.subprocess.PIPE,
-                stderr=fn.subprocess.STDOUT,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # change the output - foldername
-        dir = "Sierra-Out"
-
-        # Moving the iso to home directory of the user
-        path_dir = "/root/" + dir
-        destination = fn.home + "/" + dir
-        logging.info("Move folder to home directory of the user")
-        try:
-            fn.shutil.copytree(path_dir, destination, dirs_exist_ok=True)
-
-            # Sending an in-app message
-            GLib.idle_add(
-                fn.show_in_app_notification,
-                self,
-                "The creation of the Sierra iso is finished",
-                False,
-            )
-        except Exception as error:
-            logging.error(error)
-
-        # changing permission
-        fn.permissions(destination)
-        logging.info("Check your home directory for the iso")
+        self.queue_isos(["sierra"])
 
     def on_create_arcoinstall_clicked(self, widget):
         # Creation of the arcoinstall iso
         logging.info("Arcoinstall iso selected")
+        self.queue_isos(["arcoinstall"])
+
+    def on_build_all_clicked(self, widget):
+        # every flavor - as many at once as the machine can take
+        logging.info("Let's build all the isos")
+        self.queue_isos(list(builds.flavors))
+
+    def on_build_log_clicked(self, widget):
+        self.log_pane.show()
+
+    def queue_isos(self, names):
+        # a second click on a queued or running iso does nothing
+        added = self.build_queue.add(names)
+        if added:
+            message = "Queued : " + ", ".join(added)
+            if not self.enabled_hold:
+                self.log_pane.show()
+        else:
+            message = "Already queued : " + ", ".join(names)
+        fn.show_in_app_notification(self, message, False)
+
+    def build_iso(self, flavor):
+        # runs on a worker of the build queue - see buildqueue.py
+        # Checking whether switch is on - then the build runs in Alacritty
+        # and stays open, otherwise its output goes to the log pane
+        terminal = None
+        if self.enabled_hold:
+            terminal = ["alacritty", "--hold", "-e"]
+            logging.info("Using the hold option")
+            logging.info("Start building the %s iso in Alacritty", flavor.name)
+        else:
+            logging.info("Start building the %s iso", flavor.name)
+        skipped = []
+        overlaps = []
 
-        # installing archiso if needed
-        package = "archiso"
-        fn.install_package(self, package)
-
-        # remove archlive
-        targetlive_dir = "/tmp/archlive"
-
-        if os.path.exists(targetlive_dir) and os.path.isdir(targetlive_dir):
-            try:
-                fn.shutil.rmtree(targetlive_dir)
-                logging.info(f"Removed existing directory: {targetlive_dir}")
-            except Exception as error:
-                logging.error(f"Failed to remove directory {targetlive_dir}: {error}")
-                return
-            
-        # git clone the iso scripts and remove first
-        repo_url = "https://github.com/arconetpro/arcoinstall.git"
-        target_dir = "/tmp/arcoinstall"
-
-        if os.path.exists(target_dir) and os.path.isdir(target_dir):
-            try:
-                fn.shutil.rmtree(target_dir)
-                logging.info(f"Removed existing directory: {target_dir}")
-            except Exception as error:
-                logging.error(f"Failed to remove directory {target_dir}: {error}")
-                return
-
-        command = f"git clone {repo_url} {target_dir}"
-        logging.info("git cloning the build folder")
-        logging.info(command)
-        try:
-            fn.run_command(command)
-        except Exception as error:
-            logging.error(error)
-
-        # launch the scripts
-        logging.info("Start building the iso in Alacritty")
-        logging.info(
-            "#################################################################"
-        )
-        logging.info("Sometimes you have to try and build it a second time")
-        logging.info("for it to work because of keys, servers and network connections")
-        logging.info(
-            "##################################################################"
-        )
-
-        target_dir = "/tmp/arcoinstall"
-        command = "./build_iso.sh"  # Relative path since cwd will be set
-        critty = ["alacritty", "-e"]
-
-        if not (os.path.exists(target_dir) and os.path.isdir(target_dir)):
-            logging.error("Directory does not exist: %s", target_dir)
-            return
-
-        full_command = critty + [command]
-        logging.info("Launching command with Alacritty in directory: %s", target_dir)
-        logging.info("Full command: %s", ' '.join(full_command))
+        def report(step, **details):
+            if step == "skipped":
+                skipped.append(details["destination"])
+            elif step == "overlap" and details["previous"]:
+                overlaps.append(details)
 
         try:
-            subprocess.run(
-                full_command,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=target_dir  # Set working directory specifically for this command
+            target = builds.build(
+                flavor, terminal=terminal, report=report, listener=self.log_pane.append
             )
-            logging.info("Command executed successfully.")
-        except subprocess.CalledProcessError as error:
-            logging.error("Command failed with return code %s: %s", error.returncode, error.output)
-        except FileNotFoundError:
-            logging.error("Alacritty is not installed or not available in PATH.")
-        except Exception as error:
-            logging.error("Unexpected error: %s", error)
-
-        # change the output - foldername
-        dir = "arcoinstall-Out"
-
-        # Moving the iso to home directory of the user
-        path_dir = "/tmp/archlive/out/"
-        destination = fn.home + "/" + dir
-        logging.info("Move folder to home directory of the user")
-        try:
-            os.makedirs(os.path.dirname(destination), exist_ok=True)
-            fn.shutil.copytree(path_dir, destination, dirs_exist_ok=True)
 
             # Sending an in-app message
+            if skipped:
+                message = "Nothing changed for the " + flavor.name + " iso - it is still in " + target
+            else:
+                message = "The creation of the " + flavor.name + " iso is finished"
+            for overlap in overlaps:
+                message += " - {:.1f} % the same as the last build, {} MiB changed".format(
+                    overlap["overlap"] * 100, overlap["changed_bytes"] >> 20
+                )
+            GLib.idle_add(fn.show_in_app_notification, self, message, False)
+        except Exception as error:
+            logging.error(error)
             GLib.idle_add(
                 fn.show_in_app_notification,
                 self,
-                "The creation of the Arcoinstall iso is finished",
-                False,
+                "The creation of the " + flavor.name + " iso failed - check the log",
+                True,
             )
-        except Exception as error:
-            logging.error(error)
-
-        # changing permission
-        fn.permissions(destination)
-        logging.info("Check your home directory for the iso")
-
+        # the build is in the catalog now
+        GLib.idle_add(self.refresh_history)
 
+    @jobs.in_background("Clean pacman cache")
     def on_clean_pacman_cache_clicked(self, widget):
         # Cleaning the /var/cache/pacman/pkg/
         logging.info("Let's clean the pacman cache")
-        command = "yes | pacman -Scc"
-        package = "alacritty"
-        fn.install_package(self, package)
         try:
-            fn.subprocess.call(
-                command,
-                shell=True,
-                stdout=fn.subprocess.PIPE,
-                stderr=fn.subprocess.STDOUT,
-            )
-            logging.info("Pacman cache cleaned")
+            fn.clean_pacman_cache()
 
             # Sending an in-app message
             GLib.idle_add(
@@ -894,13 +515,16 @@ class Main:
         except Exception as error:
             logging.error(error)
 
+    @jobs.in_background("Fix Arch Linux keys")
     def on_fix_arch_clicked(self, widget):
         # Resetting the Arch Linux keys and more
         logging.info("Let's fix the keys of Arch Linux")
         command = fn.base_dir + "/scripts/fixkey"
         package = "alacritty"
         fn.install_package(self, package)
-        fn.run_script_alacritty_hold(self, command)
+        # the script runs pacman -Sy - see core.pacman_lock
+        with fn.pacman_lock:
+            fn.run_script_alacritty_hold(self, command)
 
         # Sending an in-app message
         GLib.idle_add(
@@ -910,13 +534,16 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Probe")
     def on_probe_clicked(self, widget):
         # Gathering information with hw-probe
         logging.info("Let's create the probe link")
         command = fn.base_dir + "/scripts/arcolinux-probe"
         # package = "hw-probe"
         # fn.install_package(self, package)
-        fn.run_script_alacritty_hold(self, command)
+        # the script installs hw-probe with pacman
+        with fn.pacman_lock:
+            fn.run_script_alacritty_hold(self, command)
 
         # Sending an in-app message
         GLib.idle_add(
@@ -926,6 +553,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("ArcoLinux Nemesis scripts")
     def on_get_nemesis_clicked(self, widget):
         # Download the ArcoLinux Nemesis scripts
         logging.info("Get the ArcoLinux nemesis scripts")
@@ -942,14 +570,12 @@ class Main:
 
         # Move folder to home directory of the user
         try:
-            fn.shutil.copytree(path_dir, destination, dirs_exist_ok=True)
+            fn.move_to_home(path_dir, destination)
         except Exception as error:
             logging.error(error)
 
         logging.info("We saved the scripts to ~/DATA/arcolinux-nemesis")
 
-        fn.permissions(destination)
-
         # Sending an in-app message
         GLib.idle_add(
             fn.show_in_app_notification,
@@ -958,23 +584,13 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Arch Linux mirrors")
     def on_arch_server_clicked(self, widget):
         # Setting the Arch Linux mirrorlist
         logging.info("Let's change the Arch Linux mirrors")
 
-        # Running the script
-        command = fn.base_dir + "/scripts/best-arch-servers"
-        package = "alacritty"
-        fn.install_package(self, package)
-        fn.run_script(self, command)
-        logging.info("We changed the content of your /etc/pacman.d/mirrorlist")
-        logging.info("Server = https://mirror.osbeck.com/archlinux/$repo/os/$arch")
-        logging.info("Server = http://mirror.osbeck.com/archlinux/$repo/os/$arch")
-        logging.info("Server = https://mirrors.kernel.org/archlinux/$repo/os/$arch")
-        logging.info("Server = https://geo.mirror.pkgbuild.com/$repo/os/$arch")
-        logging.info("Server = http://mirror.rackspace.com/archlinux/$repo/os/$arch")
-        logging.info("Server = https://mirror.rackspace.com/archlinux/$repo/os/$arch")
-
+        # Probing the candidate mirrors at the same time - see mirrors.py
+        fn.rank_arch_mirrors()
         logging.info("Done")
 
         # Sending an in-app message
@@ -985,6 +601,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Install ArcoLinux keys and mirrors")
     def on_arco_key_mirror_clicked_install(self, widget):
         # Installing the ArcoLinux keys and ArcoLinux mirrorlist
         logging.info("Let's install the ArcoLinux keys and mirrors")
@@ -1000,6 +617,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Remove ArcoLinux keys and mirrors")
     def on_arco_key_mirror_clicked_remove(self, widget):
         # Remove the ArcoLinux keys and ArcoLinux mirrorlist
         logging.info("Let's remove the ArcoLinux keys and mirrors")
@@ -1017,6 +635,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Reset pacman.conf from the backup")
     def on_pacman_reset_local_clicked(self, widget):
         # Using the local backup to reset /etc/pacman.conf
         if fn.path.isfile(fn.pacman_conf + ".bak"):
@@ -1034,6 +653,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Reset pacman.conf from the cached file")
     def on_pacman_reset_cached_clicked(self, widget):
         # Using the ArcoLinux cached file to reset /etc/pacman.conf
         # Depending on what distro you are - we use the original pacman.conf
@@ -1062,24 +682,39 @@ class Main:
     def on_pacman_install_packages(self, widget):
         # Install the package via file
 
-        filechooserbutton = self.builder.get_object("install_path")
+        filechooserbutton = self.get_object("install_path")
         path = filechooserbutton.get_filename()
         if len(path) > 1:
             logging.info("Installing packages from selected file")
             logging.info("You selected this file")
             logging.info("File: " + path)
-            fn.install_packages_path(self, path)
-
-            # Sending an in-app message
-            GLib.idle_add(
-                fn.show_in_app_notification,
-                self,
-                "Packages installed from selected file",
-                False,
+            self.executor.submit(
+                "Install packages from file", self.install_packages_from, path
             )
         else:
             logging.info("First select a file")
 
+    def install_packages_from(self, path):
+        try:
+            not_found = fn.install_packages_path(self, path)
+        except fn.PacmanError as error:
+            GLib.idle_add(fn.show_in_app_notification, self, str(error), True)
+            return
+
+        if not_found:
+            message = "Packages installed - not found : " + " ".join(not_found)
+        else:
+            message = "Packages installed from selected file"
+
+        # Sending an in-app message
+        GLib.idle_add(
+            fn.show_in_app_notification,
+            self,
+            message,
+            False,
+        )
+
+    @jobs.in_background("Install ASA")
     def on_asa_install_clicked(self, widget):
         fn.install_arcolinux_spices_application(self)
         # Sending an in-app message
@@ -1090,6 +725,7 @@ class Main:
             False,
         )
 
+    @jobs.in_background("Install ATT")
     def on_att_install_clicked(self, widget):
         fn.install_archlinux_tweak_tool(self)
         # Sending an in-app message
@@ -1101,11 +737,14 @@ class Main:
         )
 
     def on_about_clicked(self, widget):
-        # About dialog
-        aboutwin = about.About()
+        # About dialog - only loaded when asked for
+        import about
+
+        about.About()
 
     def on_quit_button_clicked(self, widget):
         # Ending the application
+        self.stop_executor()
         Gtk.main_quit()
         print(
             "---------------------------------------------------------------------------"
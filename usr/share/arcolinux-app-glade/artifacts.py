@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Moving the build output into the home directory of the user
+# A rename costs nothing, a reflink clone shares the blocks, only as a
+# last resort the bytes are copied - and the owner is set on the way
+
+import errno
+import fcntl
+import logging
+import os
+import stat
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# ioctl number of FICLONE from linux/fs.h
+FICLONE = 0x40049409
+COPY_BUFFER = 8 << 20
+
+RENAMED = "renamed"
+CLONED = "cloned"
+COPIED = "copied"
+
+
+class Stats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.methods = {RENAMED: 0, CLONED: 0, COPIED: 0}
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def add(self, method, size):
+        self.files += 1
+        self.bytes += size
+        self.methods[method] += 1
+
+    @property
+    def throughput(self):
+        # bytes per second
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        return "{} files, {:.2f} GiB in {:.1f} s ({:.0f} MiB/s) - {}".format(
+            self.files,
+            self.bytes / (1 << 30),
+            self.seconds,
+            self.throughput / (1 << 20),
+            ", ".join("{} {}".format(n, m) for m, n in self.methods.items() if n),
+        )
+
+
+def _chown(path, uid, gid, follow_symlinks=False):
+    if uid is None and gid is None:
+        return
+    os.chown(
+        path,
+        -1 if uid is None else uid,
+        -1 if gid is None else gid,
+        follow_symlinks=follow_symlinks,
+    )
+
+
+def _chown_entries(directory, uid, gid):
+    # one folder - returns its subfolders and [changed, skipped, files, bytes]
+    subdirs = []
+    counts = [0, 0, 0, 0]
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            info = entry.stat(follow_symlinks=False)
+            if info.st_uid != uid or info.st_gid != gid:
+                os.chown(entry.path, uid, gid, follow_symlinks=False)
+                counts[0] += 1
+            else:
+                counts[1] += 1
+            if stat.S_ISDIR(info.st_mode):
+                subdirs.append(entry.path)
+            else:
+                counts[2] += 1
+                counts[3] += info.st_size
+    return subdirs, counts
+
+
+def chown_tree(top, uid, gid, workers=4):
+    """
+    Give top and everything below it to uid:gid - like chown -R.
+
+    Entries that already have the right owner are left alone. Every folder
+    is scanned once with os.scandir; with more than one worker the folders
+    are spread over a thread pool, the system calls release the GIL.
+    Returns (changed, skipped, files, bytes).
+    """
+    info = os.lstat(top)
+    totals = [0, 0, 0, 0]
+    if info.st_uid != uid or info.st_gid != gid:
+        os.chown(top, uid, gid, follow_symlinks=False)
+        totals[0] += 1
+    else:
+        totals[1] += 1
+    if not stat.S_ISDIR(info.st_mode):
+        totals[2] += 1
+        totals[3] += info.st_size
+        return tuple(totals)
+
+    def add(counts):
+        for number, count in enumerate(counts):
+            totals[number] += count
+
+    if workers <= 1:
+        pending = [top]
+        while pending:
+            subdirs, counts = _chown_entries(pending.pop(), uid, gid)
+            pending.extend(subdirs)
+            add(counts)
+        return tuple(totals)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {pool.submit(_chown_entries, top, uid, gid)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, counts = future.result()
+                add(counts)
+                for subdir in subdirs:
+                    running.add(pool.submit(_chown_entries, subdir, uid, gid))
+    return tuple(totals)
+
+
+def _clone(src_fd, dst_fd, size):
+    # reflink - btrfs and xfs share the blocks, nothing is copied
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return CLONED
+    except OSError:
+        pass
+
+    # copy_file_range lets the kernel do the copy without a trip through
+    # user space - and some filesystems turn it into a clone as well
+    if hasattr(os, "copy_file_range"):
+        try:
+            copied = 0
+            while copied < size:
+                done = os.copy_file_range(src_fd, dst_fd, size - copied)
+                if done == 0:
+                    break
+                copied += done
+            if copied == size:
+                return COPIED
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+
+    buffer = bytearray(COPY_BUFFER)
+    view = memoryview(buffer)
+    with open(src_fd, "rb", buffering=0, closefd=False) as source:
+        while True:
+            length = source.readinto(buffer)
+            if not length:
+                break
+            written = 0
+            while written < length:
+                written += os.write(dst_fd, view[written:length])
+    return COPIED
+
+
+def _copy_file(src, dst, uid, gid, stats):
+    info = os.lstat(src)
+    if stat.S_ISLNK(info.st_mode):
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        os.symlink(os.readlink(src), dst)
+        _chown(dst, uid, gid)
+        os.unlink(src)
+        stats.add(COPIED, 0)
+        return
+
+    tmp = dst + ".part"
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            method = _clone(src_fd, dst_fd, info.st_size)
+            # owner and mode in the same pass - no second walk afterwards
+            if uid is not None or gid is not None:
+                os.fchown(dst_fd, -1 if uid is None else uid, -1 if gid is None else gid)
+            os.fchmod(dst_fd, stat.S_IMODE(info.st_mode))
+        finally:
+            os.close(dst_fd)
+        os.utime(tmp, ns=(info.st_atime_ns, info.st_mtime_ns))
+        os.replace(tmp, dst)
+    except BaseException:
+        # a half copy is no use to anyone - the source is still there
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    finally:
+        os.close(src_fd)
+    # gone from the source as soon as it is safe - we never hold two copies
+    os.unlink(src)
+    stats.add(method, info.st_size)
+
+
+def _move(src, dst, uid, gid, stats):
+    # try the rename first - same filesystem, no data moves at all
+    if not os.path.isdir(dst) or not os.path.isdir(src) or os.path.islink(src):
+        try:
+            os.replace(src, dst)
+            if os.path.isdir(dst) and not os.path.islink(dst):
+                # a renamed tree keeps its old owner - fix that in one walk
+                changed, skipped, files, size = chown_tree(
+                    dst, -1 if uid is None else uid, -1 if gid is None else gid
+                )
+                stats.files += files
+                stats.bytes += size
+                stats.methods[RENAMED] += files
+            else:
+                _chown(dst, uid, gid)
+                stats.add(RENAMED, os.lstat(dst).st_size)
+            return
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.ENOTEMPTY, errno.EEXIST, errno.EISDIR):
+                raise
+
+    if os.path.isdir(src) and not os.path.islink(src):
+        # merge into the destination folder - like copytree(dirs_exist_ok=True)
+        if not os.path.isdir(dst):
+            os.makedirs(dst, exist_ok=True)
+            os.chmod(dst, stat.S_IMODE(os.stat(src).st_mode))
+            _chown(dst, uid, gid)
+        with os.scandir(src) as entries:
+            names = [entry.name for entry in entries]
+        for name in names:
+            _move(os.path.join(src, name), os.path.join(dst, name), uid, gid, stats)
+        os.rmdir(src)
+    else:
+        _copy_file(src, dst, uid, gid, stats)
+
+
+def _make_parents(directory, uid, gid):
+    # folders we create for the user belong to the user as well
+    missing = []
+    while not os.path.isdir(directory):
+        missing.append(directory)
+        directory = os.path.dirname(directory)
+    for directory in reversed(missing):
+        os.mkdir(directory)
+        _chown(directory, uid, gid)
+
+
+def relocate(src, dst, uid=None, gid=None):
+    """
+    Move src - a file or a folder - to dst and give it to uid:gid.
+
+    Per entry the cheapest way wins: a rename on the same filesystem, then a
+    reflink clone, then copy_file_range, then a copy with a large buffer.
+    An existing dst folder is merged into. Returns the Stats of the move.
+    """
+    stats = Stats()
+    _make_parents(os.path.dirname(os.path.abspath(dst)), uid, gid)
+    _move(src, dst, uid, gid, stats)
+    stats.seconds = time.monotonic() - stats.started
+    logging.info("Moved %s to %s : %s", src, dst, stats.summary())
+    return stats
@@ -51,13 +51,10 @@ def GUI(self, Gtk, GdkPixbuf, fn):
     #                           HBOX_LOGO
     # ======================================================================
 
-    img_pb = GdkPixbuf.Pixbuf().new_from_file_at_size(
-        fn.os.path.join(
-            str(fn.Path(__file__).parent), "images/arcolinux-one-liner.png"
-        ),
-        235,
-        235,
-    )  # noqa
+    # already 235 pixels wide - no scaling at start
+    img_pb = GdkPixbuf.Pixbuf().new_from_file(
+        fn.base_dir + "/images/arcolinux-one-liner-235.png"
+    )
     img = Gtk.Image().new_from_pixbuf(img_pb)
     hbox_logo.pack_start(img, True, False, 0)
 
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The output of a build - kept in a log file of its own and handed on line
+# by line to whoever watches, the log pane of the Gui or the command line
+# Nothing in here imports GTK
+
+import logging
+import os
+import threading
+from datetime import datetime
+
+import core
+
+log_dir = core.log_dir + "builds/"
+
+# seconds between two looks at a log file another process writes
+follow_seconds = 0.25
+
+LOGGING_FORMAT = "%Y-%m-%d-%H-%M-%S"
+
+
+def _no_listener(name, lines):
+    pass
+
+
+class BuildLog:
+    """
+    The log of one build of name in log_dir.
+
+    feed(chunk) takes the raw output as it comes from the pipe. The file
+    gets every byte, listener(name, lines) gets the complete lines of a
+    chunk in one call - a line cut in two by the pipe waits for its end.
+    echo is a text file that gets the output as well, like sys.stderr.
+    """
+
+    def __init__(self, name, listener=None, echo=None):
+        self.name = name
+        self.listener = listener or _no_listener
+        self.echo = echo
+        os.makedirs(log_dir, mode=0o755, exist_ok=True)
+        self.path = os.path.join(
+            log_dir, "{}-{}.log".format(name, datetime.now().strftime(LOGGING_FORMAT))
+        )
+        self.file = None
+        self.partial = b""
+        self.lines = 0
+        self.stop = threading.Event()
+        self.follower = None
+
+    def open(self):
+        # we write the file - see follow() for a file tee writes
+        self.file = open(self.path, "ab")
+        return self
+
+    def feed(self, chunk):
+        if self.file is not None:
+            self.file.write(chunk)
+            self.file.flush()
+        if self.echo is not None:
+            self.echo.write(chunk.decode("utf-8", "replace"))
+            self.echo.flush()
+        self._split(chunk)
+
+    def _split(self, chunk):
+        # pacman and curl redraw a line with a carriage return - the last
+        # drawing of it is the line
+        data = self.partial + chunk
+        parts = data.split(b"\n")
+        self.partial = parts.pop()
+        if len(self.partial) > 1 << 16:
+            # no newline for a long time - let it through anyway
+            parts.append(self.partial)
+            self.partial = b""
+        if not parts:
+            return
+        lines = [
+            part.rstrip(b"\r").rsplit(b"\r", 1)[-1].decode("utf-8", "replace")
+            for part in parts
+        ]
+        self.lines += len(lines)
+        try:
+            self.listener(self.name, lines)
+        except Exception as error:
+            logging.error(error)
+
+    def follow(self):
+        # the build writes the file itself - through tee in a terminal
+        # a thread reads what is added until close()
+        open(self.path, "ab").close()
+        self.follower = threading.Thread(
+            target=self._follow, name="aag-log-" + self.name, daemon=True
+        )
+        self.follower.start()
+        return self
+
+    def _follow(self):
+        with open(self.path, "rb") as f:
+            while True:
+                stopping = self.stop.is_set()
+                chunk = f.read(1 << 16)
+                if chunk:
+                    self._split(chunk)
+                    continue
+                if stopping:
+                    return
+                self.stop.wait(follow_seconds)
+
+    def close(self):
+        self.stop.set()
+        if self.follower is not None:
+            self.follower.join(5)
+        if self.partial:
+            self._split(b"\n")
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        logging.info(
+            "The output of the %s build is in %s (%d lines)", self.name, self.path, self.lines
+        )
+
+
+def tee_command(command, path):
+    # command with its output copied to path - for a build in a terminal
+    # pipefail so the exit code is the one of command, not of tee
+    return ["bash", "-c", 'set -o pipefail; "$@" 2>&1 | tee -a "$0"', path] + list(command)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# A queue of iso builds - any set of flavors, every flavor at most once
+# The scheduler starts the next build as soon as the cpus, the memory and
+# the disk can take it - a batch of all flavors keeps the machine busy
+# without running it out of memory or space
+
+import logging
+import os
+import shutil
+import threading
+import time
+
+import builds
+import jobs
+
+# what one build needs - rough numbers from building the isos
+cpus_per_build = 4
+memory_per_build = 4 << 30
+disk_per_build = 20 << 30
+# the git checkout of a flavor - mostly in /tmp, a tmpfs of half the memory
+disk_per_checkout = 1 << 30
+
+# a build that started less than this ago has not taken its memory and
+# disk yet - the scheduler keeps them aside for it
+ramp_up_seconds = 300
+
+# look at the free memory and disk again after this many seconds
+poll_seconds = 10.0
+
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory():
+    # MemAvailable from /proc/meminfo in bytes - None when we can not tell
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _existing(path):
+    # path or the folder above it that exists - where path will be made
+    while path and not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path or "/"
+
+
+def free_disk(path):
+    # free bytes on the filesystem path is on - or will be on
+    try:
+        return shutil.disk_usage(_existing(path)).free
+    except OSError:
+        return None
+
+
+def disk_needs(flavor):
+    """
+    {filesystem: (path, bytes)} of the space a build of flavor takes. The
+    output, work and build folders take disk_per_build, the checkout
+    disk_per_checkout when it is on a filesystem of its own.
+    """
+    needs = {}
+    for path in [flavor.output, flavor.work] + flavor.clean:
+        if path:
+            try:
+                needs[os.stat(_existing(path)).st_dev] = (path, disk_per_build)
+            except OSError:
+                pass
+    if flavor.checkout:
+        try:
+            device = os.stat(_existing(flavor.checkout)).st_dev
+        except OSError:
+            device = None
+        if device is not None and device not in needs:
+            needs[device] = (flavor.checkout, disk_per_checkout)
+    return needs
+
+
+def _paths(flavor):
+    # workdir is only the folder the checkout is made in - /root for some
+    # flavors, under which the others have their folders
+    return [
+        path.rstrip("/")
+        for path in [flavor.checkout, flavor.output, flavor.work] + flavor.clean
+        if path
+    ]
+
+
+def conflicts(first, second):
+    # two builds that use the same folders can not run at the same time
+    for one in _paths(first):
+        for other in _paths(second):
+            if one == other or one.startswith(other + "/") or other.startswith(one + "/"):
+                return True
+    return False
+
+
+class BuildQueue:
+    """
+    Runs the queued flavors - side by side when the machine has room.
+
+    run(flavor) does the build itself, on a worker of a JobExecutor with
+    one worker for every build that may run at the same time. Queueing a
+    flavor that is already queued or building does nothing.
+    """
+
+    def __init__(self, run, max_parallel=None, dispatch=None):
+        self.run = run
+        self.max_parallel = max_parallel or max(1, cpu_count() // cpus_per_build)
+        self.executor = jobs.JobExecutor(max_workers=self.max_parallel, dispatch=dispatch)
+        self.pending = []
+        # name -> time.monotonic() of the start
+        self.running = {}
+        self.jobs = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+
+    def add(self, names):
+        """
+        Queue the flavors in names, in that order. Returns the names that
+        were added - the others were already queued or building.
+        """
+        unknown = [name for name in names if name not in builds.flavors]
+        if unknown:
+            raise ValueError("Unknown flavor: " + ", ".join(unknown))
+
+        added = []
+        with self.condition:
+            for name in names:
+                if name in self.pending or name in self.running:
+                    logging.info("The %s iso is already queued - not adding it again", name)
+                    continue
+                self.pending.append(name)
+                added.append(name)
+            if added:
+                logging.info("Queued the isos: %s", ", ".join(added))
+                self.condition.notify_all()
+            # the scheduler clears thread under the condition when it is done
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._schedule, name="aag-build-queue", daemon=True
+                )
+                self.thread.start()
+        return added
+
+    def cancel(self, name):
+        # a queued build can be taken off - a running one finishes
+        with self.condition:
+            if name in self.pending:
+                self.pending.remove(name)
+                self.condition.notify_all()
+                return True
+        return False
+
+    def is_busy(self):
+        with self.condition:
+            return bool(self.pending or self.running)
+
+    def wait(self):
+        # block until every queued build has finished
+        with self.condition:
+            while self.pending or self.running:
+                self.condition.wait()
+
+    def stop(self):
+        # nothing new is started - running builds are allowed to finish
+        with self.condition:
+            self.pending = []
+            self.stopping = True
+            self.condition.notify_all()
+        self.executor.shutdown(wait=False)
+
+    def _fits(self, name, now):
+        """
+        Can name start now - next to the builds that are running.
+        The first build always starts, whatever the machine looks like.
+        """
+        if not self.running:
+            return True
+        if len(self.running) >= self.max_parallel:
+            return False
+
+        flavor = builds.flavors[name]
+        if any(conflicts(flavor, builds.flavors[other]) for other in self.running):
+            return False
+
+        # builds that just started still need what they are going to take
+        ramping = [
+            other for other, started in self.running.items() if now - started < ramp_up_seconds
+        ]
+
+        memory = available_memory()
+        if memory is not None and memory - len(ramping) * memory_per_build < memory_per_build:
+            logging.debug("Not enough free memory to start the %s iso yet", name)
+            return False
+
+        # every filesystem the build writes to - only the builds that write
+        # to the same one count against it
+        for device, (path, size) in disk_needs(flavor).items():
+            disk = free_disk(path)
+            if disk is None:
+                continue
+            taken = sum(
+                disk_needs(builds.flavors[other]).get(device, (None, 0))[1] for other in ramping
+            )
+            if disk - taken < size:
+                logging.debug("Not enough free disk space in %s for the %s iso yet", path, name)
+                return False
+        return True
+
+    def _schedule(self):
+        with self.condition:
+            try:
+                while not self.stopping and (self.pending or self.running):
+                    now = time.monotonic()
+                    # in queue order - but a build that has to wait for another
+                    # one does not hold up the builds behind it
+                    for name in list(self.pending):
+                        if self._fits(name, now):
+                            self._start(name, now)
+                    self.condition.wait(poll_seconds)
+            finally:
+                # still under the condition - an add() after this starts a
+                # new scheduler, one before it was seen by the loop
+                self.thread = None
+
+    def _start(self, name, now):
+        self.pending.remove(name)
+        self.running[name] = now
+        logging.info(
+            "Starting the %s iso - %d building, %d queued",
+            name,
+            len(self.running),
+            len(self.pending),
+        )
+        self.jobs[name] = self.executor.submit("Building the " + name + " iso", self._run, name)
+
+    def _run(self, name):
+        try:
+            return self.run(builds.flavors[name])
+        finally:
+            with self.condition:
+                self.running.pop(name, None)
+                self.condition.notify_all()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The isos the app can build - one table of flavors and one way to build them
+# Used by the Gui and by the command line, nothing in here imports GTK
+
+import logging
+import os
+import shutil
+import time
+
+import buildlog
+import catalog
+import cgroup
+import checksums
+import core
+import delta
+import fingerprint
+import gitcache
+import pacman_conf as pconf
+import phases
+
+# download the packages of the profiles before the build starts
+use_prefetch = True
+# .zsync files and the overlap with the previous iso - see delta.py
+use_delta = False
+
+releng = "/usr/share/archiso/configs/releng/"
+
+HINT_PACKAGES = [
+    "Sometimes you have to try and build it a second time",
+    "for it to work because of the special packages from AUR and repos",
+]
+HINT_NETWORK = [
+    "Sometimes you have to try and build it a second time",
+    "for it to work because of servers and network connections",
+]
+HINT_KEYS = [
+    "Sometimes you have to try and build it a second time",
+    "for it to work because of keys, servers and network connections",
+]
+
+
+class BuildError(Exception):
+    pass
+
+
+class Flavor:
+    """
+    One iso we can build.
+
+    command runs in workdir - after url is checked out in checkout, or the
+    archiso profile is copied there - and leaves the iso in output. output
+    is moved to the home directory of the user as outname. The folders in
+    clean are removed before the build. work is the work folder mkarchiso
+    keeps between builds, see fingerprint.py.
+    """
+
+    def __init__(
+        self,
+        name,
+        title,
+        command,
+        workdir,
+        output,
+        outname,
+        url=None,
+        checkout=None,
+        profile=None,
+        packages=("archiso",),
+        clean=(),
+        arco_repos=False,
+        hint=(),
+        work=None,
+    ):
+        self.name = name
+        self.title = title
+        self.command = list(command)
+        self.workdir = workdir
+        self.output = output
+        self.outname = outname
+        self.url = url
+        self.checkout = checkout
+        self.profile = profile
+        self.packages = list(packages)
+        self.clean = list(clean)
+        self.arco_repos = arco_repos
+        self.hint = list(hint)
+        self.work = work
+
+
+def _arcolinux(name):
+    # the ArcoLinux isos share one build script layout
+    return Flavor(
+        name,
+        "ArcoLinux",
+        ["./40-build-the-iso-local-again.sh"],
+        "/tmp/" + name + "/installation-scripts",
+        "/root/" + name + "-Out",
+        name + "-Out",
+        url="https://github.com/arconetpro/" + name + "-iso",
+        checkout="/tmp/" + name,
+        packages=["archiso", "grub"],
+        clean=["/root/" + name + "-Out"],
+        arco_repos=True,
+        hint=HINT_PACKAGES,
+    )
+
+
+def _alis(name, title, url):
+    # Ariser and Sierra are built with alis
+    return Flavor(
+        name,
+        title,
+        ["./build-archlinux-with-alis.sh"],
+        "/tmp/" + name,
+        "/root/" + title + "-Out",
+        title + "-Out",
+        url=url,
+        checkout="/tmp/" + name,
+        clean=["/root/" + title + "-Out", "/root/" + title + "-build"],
+        hint=HINT_NETWORK,
+    )
+
+
+# in the order of the Gui
+flavors = {
+    flavor.name: flavor
+    for flavor in [
+        _arcolinux("arconet"),
+        _arcolinux("arcopro"),
+        _arcolinux("arcoplasma"),
+        Flavor(
+            "archlinux",
+            "Arch Linux",
+            [
+                # no -r - the work folder is used again by the next build
+                "mkarchiso",
+                "-v",
+                "-w",
+                "/root/work",
+                "-o",
+                "/root/archlinux-Out",
+                "/tmp/archlinux",
+            ],
+            "/root",
+            "/root/archlinux-Out",
+            "archlinux-Out",
+            # a copy - /usr/share belongs to the archiso package
+            checkout="/tmp/archlinux",
+            profile=releng,
+            clean=["/tmp/archlinux"],
+            work="/root/work",
+        ),
+        _alis("ariser", "Ariser", "https://github.com/ariser-installer/ariser.git"),
+        _alis("sierra", "Sierra", "https://github.com/ariser-installer/sierra.git"),
+        Flavor(
+            "arcoinstall",
+            "Arcoinstall",
+            ["./build_iso.sh"],
+            "/tmp/arcoinstall",
+            "/tmp/archlive/out",
+            "arcoinstall-Out",
+            url="https://github.com/arconetpro/arcoinstall.git",
+            checkout="/tmp/arcoinstall",
+            clean=["/tmp/archlive"],
+            hint=HINT_KEYS,
+        ),
+    ]
+}
+
+
+def _no_report(step, **details):
+    pass
+
+
+def _tracking(report, tracker):
+    # the steps of a build are phases as well - see phases.STEPS
+    def track(step, **details):
+        if step in phases.STEPS:
+            tracker.enter(step)
+        report(step, **details)
+
+    return track
+
+
+def find_profiles(top):
+    # the archiso profiles below top - a folder with a profiledef.sh
+    found = []
+    for root, dirs, files in os.walk(top):
+        if "profiledef.sh" in files:
+            found.append(root)
+            # a profile does not hold another profile
+            dirs[:] = []
+            continue
+        dirs[:] = [name for name in dirs if name not in (".git", "airootfs")]
+    return found
+
+
+def use_shared_cache(top):
+    """
+    Point the pacman.conf of every archiso profile below top at the shared
+    package cache. mkarchiso takes the CacheDir of the profile when it is
+    not the default. The pacman cache of the host comes second - it is
+    only read from.
+    """
+    os.makedirs(core.build_package_cache, mode=0o755, exist_ok=True)
+    for profile in find_profiles(top):
+        path = os.path.join(profile, "pacman.conf")
+        if not os.path.isfile(path):
+            continue
+        try:
+            conf = pconf.PacmanConf.load(path)
+            if conf.set_value(
+                "options", "CacheDir", core.build_package_cache + " " + core.pacman_cache
+            ):
+                conf.save()
+                logging.info("%s uses the shared package cache", path)
+        except Exception as error:
+            logging.error(error)
+
+
+def build_inputs(flavor, report):
+    """
+    What goes into a build of flavor - see fingerprint.inputs. pacman
+    resolves the packages of every profile below the checkout, and when
+    use_prefetch is set they are downloaded into the shared cache before
+    mkarchiso starts. A prefetch that fails is not fatal: what is still
+    missing is downloaded by mkarchiso as before.
+    """
+    # asyncio only when a build runs - see core.rank_arch_mirrors
+    import prefetch
+
+    profiles = find_profiles(flavor.checkout)
+    packages = {}
+    for profile in profiles:
+        report("resolve", profile=profile)
+        try:
+            resolved = prefetch.resolve_profile(profile)
+        except Exception as error:
+            logging.warning("Could not resolve the packages of %s : %s", profile, error)
+            packages[profile] = None
+            continue
+        packages[profile] = [package.filename for package in resolved]
+        if not use_prefetch:
+            continue
+
+        report("prefetch", profile=profile)
+        try:
+            result = prefetch.prefetch_profile(profile, packages=resolved)
+        except Exception as error:
+            logging.warning("No prefetch for %s : %s", profile, error)
+            continue
+        logging.info(
+            "Prefetched for %s : %d downloaded, %d in the cache, %d failed in %.0f s",
+            profile,
+            len(result.fetched),
+            len(result.reused),
+            len(result.failed),
+            result.seconds,
+        )
+        report("prefetched", profile=profile, **result.as_dict())
+
+    commit = None
+    if flavor.url:
+        try:
+            commit = gitcache.commit(flavor.checkout)
+        except Exception as error:
+            logging.warning(error)
+    return fingerprint.inputs(flavor, commit, profiles, packages)
+
+
+def prepare(flavor):
+    # the packages and repos the build needs and a clean slate
+    # builds that run side by side take turns to prepare - see core.pacman_lock
+    with core.pacman_lock:
+        for package in flavor.packages:
+            core.install_package(None, package)
+
+        if flavor.arco_repos and (
+            not core.check_package_installed("arcolinux-keyring")
+            or not core.check_package_installed("arcolinux-mirrorlist-git")
+        ):
+            logging.info("Installing the ArcoLinux keyring and mirrorlist")
+            core.install_arcolinux_key_mirror(None)
+            core.add_repos()
+
+    logging.info("Let's remove any old previous building folders")
+    for directory in flavor.clean:
+        if os.path.isdir(directory):
+            core.remove_dir(None, directory)
+
+
+def build(
+    flavor,
+    terminal=None,
+    destination=None,
+    output=None,
+    report=None,
+    force=False,
+    listener=None,
+):
+    """
+    Build flavor and move the iso to the home directory of the user - or to
+    the folder destination. Returns the folder the iso ended up in.
+
+    When nothing that goes into the iso changed since the last good build
+    and its iso is still there, the build is skipped - unless force is set.
+
+    terminal is a command prefix to run the build in, like ["alacritty", "-e"].
+    The output of the build goes to a log file of its own, to output - a
+    text file like sys.stderr - and to listener(name, lines), see buildlog.py.
+    report(step, **details) is called at the start of every step.
+    Raises BuildError when a step fails.
+
+    Every build - good, failed or skipped - is written down in the catalog,
+    see catalog.py.
+    """
+    # the details of the steps end up in the catalog
+    steps = {}
+    outer = report or _no_report
+
+    def remember(step, **details):
+        steps[step] = details
+        outer(step, **details)
+
+    started = time.time()
+    try:
+        target = _build(flavor, terminal, destination, output, remember, force, listener)
+    except Exception as error:
+        _catalog(flavor, catalog.FAILED, started, steps, error=str(error))
+        raise
+    state = catalog.SKIPPED if "skipped" in steps else catalog.DONE
+    _catalog(flavor, state, started, steps, target=target)
+    return target
+
+
+def _catalog(flavor, state, started, steps, target=None, error=None):
+    # a build does not fail for its entry in the catalog
+    inputs = steps.get("inputs", {})
+    artifacts = []
+    if state == catalog.DONE:
+        artifacts = [os.path.join(target, name) for name in steps.get("move", {}).get("isos", [])]
+    # the checksum step hashed them already
+    sums = steps.get("checked", {}).get("sums", {})
+    try:
+        catalog.add_build(
+            flavor.name,
+            state,
+            started,
+            git_commit=inputs.get("commit"),
+            fingerprint=inputs.get("fingerprint"),
+            packages=inputs.get("packages"),
+            target=target,
+            error=error,
+            phases=steps.get("phases", {}).get("phases"),
+            usage=steps.get("usage"),
+            artifacts=artifacts,
+            sha256={path: digests.get("sha256") for path, digests in sums.items()},
+        )
+    except Exception as error:
+        logging.error(error)
+
+
+def _build(flavor, terminal, destination, output, report, force, listener):
+    tracker = phases.Tracker()
+    report = _tracking(report or _no_report, tracker)
+    target = os.path.join(destination or core.home, flavor.outname)
+    logging.info("%s iso selection is: %s", flavor.title, flavor.name)
+
+    report("prepare")
+    prepare(flavor)
+
+    if flavor.url:
+        # git clone the iso scripts - from the local mirror, see gitcache.py
+        report("checkout", url=flavor.url)
+        logging.info("git cloning the build folder")
+        try:
+            gitcache.checkout(flavor.url, flavor.checkout)
+        except Exception as error:
+            raise BuildError("Could not check out {} : {}".format(flavor.url, error))
+
+    if flavor.profile:
+        logging.info("Copying the %s profile to %s", flavor.profile, flavor.checkout)
+        if os.path.isdir(flavor.checkout):
+            core.remove_dir(None, flavor.checkout)
+        shutil.copytree(flavor.profile, flavor.checkout, symlinks=True)
+
+    values = None
+    if flavor.checkout:
+        # every build downloads into the same cache
+        use_shared_cache(flavor.checkout)
+        values = build_inputs(flavor, report)
+        report(
+            "inputs",
+            commit=values["commit"],
+            fingerprint=fingerprint.fingerprint(values),
+            packages=catalog.packages_fingerprint(values["packages"]),
+        )
+        if not force and fingerprint.up_to_date(flavor.name, values, target):
+            logging.info(
+                "Nothing changed for the %s iso since the last build - see %s",
+                flavor.name,
+                target,
+            )
+            report("skipped", destination=target)
+            return target
+        if flavor.work:
+            report("work", state=fingerprint.prepare_work(flavor.name, values, flavor.work))
+
+    def listen(name, lines):
+        # the output shows which phase the build is in
+        tracker.feed(name, lines)
+        if listener is not None:
+            listener(name, lines)
+
+    # the output is kept - see buildlog.py
+    log = buildlog.BuildLog(flavor.name, listener=listen, echo=output)
+    if terminal:
+        # the terminal shows the output, tee copies it to the log
+        command = list(terminal) + buildlog.tee_command(flavor.command, log.path)
+        log.follow()
+    else:
+        command = list(flavor.command)
+        log.open()
+    report("build", command=command, workdir=flavor.workdir, log=log.path)
+    if flavor.hint:
+        logging.info("#################################################################")
+        for line in flavor.hint:
+            logging.info(line)
+        logging.info("#################################################################")
+    logging.info("Applying this command: %s in %s", " ".join(command), flavor.workdir)
+    # in a cgroup of its own - see cgroup.py
+    unit = "aag-build-{}-{}".format(flavor.name, int(time.time()))
+    try:
+        returncode, usage = cgroup.run(
+            command, unit, cwd=flavor.workdir, on_output=None if terminal else log.feed
+        )
+    except OSError as error:
+        raise BuildError("Could not start {} : {}".format(command[0], error))
+    finally:
+        log.close()
+    logging.info("The %s build took %s", flavor.name, usage.summary())
+    report("usage", **usage.as_dict())
+    if returncode != 0:
+        raise BuildError(
+            "The {} build failed with return code {}".format(flavor.name, returncode)
+        )
+    if not os.path.exists(flavor.output):
+        raise BuildError("The {} build left no iso in {}".format(flavor.name, flavor.output))
+
+    # Moving the iso to home directory of the user
+    built = fingerprint.isos(flavor.output)
+    report("move", destination=target, isos=sorted(built))
+    logging.info("Move folder to home directory of the user")
+    core.move_to_home(flavor.output, target)
+
+    # .sha256 and .b2sum next to every iso - see checksums.py
+    report("checksums")
+    try:
+        sums = checksums.write_sidecars([os.path.join(target, name) for name in sorted(built)])
+        report("checked", sums=sums)
+    except Exception as error:
+        logging.error(error)
+
+    if use_delta:
+        report("delta")
+        for name in sorted(built):
+            try:
+                report("overlap", **delta.publish(flavor.name, os.path.join(target, name)))
+            except Exception as error:
+                logging.error(error)
+
+    durations = tracker.finish()
+    logging.info("The phases of the %s build : %s", flavor.name, phases.summary(durations))
+    regressions = phases.compare(durations, fingerprint.last_phases(flavor.name))
+    phases.log_regressions(flavor.name, regressions)
+    report("phases", phases=durations, regressions=regressions)
+    if values is not None:
+        try:
+            fingerprint.record_success(
+                flavor.name, values, target, built, durations, tracker.timeline()
+            )
+        except Exception as error:
+            logging.error(error)
+    logging.info("Check %s for the iso", target)
+    return target
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Every build the app ran - when, from which commit and packages, how long
+# it took and which isos it left where - in a small SQLite database
+# The indexes cover the questions the Gui and the command line ask, like
+# the latest good build of a flavor, so they stay instant as builds pile up
+# One connection per call - builds that run side by side each write their
+# own row, WAL lets the Gui read meanwhile
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+db_path = "/var/lib/arcolinux-app-glade/catalog.db"
+
+# bump with a new entry in MIGRATIONS when the tables change
+MIGRATIONS = [
+    """
+    CREATE TABLE builds (
+        id INTEGER PRIMARY KEY,
+        flavor TEXT NOT NULL,
+        state TEXT NOT NULL,
+        started REAL NOT NULL,
+        finished REAL NOT NULL,
+        seconds REAL NOT NULL,
+        git_commit TEXT,
+        fingerprint TEXT,
+        packages TEXT,
+        target TEXT,
+        error TEXT,
+        phases TEXT,
+        usage TEXT
+    );
+    CREATE TABLE artifacts (
+        id INTEGER PRIMARY KEY,
+        build_id INTEGER NOT NULL REFERENCES builds(id) ON DELETE CASCADE,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT
+    );
+    CREATE INDEX builds_flavor_state ON builds(flavor, state, finished DESC);
+    CREATE INDEX builds_finished ON builds(finished DESC);
+    CREATE INDEX artifacts_build ON artifacts(build_id);
+    CREATE INDEX artifacts_sha256 ON artifacts(sha256);
+    """,
+]
+
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def connect(path=None):
+    # a connection with the tables in place - rows can be read by name
+    path = path or db_path
+    os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    for number in range(version, len(MIGRATIONS)):
+        with connection:
+            connection.executescript(MIGRATIONS[number])
+            connection.execute("PRAGMA user_version = {}".format(number + 1))
+    return connection
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def packages_fingerprint(packages):
+    # one hash for the package files of all profiles - see fingerprint.inputs
+    return hashlib.sha256(json.dumps(packages, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def add_build(
+    flavor,
+    state,
+    started,
+    finished=None,
+    git_commit=None,
+    fingerprint=None,
+    packages=None,
+    target=None,
+    error=None,
+    phases=None,
+    usage=None,
+    artifacts=(),
+    sha256=None,
+    path=None,
+):
+    """
+    Write down one build. artifacts are file paths - their size is read now,
+    their sha256 too unless sha256 {path: digest} has it. Returns the id of
+    the build.
+    """
+    finished = finished or time.time()
+    sha256 = sha256 or {}
+    rows = []
+    for artifact in artifacts:
+        try:
+            digest = sha256.get(artifact) or hash_file(artifact)
+            rows.append((artifact, os.path.getsize(artifact), digest))
+        except OSError as error:
+            logging.warning("Can not add %s to the catalog : %s", artifact, error)
+
+    with closing(connect(path)) as connection, connection:
+        cursor = connection.execute(
+            "INSERT INTO builds (flavor, state, started, finished, seconds, git_commit,"
+            " fingerprint, packages, target, error, phases, usage)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                flavor,
+                state,
+                started,
+                finished,
+                round(finished - started, 1),
+                git_commit,
+                fingerprint,
+                packages,
+                target,
+                error,
+                json.dumps(phases) if phases else None,
+                json.dumps(usage) if usage else None,
+            ),
+        )
+        build_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO artifacts (build_id, path, size, sha256) VALUES (?, ?, ?, ?)",
+            [(build_id,) + row for row in rows],
+        )
+    logging.info("The %s build is number %d in the catalog", flavor, build_id)
+    return build_id
+
+
+def history(flavor=None, state=None, limit=100, path=None):
+    # the latest builds first - with the number and total size of their isos
+    where = []
+    values = []
+    if flavor:
+        where.append("b.flavor = ?")
+        values.append(flavor)
+    if state:
+        where.append("b.state = ?")
+        values.append(state)
+    query = (
+        "SELECT b.*, COUNT(a.id) AS artifacts, COALESCE(SUM(a.size), 0) AS size"
+        " FROM builds b LEFT JOIN artifacts a ON a.build_id = b.id"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + " GROUP BY b.id ORDER BY b.finished DESC LIMIT ?"
+    )
+    values.append(limit)
+    with closing(connect(path)) as connection:
+        return [dict(row) for row in connection.execute(query, values)]
+
+
+def latest(flavor, state=DONE, path=None):
+    # the last build of flavor in state - None when there is none
+    with closing(connect(path)) as connection:
+        row = connection.execute(
+            "SELECT * FROM builds WHERE flavor = ? AND state = ? ORDER BY finished DESC LIMIT 1",
+            (flavor, state),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def artifacts(build_id, path=None):
+    with closing(connect(path)) as connection:
+        return [
+            dict(row)
+            for row in connection.execute(
+                "SELECT * FROM artifacts WHERE build_id = ? ORDER BY path", (build_id,)
+            )
+        ]
+
+
+def latest_iso(flavor, path=None):
+    # the newest iso of the last good build of flavor that is still there
+    build = latest(flavor, path=path)
+    if build is None:
+        return None
+    for artifact in artifacts(build["id"], path=path):
+        if os.path.exists(artifact["path"]):
+            return artifact
+    return None
+
+
+def find_artifact(sha256, path=None):
+    # the builds that made a file with this sha256
+    with closing(connect(path)) as connection:
+        return [
+            dict(row)
+            for row in connection.execute(
+                "SELECT a.*, b.flavor, b.finished FROM artifacts a"
+                " JOIN builds b ON b.id = a.build_id WHERE a.sha256 = ?"
+                " ORDER BY b.finished DESC",
+                (sha256,),
+            )
+        ]
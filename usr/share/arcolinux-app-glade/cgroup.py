@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The builds run in a transient systemd scope - a cgroup of their own
+# A low cpu and io weight and a memory.high keep the desktop usable while
+# mksquashfs compresses, and the cgroup tells us what the build cost
+# Without systemd the build runs as a plain child and we fall back to rusage
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+# 100 is what every other service gets - lower yields under contention
+cpu_weight = 20
+io_weight = 20
+# above this the kernel throttles and reclaims - a percentage of the ram
+memory_high = "75%"
+
+# seconds between two looks at the cgroup while the build runs
+poll_seconds = 1.0
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+class Usage:
+    # what one build cost - source is "cgroup" or "rusage"
+    def __init__(self):
+        self.source = "rusage"
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.memory_peak = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+    def as_dict(self):
+        return {
+            "source": self.source,
+            "seconds": round(self.seconds, 1),
+            "cpu_seconds": round(self.cpu_seconds, 1),
+            "memory_peak": self.memory_peak,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+        }
+
+    def summary(self):
+        return "{:.0f} s, {:.0f} cpu s, peak memory {:.2f} GiB, read {:.2f} GiB, written {:.2f} GiB ({})".format(
+            self.seconds,
+            self.cpu_seconds,
+            self.memory_peak / (1 << 30),
+            self.read_bytes / (1 << 30),
+            self.write_bytes / (1 << 30),
+            self.source,
+        )
+
+
+def available():
+    # a running systemd and the unified cgroup hierarchy
+    return (
+        os.geteuid() == 0
+        and shutil.which("systemd-run") is not None
+        and os.path.isdir("/run/systemd/system")
+        and os.path.isfile(os.path.join(CGROUP_ROOT, "cgroup.controllers"))
+    )
+
+
+def scope_command(command, unit):
+    # systemd-run --scope execs the command in a new scope - same pid, same stdout
+    return [
+        "systemd-run",
+        "--scope",
+        "--quiet",
+        "--collect",
+        "--unit",
+        unit,
+        "-p",
+        "CPUWeight={}".format(cpu_weight),
+        "-p",
+        "IOWeight={}".format(io_weight),
+        "-p",
+        "MemoryHigh={}".format(memory_high),
+        "--",
+    ] + list(command)
+
+
+def _cgroup_of(pid, unit):
+    # the cgroup folder of pid - once systemd moved it into the scope
+    try:
+        with open("/proc/{}/cgroup".format(pid), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    path = line[3:].strip()
+                    if path.endswith("/" + unit + ".scope"):
+                        return CGROUP_ROOT + path
+    except OSError:
+        pass
+    return None
+
+
+def _read_keys(path):
+    values = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 2 and fields[1].isdigit():
+                values[fields[0]] = int(fields[1])
+    return values
+
+
+def _read_int(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return int(f.read().strip())
+
+
+def _read_io(path):
+    # io.stat - one line per device: "8:0 rbytes=.. wbytes=.. rios=.."
+    read = written = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key == "rbytes":
+                    read += int(value)
+                elif key == "wbytes":
+                    written += int(value)
+    return read, written
+
+
+def sample(cgroup, usage):
+    """
+    Read the counters of cgroup into usage. The counters only go up, so
+    the last sample before the scope goes away is the total.
+    memory.peak is kernel 5.19 and later - before that we keep the highest
+    memory.current we saw.
+    """
+    try:
+        usage.cpu_seconds = _read_keys(os.path.join(cgroup, "cpu.stat"))["usage_usec"] / 1e6
+        try:
+            peak = _read_int(os.path.join(cgroup, "memory.peak"))
+        except OSError:
+            peak = _read_int(os.path.join(cgroup, "memory.current"))
+        usage.memory_peak = max(usage.memory_peak, peak)
+        try:
+            usage.read_bytes, usage.write_bytes = _read_io(os.path.join(cgroup, "io.stat"))
+        except OSError:
+            pass
+        usage.source = "cgroup"
+        return True
+    except (OSError, KeyError, ValueError):
+        return False
+
+
+def _watch(process, unit, usage, stop):
+    cgroup = None
+    while not stop.wait(poll_seconds if cgroup else 0.1):
+        if cgroup is None:
+            cgroup = _cgroup_of(process.pid, unit)
+        if cgroup is not None and not sample(cgroup, usage):
+            # the scope is gone - the build is over
+            return
+
+
+def _pump(pipe, on_output):
+    # the output of the build as it comes - os.read returns what is there
+    with pipe:
+        for chunk in iter(lambda: os.read(pipe.fileno(), 1 << 16), b""):
+            on_output(chunk)
+
+
+def run(command, unit, cwd=None, stdout=None, on_output=None):
+    """
+    Run command to the end in its own scope named unit - or as a plain
+    child when there is no systemd. Returns (returncode, Usage).
+    With on_output the output goes through a pipe to on_output(chunk)
+    instead of to stdout.
+    """
+    usage = Usage()
+    isolated = available()
+    if isolated:
+        command = scope_command(command, unit)
+    else:
+        logging.info("No systemd scope for %s - running it as a plain child", unit)
+
+    started = time.monotonic()
+    process = subprocess.Popen(
+        command,
+        shell=False,
+        cwd=cwd,
+        stdout=subprocess.PIPE if on_output else stdout,
+        stderr=subprocess.STDOUT,
+    )
+    pump = None
+    if on_output:
+        pump = threading.Thread(
+            target=_pump, args=(process.stdout, on_output), name="aag-output", daemon=True
+        )
+        pump.start()
+    stop = threading.Event()
+    watcher = None
+    if isolated:
+        watcher = threading.Thread(
+            target=_watch, args=(process, unit, usage, stop), name="aag-cgroup", daemon=True
+        )
+        watcher.start()
+
+    # wait4 instead of wait - the rusage of the build comes with it
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    usage.seconds = time.monotonic() - started
+    stop.set()
+    if watcher is not None:
+        watcher.join()
+    if pump is not None:
+        # a daemon the build started may hold the pipe open - do not wait for it
+        pump.join(5)
+
+    if usage.source != "cgroup":
+        # rusage covers the build and the children it waited for
+        # ru_maxrss is the largest single process, not the sum
+        usage.cpu_seconds = rusage.ru_utime + rusage.ru_stime
+        usage.memory_peak = rusage.ru_maxrss * 1024
+        usage.read_bytes = rusage.ru_inblock * 512
+        usage.write_bytes = rusage.ru_oublock * 512
+    return process.returncode, usage
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Checksums of the isos - written next to them as .sha256 and .b2sum files
+# in the format of sha256sum and b2sum, so testers can run sha256sum -c
+# Every file is read once for all algorithms into one reused buffer, and
+# hashlib lets go of the GIL while it hashes - files are done side by side
+
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# algorithm -> (sidecar suffix, hashlib name)
+ALGORITHMS = {
+    "sha256": (".sha256", "sha256"),
+    # b2sum is BLAKE2b with a 512 bit digest - the hashlib default
+    "b2": (".b2sum", "blake2b"),
+}
+
+buffer_size = 8 << 20
+max_workers = 4
+
+
+def hash_file(path, algorithms=tuple(ALGORITHMS)):
+    # {algorithm: hex digest} of path in one pass
+    hashers = {name: hashlib.new(ALGORITHMS[name][1]) for name in algorithms}
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            for hasher in hashers.values():
+                hasher.update(view[:size])
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+def hash_files(paths, algorithms=tuple(ALGORITHMS), workers=None):
+    """
+    {path: {algorithm: hex digest}} of every path - a few files at a time.
+    A file that can not be read is left out and logged.
+    """
+    return _hash_all({path: algorithms for path in paths}, workers)
+
+
+def _hash_all(todo, workers=None):
+    # todo is {path: algorithms}
+    if not todo:
+        return {}
+    workers = workers or min(len(todo), max_workers, os.cpu_count() or 1)
+    sums = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aag-checksum") as pool:
+        futures = {path: pool.submit(hash_file, path, names) for path, names in todo.items()}
+        for path, future in futures.items():
+            try:
+                sums[path] = future.result()
+            except OSError as error:
+                logging.error("Can not hash %s : %s", path, error)
+    return sums
+
+
+def _write_sidecar(path, suffix, digest):
+    # "<digest>  <name>" - the name without the folder, like sha256sum in it
+    sidecar = path + suffix
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".checksum.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("{}  {}\n".format(digest, os.path.basename(path)))
+        os.chmod(tmp, 0o644)
+        info = os.stat(path)
+        # the sidecar belongs to whoever owns the iso - the user in their home
+        os.chown(tmp, info.st_uid, info.st_gid)
+        os.replace(tmp, sidecar)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return sidecar
+
+
+def write_sidecars(paths, algorithms=tuple(ALGORITHMS), workers=None):
+    """
+    Hash paths and write a sidecar per file and algorithm next to it.
+    Returns {path: {algorithm: hex digest}}.
+    """
+    sums = hash_files(paths, algorithms, workers)
+    for path, digests in sums.items():
+        for name, digest in digests.items():
+            _write_sidecar(path, ALGORITHMS[name][0], digest)
+        logging.info("Wrote the checksums of %s", path)
+    return sums
+
+
+def read_sidecar(sidecar):
+    # [(digest, file name)] from a sha256sum or b2sum file
+    entries = []
+    with open(sidecar, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.strip().split(None, 1)
+            if len(fields) != 2:
+                continue
+            # a "*" in front of the name is the binary mode of the coreutils
+            entries.append((fields[0].lower(), fields[1].lstrip("*")))
+    return entries
+
+
+class Check:
+    def __init__(self, path, algorithm, expected, actual=None):
+        self.path = path
+        self.algorithm = algorithm
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def state(self):
+        if self.actual is None:
+            return "missing"
+        return "ok" if self.actual == self.expected else "mismatch"
+
+
+def verify(folders, workers=None):
+    """
+    Check every file that has a .sha256 or .b2sum sidecar in folders.
+    A file with both is read once. Returns a list of Check.
+    """
+    suffixes = {suffix: name for name, (suffix, _) in ALGORITHMS.items()}
+    # path -> [(algorithm, expected)]
+    wanted = {}
+    for folder in folders:
+        try:
+            names = sorted(os.listdir(folder))
+        except OSError as error:
+            logging.error("Can not read %s : %s", folder, error)
+            continue
+        for name in names:
+            suffix = os.path.splitext(name)[1]
+            if suffix not in suffixes:
+                continue
+            for digest, target in read_sidecar(os.path.join(folder, name)):
+                path = os.path.join(folder, target)
+                wanted.setdefault(path, []).append((suffixes[suffix], digest))
+
+    sums = _hash_all(
+        {
+            path: tuple(sorted({name for name, _ in expected}))
+            for path, expected in wanted.items()
+            if os.path.isfile(path)
+        },
+        workers,
+    )
+
+    checks = []
+    for path, expected in wanted.items():
+        for name, digest in expected:
+            check = Check(path, name, digest, sums.get(path, {}).get(name))
+            if check.state != "ok":
+                logging.warning("%s check of %s : %s", name, path, check.state)
+            checks.append(check)
+    return checks
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The ArcoLinux App without a Gui - for build servers and scripts
+#
+#   arcolinux-app-glade build arcopro [arconet ...] [--output DIR] [--jobs N] [--force]
+#   arcolinux-app-glade mirrors rank [--count 10]
+#   arcolinux-app-glade cache clean [--builds]
+#   arcolinux-app-glade cache prefetch PROFILE [--jobs 4]
+#   arcolinux-app-glade proxy serve [--port 7878] [--store DIR] [--max-size GIB]
+#   arcolinux-app-glade proxy point|unpoint URL
+#   arcolinux-app-glade history [flavor] [--limit 20] [--latest]
+#   arcolinux-app-glade list
+#
+# More than one flavor is built side by side when the machine has room
+# Progress goes to stdout as one JSON object per line, the log and the
+# output of the build scripts go to stderr and to the log folder
+# Exit codes: 0 done, 1 failed, 2 wrong usage, 3 not run as root
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import core
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NOT_ROOT = 3
+
+LOGGING_FORMAT = "%Y-%m-%d-%H-%M-%S"
+
+
+# builds run side by side - their lines must not run into each other
+_emit_lock = threading.Lock()
+
+
+def emit(event, **fields):
+    # one line of progress on stdout
+    record = {"event": event, "time": round(time.time(), 3)}
+    record.update(fields)
+    with _emit_lock:
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+
+def setup_logging():
+    handlers = [logging.StreamHandler(sys.stderr)]
+    try:
+        os.makedirs(core.log_dir, exist_ok=True)
+        handlers.append(
+            logging.FileHandler(
+                core.log_dir
+                + "arcolinux-app-cli-{}.log".format(datetime.now().strftime(LOGGING_FORMAT))
+            )
+        )
+    except OSError:
+        pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s:%(levelname)s : %(message)s",
+        datefmt=LOGGING_FORMAT,
+        handlers=handlers,
+    )
+
+
+def _direct(func, *args):
+    # no main loop here - job callbacks are called right away
+    return func(*args)
+
+
+def cmd_build(args):
+    import buildqueue
+    import builds
+
+    unknown = [name for name in args.flavors if name not in builds.flavors]
+    if unknown:
+        emit("error", message="Unknown flavor: " + ", ".join(unknown))
+        return EXIT_USAGE
+
+    results = {}
+
+    def run(flavor):
+        name = flavor.name
+        started = time.monotonic()
+        emit("build", flavor=name, state="started")
+
+        def report(step, **details):
+            emit("step", flavor=name, step=step, **details)
+
+        try:
+            target = builds.build(
+                flavor,
+                destination=args.output,
+                output=sys.stderr,
+                report=report,
+                force=args.force,
+            )
+        except Exception as error:
+            logging.error(error)
+            results[name] = False
+            emit(
+                "build",
+                flavor=name,
+                state="failed",
+                error=str(error),
+                seconds=round(time.monotonic() - started, 1),
+            )
+            return None
+        results[name] = True
+        emit(
+            "build",
+            flavor=name,
+            state="done",
+            output=target,
+            seconds=round(time.monotonic() - started, 1),
+        )
+        return target
+
+    import cgroup
+
+    builds.use_prefetch = not args.no_prefetch
+    builds.use_delta = args.zsync
+    for name in ("cpu_weight", "io_weight", "memory_high"):
+        if getattr(args, name) is not None:
+            setattr(cgroup, name, getattr(args, name))
+
+    # one queue for all of them - see buildqueue.py
+    queue = buildqueue.BuildQueue(run, max_parallel=args.jobs, dispatch=_direct)
+    added = queue.add(args.flavors)
+    emit("queue", flavors=added, parallel=queue.max_parallel)
+    queue.wait()
+    queue.stop()
+    return EXIT_OK if all(results.get(name) for name in added) else EXIT_FAILED
+
+
+def cmd_mirrors_rank(args):
+    servers = core.rank_arch_mirrors(args.count, https_only=args.https_only)
+    emit("mirrors", mirrorlist=core.mirrorlist, servers=servers)
+    return EXIT_OK if servers else EXIT_FAILED
+
+
+def cmd_cache_clean(args):
+    cleaned = core.clean_pacman_cache(include_builds=args.builds)
+    emit("cache", cleaned=cleaned)
+    return EXIT_OK if cleaned else EXIT_FAILED
+
+
+def cmd_cache_prefetch(args):
+    import prefetch
+
+    result = prefetch.prefetch_profile(args.profile, concurrency=args.jobs)
+    emit("prefetch", profile=args.profile, **result.as_dict())
+    return EXIT_FAILED if result.failed else EXIT_OK
+
+
+def cmd_proxy_serve(args):
+    import pkgproxy
+
+    emit("proxy", state="serving", port=args.port, store=args.store)
+    proxy = pkgproxy.serve(store=args.store, port=args.port, size=int(args.max_size * (1 << 30)))
+    emit("proxy", state="stopped", **proxy.stats)
+    return EXIT_OK
+
+
+def cmd_proxy_point(args):
+    import pkgproxy
+
+    if args.action == "point":
+        pkgproxy.point_mirrorlist(args.url)
+    else:
+        pkgproxy.unpoint_mirrorlist(args.url)
+    emit("mirrors", mirrorlist=core.mirrorlist, proxy=args.url, action=args.action)
+    return EXIT_OK
+
+
+def cmd_checksum_write(args):
+    import checksums
+
+    sums = checksums.write_sidecars(args.files, workers=args.jobs)
+    for path, digests in sums.items():
+        emit("checksum", path=path, **digests)
+    return EXIT_OK if len(sums) == len(args.files) else EXIT_FAILED
+
+
+def cmd_checksum_verify(args):
+    import checksums
+
+    folders = args.folders
+    if not folders:
+        import builds
+
+        # the folders the builds move their isos to
+        folders = [os.path.join(core.home, flavor.outname) for flavor in builds.flavors.values()]
+        folders = [folder for folder in folders if os.path.isdir(folder)]
+    checks = checksums.verify(folders, workers=args.jobs)
+    for check in checks:
+        emit("checksum", path=check.path, algorithm=check.algorithm, state=check.state)
+    return EXIT_OK if all(check.state == "ok" for check in checks) else EXIT_FAILED
+
+
+def cmd_history(args):
+    import catalog
+
+    if args.latest:
+        if not args.flavor:
+            emit("error", message="--latest needs a flavor")
+            return EXIT_USAGE
+        build = catalog.latest(args.flavor)
+        rows = [build] if build else []
+    else:
+        rows = catalog.history(flavor=args.flavor, limit=args.limit)
+    for row in rows:
+        emit("history", artifacts=catalog.artifacts(row["id"]), **_history_fields(row))
+    return EXIT_OK
+
+
+def _history_fields(row):
+    # the columns of a build row - phases and usage are stored as json
+    fields = dict(row)
+    fields.pop("artifacts", None)
+    for name in ("phases", "usage"):
+        if fields.get(name):
+            fields[name] = json.loads(fields[name])
+    fields["build_id"] = fields.pop("id")
+    return fields
+
+
+def cmd_list(args):
+    import builds
+
+    for flavor in builds.flavors.values():
+        emit("flavor", name=flavor.name, title=flavor.title, outname=flavor.outname)
+    return EXIT_OK
+
+
+def parser():
+    parser = argparse.ArgumentParser(
+        prog="arcolinux-app-glade",
+        description="Build isos and maintain pacman without the Gui",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    build = commands.add_parser("build", help="build one or more isos")
+    build.add_argument("flavors", nargs="+", metavar="flavor", help="see the list command")
+    build.add_argument(
+        "--output", metavar="DIR", help="move the isos here - default the home of the user"
+    )
+    build.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="at most N builds at the same time - default from the cpus",
+    )
+    build.add_argument(
+        "--cpu-weight", type=int, metavar="N", help="CPUWeight of the build scope (1-10000)"
+    )
+    build.add_argument(
+        "--io-weight", type=int, metavar="N", help="IOWeight of the build scope (1-10000)"
+    )
+    build.add_argument(
+        "--memory-high", metavar="SIZE", help="MemoryHigh of the build scope, like 8G or 75%%"
+    )
+    build.add_argument(
+        "--force",
+        action="store_true",
+        help="build even when nothing changed since the last build",
+    )
+    build.add_argument(
+        "--no-prefetch",
+        action="store_true",
+        help="leave the package downloads to mkarchiso",
+    )
+    build.add_argument(
+        "--zsync",
+        action="store_true",
+        help="write .zsync files and report how much changed since the last iso",
+    )
+    build.set_defaults(func=cmd_build, root=True)
+
+    mirrors = commands.add_parser("mirrors", help="Arch Linux mirrors")
+    mirrors_commands = mirrors.add_subparsers(dest="action", metavar="action")
+    mirrors_commands.required = True
+    rank = mirrors_commands.add_parser("rank", help="write the fastest mirrors to the mirrorlist")
+    rank.add_argument("--count", type=int, default=10, help="number of mirrors to keep")
+    rank.add_argument("--https-only", action="store_true", help="leave out the http mirrors")
+    rank.set_defaults(func=cmd_mirrors_rank, root=True)
+
+    cache = commands.add_parser("cache", help="the pacman cache")
+    cache_commands = cache.add_subparsers(dest="action", metavar="action")
+    cache_commands.required = True
+    clean = cache_commands.add_parser("clean", help="remove all packages from the cache")
+    clean.add_argument(
+        "--builds",
+        action="store_true",
+        help="also empty the package cache the iso builds share",
+    )
+    clean.set_defaults(func=cmd_cache_clean, root=True)
+    fill = cache_commands.add_parser(
+        "prefetch", help="download the packages of an archiso profile into its cache"
+    )
+    fill.add_argument("profile", help="folder with profiledef.sh, pacman.conf and packages.x86_64")
+    fill.add_argument("--jobs", type=int, default=4, metavar="N", help="downloads at the same time")
+    fill.set_defaults(func=cmd_cache_prefetch, root=True)
+
+    proxy = commands.add_parser("proxy", help="a package cache for the machines on the LAN")
+    proxy_commands = proxy.add_subparsers(dest="action", metavar="action")
+    proxy_commands.required = True
+    serve = proxy_commands.add_parser("serve", help="run the package proxy until interrupted")
+    serve.add_argument("--port", type=int, default=7878, help="port to listen on")
+    serve.add_argument(
+        "--store",
+        metavar="DIR",
+        default="/var/cache/arcolinux-app-glade/proxy",
+        help="where the packages are kept",
+    )
+    serve.add_argument(
+        "--max-size", type=float, default=50, metavar="GIB", help="size of the store in GiB"
+    )
+    serve.set_defaults(func=cmd_proxy_serve, root=True)
+    for action, text in (
+        ("point", "put the proxy at URL on top of the mirrorlist"),
+        ("unpoint", "take the proxy at URL out of the mirrorlist"),
+    ):
+        point = proxy_commands.add_parser(action, help=text)
+        point.add_argument("url", help="like http://buildhost:7878")
+        point.set_defaults(func=cmd_proxy_point, root=True)
+
+    checksum = commands.add_parser("checksum", help="the .sha256 and .b2sum files of the isos")
+    checksum_commands = checksum.add_subparsers(dest="action", metavar="action")
+    checksum_commands.required = True
+    write = checksum_commands.add_parser("write", help="hash files and write their checksum files")
+    write.add_argument("files", nargs="+", metavar="FILE")
+    write.add_argument("--jobs", type=int, metavar="N", help="files hashed at the same time")
+    write.set_defaults(func=cmd_checksum_write, root=False)
+    check = checksum_commands.add_parser(
+        "verify", help="check the files that have a checksum file in the folders"
+    )
+    check.add_argument(
+        "folders", nargs="*", metavar="DIR", help="default: the output folders of all flavors"
+    )
+    check.add_argument("--jobs", type=int, metavar="N", help="files hashed at the same time")
+    check.set_defaults(func=cmd_checksum_verify, root=False)
+
+    history = commands.add_parser("history", help="the builds of this machine, the latest first")
+    history.add_argument("flavor", nargs="?", help="only the builds of this flavor")
+    history.add_argument("--limit", type=int, default=20, metavar="N", help="at most N builds")
+    history.add_argument(
+        "--latest", action="store_true", help="only the latest good build of flavor"
+    )
+    history.set_defaults(func=cmd_history, root=False)
+
+    listing = commands.add_parser("list", help="the isos we can build")
+    listing.set_defaults(func=cmd_list, root=False)
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    setup_logging()
+
+    if args.root and os.geteuid() != 0:
+        emit("error", message="Run this command as root")
+        return EXIT_NOT_ROOT
+
+    started = time.monotonic()
+    try:
+        code = args.func(args)
+    except KeyboardInterrupt:
+        emit("error", message="Interrupted")
+        code = EXIT_FAILED
+    except Exception as error:
+        logging.error(error)
+        emit("error", message=str(error))
+        code = EXIT_FAILED
+    emit(
+        "done",
+        command=args.command,
+        exit_code=code,
+        seconds=round(time.monotonic() - started, 1),
+    )
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
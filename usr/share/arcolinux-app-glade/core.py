@@ -0,0 +1,827 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+# The logic of the app - pacman, repos, mirrors and files
+# Nothing in here imports GTK, so the command line can use it as well
+# The Gui side lives in functions.py
+
+import functools
+import grp
+import os
+import pwd
+import re
+import shutil
+import subprocess
+import threading
+from os import getlogin, listdir, mkdir, path, rmdir
+
+# we want our logging in the functions also
+import logging
+
+import artifacts
+import pacman_conf as pconf
+
+DEBUG = False
+
+# =====================================================
+#              BEGIN DECLARATION OF VARIABLES
+# =====================================================
+
+base_dir = path.dirname(path.realpath(__file__))
+# distr, sudo_username and home are looked up on first use - see __getattr__
+message = "This is the ArcoLinux App"
+arcolinux_mirrorlist = "/etc/pacman.d/arcolinux-mirrorlist"
+mirrorlist = "/etc/pacman.d/mirrorlist"
+log_dir = "/var/log/arcolinux-app-glade/"
+pacman_conf = "/etc/pacman.conf"
+pacman_local_db = "/var/lib/pacman/local"
+pacman_cache = "/var/cache/pacman/pkg/"
+# one package cache for all the iso builds - pacman -Scc leaves it alone
+build_package_cache = "/var/cache/arcolinux-app-glade/pkg"
+pacman_arch = "/usr/share/arcolinux-app-glade/data/arch/pacman.conf"
+pacman_arco = "/usr/share/arcolinux-app-glade/data/arco/pacman.conf"
+pacman_eos = "/usr/share/arcolinux-app-glade/data/eos/pacman.conf"
+pacman_garuda = "/usr/share/arcolinux-app-glade/data/garuda/pacman.conf"
+
+class PacmanError(Exception):
+    pass
+
+
+# pacman on the host takes one transaction at a time - every job and build
+# that changes the host through pacman holds this lock, so the second one
+# waits instead of failing on /var/lib/pacman/db.lck
+# reentrant - builds.prepare holds it around install_package
+pacman_lock = threading.RLock()
+
+
+def holds_pacman_lock(func):
+    # run func with pacman_lock held
+    @functools.wraps(func)
+    def locked(*args, **kwargs):
+        with pacman_lock:
+            return func(*args, **kwargs)
+
+    return locked
+
+# the ArcoLinux repos in the order they go into /etc/pacman.conf
+# (name, enabled) - the testing repo is added commented out
+arcolinux_repos = [
+    ("arcolinux_repo_testing", False),
+    ("arcolinux_repo", True),
+    ("arcolinux_repo_3party", True),
+    ("arcolinux_repo_xlarge", True),
+]
+
+arcolinux_repo_directives = [
+    ("SigLevel", "PackageRequired DatabaseNever"),
+    ("Include", arcolinux_mirrorlist),
+]
+
+# =====================================================
+#              END DECLARATION OF VARIABLES
+# =====================================================
+
+
+# the distro id - distro is only imported when we need it
+def get_distr():
+    from distro import id
+
+    return id()
+
+
+# the user that started the app - getlogin() needs a terminal or a session
+# and fails on a build server, pkexec and sudo tell us who asked for root
+def get_sudo_username():
+    try:
+        return getlogin()
+    except OSError:
+        pass
+    if os.environ.get("PKEXEC_UID", "").isdigit():
+        try:
+            return pwd.getpwuid(int(os.environ["PKEXEC_UID"])).pw_name
+        except KeyError:
+            pass
+    if os.environ.get("SUDO_USER"):
+        return os.environ["SUDO_USER"]
+    return pwd.getpwuid(os.getuid()).pw_name
+
+
+def get_home():
+    username = str(get_sudo_username())
+    try:
+        return pwd.getpwnam(username).pw_dir
+    except KeyError:
+        return "/home/" + username
+
+
+_lazy_values = {
+    "distr": get_distr,
+    "sudo_username": get_sudo_username,
+    "home": get_home,
+}
+
+
+def _lazy(name):
+    # computed once, on first use - after that it is a plain module global
+    if name not in globals():
+        globals()[name] = _lazy_values[name]()
+    return globals()[name]
+
+
+def __getattr__(name):
+    # core.distr, core.sudo_username and core.home
+    if name not in _lazy_values:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    return _lazy(name)
+
+
+# =====================================================
+#               BEGIN GLOBAL FUNCTIONS
+# =====================================================
+
+# check if file exists
+
+
+def file_check(file):
+    if path.isfile(file):
+        return True
+
+    return False
+
+
+# Check if path exists
+def path_check(path):
+    if os.path.isdir(path):
+        return True
+    return False
+
+
+# getting the content of a file
+def get_lines(files):
+    try:
+        if path.isfile(files):
+            with open(files, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+                f.close()
+            return lines
+    except Exception as error:
+        logging.error(error)
+
+
+# getting the string in list
+def __get_position(lists, string):
+    data = [x for x in lists if string in x]
+    pos = lists.index(data[0])
+    return pos
+
+
+# get position in list
+def get_position(lists, value):
+    data = [string for string in lists if value in string]
+    if len(data) != 0:
+        position = lists.index(data[0])
+        return position
+    return 0
+
+
+# get positions in list
+def get_positions(lists, value):
+    data = [string for string in lists if value in string]
+    position = []
+    for d in data:
+        position.append(lists.index(d))
+    return position
+
+
+# check if process is running
+def check_if_process_is_running(processName):
+    import psutil
+
+    for proc in psutil.process_iter():
+        try:
+            pinfo = proc.as_dict(attrs=["pid", "name", "create_time"])
+            if processName == pinfo["name"]:
+                return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+    return False
+
+
+# check value in list
+def check_value(list, value):
+    data = [string for string in list if value in string]
+    return data
+
+
+# check if value is true or false in file
+def check_content(value, file):
+    try:
+        with open(file, "r", encoding="utf-8") as myfile:
+            lines = myfile.readlines()
+            myfile.close()
+
+        for line in lines:
+            if value in line:
+                if value in line:
+                    return True
+                else:
+                    return False
+        return False
+    except:
+        return False
+
+
+# index of the installed packages - {name: version}
+# rebuilt when pacman changes the local database directory
+_package_index = {}
+_package_index_mtime = None
+_package_index_lock = threading.Lock()
+
+
+def _read_local_db(directory):
+    # every installed package is a folder "name-pkgver-pkgrel" in the local db
+    # pkgver and pkgrel can not contain a "-" so the name is everything before
+    index = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            parts = entry.name.rsplit("-", 2)
+            if len(parts) == 3:
+                index[parts[0]] = parts[1] + "-" + parts[2]
+    return index
+
+
+def _read_pacman_q():
+    # fallback when the local db is not where we expect it
+    output = subprocess.run(
+        ["pacman", "-Q"],
+        shell=False,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ).stdout
+    index = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            index[parts[0]] = parts[1]
+    return index
+
+
+def get_installed_packages():
+    """
+    Return a dict of all installed packages and their versions.
+
+    The index is built once from the pacman local database and only rebuilt
+    when the mtime of that directory changes - pacman touches it on every
+    install or removal.
+    """
+    global _package_index, _package_index_mtime
+    with _package_index_lock:
+        try:
+            mtime = os.stat(pacman_local_db).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if mtime is None or mtime != _package_index_mtime:
+            try:
+                if mtime is None:
+                    _package_index = _read_pacman_q()
+                else:
+                    _package_index = _read_local_db(pacman_local_db)
+                _package_index_mtime = mtime
+                logging.debug("Indexed %d installed packages", len(_package_index))
+            except Exception as error:
+                logging.error(error)
+        return _package_index
+
+
+# check if package is installed or not
+def check_package_installed(package):
+    return package in get_installed_packages()
+
+
+# get the installed version of a package or None
+def get_package_version(package):
+    return get_installed_packages().get(package)
+
+
+# load /etc/pacman.conf as a model - see pacman_conf.py
+def load_pacman_conf():
+    return pconf.PacmanConf.load(pacman_conf)
+
+
+# check if repo exists - enabled or commented out
+# value is the repo name, with or without the square brackets
+def repo_exist(value):
+    try:
+        conf = load_pacman_conf()
+    except Exception as error:
+        logging.error(error)
+        return False
+    return conf.has_section(value.strip("[]"))
+
+
+# install package
+@holds_pacman_lock
+def install_package(self, package):
+    command = "pacman -S " + package + " --noconfirm --needed"
+    # if more than one package - checf fails and will install
+    if check_package_installed(package):
+        logging.info("The package %s is already installed - nothing to do", package)
+
+    else:
+        try:
+            logging.info("Applying this command: %s", command)
+            subprocess.run(
+                command.split(" "),
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            logging.info("The package %sis now installed", package)
+        except Exception as error:
+            logging.error(error)
+
+
+# install ArcoLinux Spices Application
+@holds_pacman_lock
+def install_arcolinux_spices_application(self):
+    base_dir = path.dirname(path.realpath(__file__))
+    pathway = base_dir + "/packages/asa/"
+    file = listdir(pathway)
+
+    try:
+        command1 = "pacman -U " + pathway + str(file).strip("[]'") + " --noconfirm"
+        logging.info("Applying this command: %s", command1)
+        subprocess.run(
+            command1.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArcoLinux Spices Application(ASA) is now installed")
+    except Exception as error:
+        logging.error(error)
+
+    if file_check("/usr/share/arcolinux-spices/scripts/get-the-keys-and-repos.sh"):
+        try:
+            command1 = (
+                "pkexec /usr/share/arcolinux-spices/scripts/get-the-keys-and-repos.sh"
+            )
+            logging.info("Applying this command: %s", command1)
+            subprocess.run(
+                command1.split(" "),
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            logging.info("ArcoLinux keys and mirrorlist have been installed")
+        except Exception as error:
+            logging.error(error)
+    else:
+        print("Path to ArcoLinux Spices script does not exist")
+
+    if file_check("/usr/bin/arcolinux-spices"):
+        try:
+            command1 = "pacman -Sy"
+            logging.info("Applying this command: %s", command1)
+            subprocess.run(
+                command1.split(" "),
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            logging.info("ArcoLinux repos have been downloaded")
+        except Exception as error:
+            logging.error(error)
+    else:
+        print("Path to ArcoLinux Spices does not exist")
+
+
+# install ArchLinux Tweak Tool
+@holds_pacman_lock
+def install_archlinux_tweak_tool(self):
+    base_dir = path.dirname(path.realpath(__file__))
+    pathway = base_dir + "/packages/att/"
+    file = listdir(pathway)
+
+    try:
+        command1 = "pacman -U " + pathway + str(file).strip("[]'") + " --noconfirm"
+        logging.info("Applying this command: %s", command1)
+        subprocess.run(
+            command1.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArchLinux Tweak Tool (ATT) is now installed")
+    except Exception as error:
+        logging.error(error)
+
+
+# install ArcoLinux mirrorlist and key package
+@holds_pacman_lock
+def install_arcolinux_key_mirror(self):
+    base_dir = path.dirname(path.realpath(__file__))
+    pathway = base_dir + "/packages/arcolinux-keyring/"
+    file = listdir(pathway)
+
+    try:
+        command1 = "pacman -U " + pathway + str(file).strip("[]'") + " --noconfirm"
+        logging.info("Applying this command: %s", command1)
+        subprocess.run(
+            command1.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArcoLinux keyring is now installed")
+    except Exception as error:
+        logging.error(error)
+
+    pathway = base_dir + "/packages/arcolinux-mirrorlist/"
+    file = listdir(pathway)
+    try:
+        command2 = "pacman -U " + pathway + str(file).strip("[]'") + " --noconfirm"
+        logging.info("Applying this command: %s", command2)
+        subprocess.run(
+            command2.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArcoLinux mirrorlist is now installed")
+    except Exception as error:
+        logging.error(error)
+
+
+# remove ArcoLinux mirrorlist and key package
+@holds_pacman_lock
+def remove_arcolinux_key_mirror(self):
+    try:
+        command1 = "pacman -Rdd arcolinux-keyring --noconfirm"
+        logging.info("Applying this command: %s", command1)
+        subprocess.run(
+            command1.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArcoLinux keyring is now removed")
+    except Exception as error:
+        logging.error(error)
+
+    try:
+        command2 = "pacman -Rdd arcolinux-mirrorlist-git --noconfirm"
+        logging.info("Applying this command: %s", command2)
+        subprocess.run(
+            command2.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        logging.info("ArcoLinux mirrorlist is now removed")
+    except Exception as error:
+        logging.error(error)
+
+
+# Ensuring that pacman does not crash - installing/removing keys and mirrors
+def pacman_safeguard():
+    package = "arcolinux-mirrorlist-git"
+    if not check_package_installed(package):
+        logging.info("Removing the lines referring to the ArcoLinux repos")
+        remove_repos()
+
+
+# Running a script from the Application App
+def run_script(self, command):
+    logging.info("Running the following script: %s", command)
+    try:
+        subprocess.run(
+            command, shell=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+    except Exception as error:
+        logging.error(error)
+
+
+# Running an Arch Linux command
+def run_command(command):
+    logging.info("Applying this command %s", command)
+    try:
+        subprocess.run(
+            command.split(" "),
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except Exception as error:
+        logging.error(error)
+
+
+# Running command in Alacritty with --hold option
+def run_script_alacritty_hold(self, command):
+    logging.info("Applying this command %s", command)
+    try:
+        subprocess.run(
+            "alacritty --hold -e" + command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except Exception as error:
+        logging.error(error)
+
+
+# Running command in Alacritty without --hold option
+def run_script_alacritty(self, command):
+    self.logging.info("Applying this command %s", command)
+    try:
+        subprocess.run(
+            "alacritty -e" + command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except Exception as error:
+        self.logging.error(error)
+
+
+def remove_dir(self, directory: str) -> bool:
+    """
+    Safely remove a directory if it exists.
+
+    Parameters:
+        directory (str): Path to the directory to be removed.
+
+    Returns:
+        bool: True if the directory was removed successfully, False otherwise.
+    """
+    if not os.path.exists(directory):
+        logging.warning(f"Directory does not exist: {directory}")
+        return False
+
+    if not os.path.isdir(directory):
+        logging.error(f"Path is not a directory: {directory}")
+        return False
+
+    try:
+        shutil.rmtree(directory)
+        logging.info(f"Successfully removed directory: {directory}")
+        return True
+    except PermissionError:
+        logging.error(f"Permission denied while removing directory: {directory}")
+    except FileNotFoundError:
+        logging.error(f"Directory not found during removal: {directory}")
+    except OSError as error:
+        logging.error(f"Failed to remove directory {directory}: {error}")
+    except Exception as error:
+        logging.error(f"Unexpected error occurred while removing directory {directory}: {error}")
+
+    return False
+
+
+# uid and gid of the user that started the app - looked up once
+_user_ids = None
+
+
+def get_user_ids():
+    global _user_ids
+    if _user_ids is None:
+        user = pwd.getpwnam(_lazy("sudo_username"))
+        _user_ids = (user.pw_uid, user.pw_gid)
+    return _user_ids
+
+
+# Change permissions - give dst and everything in it to the user
+def permissions(dst):
+    try:
+        uid, gid = get_user_ids()
+        changed, skipped, files, size = artifacts.chown_tree(dst, uid, gid)
+        logging.info("Changed the owner of %d entries in %s (%d were fine)", changed, dst, skipped)
+    except Exception as error:
+        logging.error(error)
+
+
+# Move build output into the home directory - owned by the user
+# see artifacts.py - a rename when possible, a copy only as last resort
+def move_to_home(src, dst):
+    uid, gid = get_user_ids()
+    return artifacts.relocate(src, dst, uid, gid)
+
+
+def findgroup():
+    try:
+        uid, gid = get_user_ids()
+        group = grp.getgrgid(gid).gr_name
+        logging.info("[INFO] : Group = " + group)
+        return group
+    except Exception as error:
+        logging.error(error)
+
+
+# add repositories
+def add_repos():
+    try:
+        conf = load_pacman_conf()
+    except Exception as error:
+        logging.error(error)
+        return
+
+    if conf.has_section("arcolinux_repo"):
+        return
+
+    # on ArcoLinux the repos go in front of the Arch Linux repos
+    before = None
+    if _lazy("distr") == "arcolinux":
+        logging.info("Adding ArcoLinux repos on ArcoLinux")
+        for name in ("core-testing", "core"):
+            if conf.has_section(name):
+                before = name
+                break
+
+    for name, enabled in arcolinux_repos:
+        if conf.add_section(name, arcolinux_repo_directives, enabled, before):
+            logging.info("Adding %s", name)
+
+    try:
+        conf.save()
+        logging.info("ArcoLinux repos have been installed")
+    except Exception as error:
+        logging.error(error)
+
+
+# Removing repos
+def remove_repos():
+    try:
+        conf = load_pacman_conf()
+        for name, enabled in arcolinux_repos:
+            if conf.remove_section(name):
+                logging.info("Removing %s", name)
+        conf.save()
+    except Exception as error:
+        logging.error(error)
+
+
+# Read a package list - "#" starts a comment, also at the end of a line
+# Duplicates are dropped, the order of the file is kept
+def read_package_list(path):
+    packages = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            for package in line.split("#", 1)[0].split():
+                if package not in seen:
+                    seen.add(package)
+                    packages.append(package)
+    return packages
+
+
+# Install a list of packages in a single pacman transaction
+# Returns the names pacman could not find in the repositories - raises
+# PacmanError when pacman fails for any other reason
+@holds_pacman_lock
+def install_packages(packages):
+    installed = get_installed_packages()
+    todo = [package for package in packages if package not in installed]
+    logging.info(
+        "%d packages in the list - %d already installed",
+        len(packages),
+        len(packages) - len(todo),
+    )
+
+    not_found = []
+    while todo:
+        command = ["pacman", "-S", "--noconfirm", "--needed"] + todo
+        logging.info("Installing %d packages in one transaction", len(todo))
+        try:
+            result = subprocess.run(
+                command,
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+        except Exception as error:
+            logging.error(error)
+            raise PacmanError("Could not run pacman : {}".format(error))
+
+        if result.returncode == 0:
+            logging.info("The packages are now installed")
+            break
+
+        # pacman refuses the whole transaction for one unknown name
+        # drop the unknown names and try again with the rest
+        unknown = [
+            name
+            for name in re.findall(r"target not found: (\S+)", result.stdout)
+            if name in todo
+        ]
+        if not unknown:
+            logging.error("pacman failed with return code %s", result.returncode)
+            logging.error(result.stdout.strip())
+            # the last line of pacman says why - a lock, a keyring, a conflict
+            lines = result.stdout.strip().splitlines()
+            raise PacmanError(
+                "pacman failed with return code {}{}".format(
+                    result.returncode, " : " + lines[-1] if lines else ""
+                )
+            )
+        not_found.extend(unknown)
+        todo = [package for package in todo if package not in unknown]
+
+    for name in not_found:
+        logging.warning("Package not found in the repositories: %s", name)
+    return not_found
+
+
+# Install packages from a path + filename
+def install_packages_path(self, path):
+    try:
+        packages = read_package_list(path)
+    except Exception as error:
+        logging.error(error)
+        raise PacmanError("Could not read {} : {}".format(path, error))
+
+    return install_packages(packages)
+
+
+# Clean the pacman cache - pacman -Scc asks twice, yes answers for us
+# the shared cache of the iso builds is kept unless include_builds is set
+@holds_pacman_lock
+def clean_pacman_cache(include_builds=False):
+    command = "yes | pacman -Scc"
+    logging.info("Applying this command: %s", command)
+    result = subprocess.run(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    logging.info("Pacman cache cleaned")
+
+    if not include_builds:
+        logging.info("We kept the package cache of the iso builds in %s", build_package_cache)
+        return result.returncode == 0
+
+    removed = 0
+    try:
+        with os.scandir(build_package_cache) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+                removed += 1
+    except FileNotFoundError:
+        pass
+    logging.info("Removed %d files from %s", removed, build_package_cache)
+    return result.returncode == 0
+
+
+# Rank the Arch Linux mirrors and write the best ones to the mirrorlist
+# returns the servers now in the mirrorlist - see mirrors.py
+def rank_arch_mirrors(count=10, https_only=False):
+    # asyncio is only imported when we need it
+    import mirrors
+
+    try:
+        best = mirrors.rank_mirrors(count, https_only=https_only)
+    except Exception as error:
+        logging.error(error)
+        best = []
+
+    if best:
+        logging.info("We changed the content of your %s", mirrorlist)
+        for result in best:
+            logging.info("Server = %s (%.0f ms)", result.server, result.latency * 1000)
+        return [result.server for result in best]
+
+    # no mirror answered - falling back to the fixed list
+    logging.info("No mirror answered - using the default servers")
+    run_script(None, base_dir + "/scripts/best-arch-servers")
+    for server in mirrors.default_servers:
+        logging.info("Server = %s", server)
+    return list(mirrors.default_servers)
+
+
+def run_as_user(script):
+    subprocess.run(
+        ["su - " + _lazy("sudo_username") + " -c " + script], shell=False
+    )
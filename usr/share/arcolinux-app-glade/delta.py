@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Most of a nightly iso is the same as the one of the night before
+# A .zsync control file next to the iso lets testers fetch only the blocks
+# that changed with zsync. The file needs MD4 per block, which hashlib does
+# not have on OpenSSL 3, so zsyncmake of the zsync package writes it
+# How much changed is measured here - the iso is cut in blocks, a short
+# BLAKE2b of every block is kept in the state folder of the flavor and the
+# next build counts its blocks that the previous one had
+# Blocks only match on block boundaries - zsync also finds moved data, so
+# the overlap is the least a tester saves
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+import fingerprint
+
+# the sector of an iso - the files in it start on one, so data that moves
+# by whole files still matches
+block_size = 2048
+digest_size = 8
+
+HEADER = "aag-blocks 1 {} {}\n"
+
+
+def block_digests(path, size=None):
+    # the digest of every block of path, one after the other
+    size = size or block_size
+    digests = bytearray()
+    buffer = bytearray(size * 512)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            length = f.readinto(buffer)
+            if not length:
+                break
+            for start in range(0, length, size):
+                digests += hashlib.blake2b(
+                    view[start : min(start + size, length)], digest_size=digest_size
+                ).digest()
+    return bytes(digests)
+
+
+def _index_path(name):
+    return os.path.join(fingerprint.state_dir, name + ".blocks")
+
+
+def load_index(name):
+    # (block size, file length, digests) of the last iso of name - or None
+    try:
+        with open(_index_path(name), "rb") as f:
+            header = f.readline().decode("ascii").split()
+            digests = f.read()
+    except OSError:
+        return None
+    if len(header) != 4 or header[:2] != ["aag-blocks", "1"]:
+        logging.warning("Ignoring the block index of %s - unknown format", name)
+        return None
+    return int(header[2]), int(header[3]), digests
+
+
+def save_index(name, size, length, digests):
+    os.makedirs(fingerprint.state_dir, mode=0o755, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + name + ".", dir=fingerprint.state_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.format(size, length).encode("ascii"))
+            f.write(digests)
+        os.replace(tmp, _index_path(name))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _split(digests):
+    return [digests[i : i + digest_size] for i in range(0, len(digests), digest_size)]
+
+
+def overlap(digests, length, previous, size=None):
+    """
+    How much of a file with these block digests the previous one had.
+    previous is the digests of the previous file, None for none.
+    """
+    size = size or block_size
+    blocks = _split(digests)
+    old = _split(previous or b"")
+    known = set(old)
+    reused_bytes = 0
+    reused = 0
+    same_place = 0
+    for number, block in enumerate(blocks):
+        if block in known:
+            reused += 1
+            # the last block is short
+            reused_bytes += min(size, length - number * size)
+            if number < len(old) and old[number] == block:
+                same_place += 1
+    return {
+        "blocks": len(blocks),
+        "reused_blocks": reused,
+        "same_place": same_place,
+        "reused_bytes": reused_bytes,
+        "changed_bytes": length - reused_bytes,
+        "overlap": round(reused_bytes / length, 4) if length else 0.0,
+    }
+
+
+def write_control(path, size=None):
+    """
+    Write path.zsync with zsyncmake - the url in it is the name of the iso,
+    next to which the control file is published. Returns its path, None
+    when zsyncmake is not there.
+    """
+    if shutil.which("zsyncmake") is None:
+        logging.warning("zsyncmake not found - install zsync for the .zsync files")
+        return None
+    control = path + ".zsync"
+    subprocess.run(
+        [
+            "zsyncmake",
+            "-b",
+            str(size or block_size),
+            "-u",
+            os.path.basename(path),
+            "-o",
+            control,
+            path,
+        ],
+        cwd=os.path.dirname(os.path.abspath(path)),
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    info = os.stat(path)
+    os.chown(control, info.st_uid, info.st_gid)
+    return control
+
+
+def publish(name, path, control=True):
+    """
+    The delta step of a build of name that made the iso path - writes the
+    control file, compares with the previous iso of name and keeps the
+    blocks of this one for the next build. Returns the overlap as a dict.
+    """
+    length = os.path.getsize(path)
+    digests = block_digests(path)
+    index = load_index(name)
+    previous = None
+    if index is not None:
+        if index[0] == block_size:
+            previous = index[2]
+        else:
+            logging.info("The block size changed - no overlap for the %s iso", name)
+    result = overlap(digests, length, previous)
+    result["path"] = path
+    result["previous"] = previous is not None
+    if control:
+        result["control"] = write_control(path)
+    save_index(name, block_size, length, digests)
+    if previous is not None:
+        logging.info(
+            "%.1f %% of %s was in the previous %s iso - %d MiB changed",
+            result["overlap"] * 100,
+            os.path.basename(path),
+            name,
+            result["changed_bytes"] >> 20,
+        )
+    return result
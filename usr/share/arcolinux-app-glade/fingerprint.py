@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# What went into a build - the commit of the iso scripts, the package files
+# pacman resolved and a hash of every file of the archiso profiles
+# A build with the same inputs as the last good one is not run again
+# mkarchiso keeps its work folder between builds - when the inputs changed
+# we remove the stage markers that are no longer valid, or all of it
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+state_dir = "/var/lib/arcolinux-app-glade/builds"
+
+# files of a profile that end up in the airootfs image - the others are
+# the boot setup of the iso
+AIROOTFS_FILES = ("airootfs/", "packages.", "pacman.conf", "profiledef.sh")
+
+# mkarchiso stages that build the airootfs image - when only the boot
+# setup changed their markers stay and the image is used again
+AIROOTFS_STAGES = (
+    "_make_custom_airootfs",
+    "_make_packages",
+    "_make_customize_airootfs",
+    "_make_pkglist",
+    "_cleanup_pacstrap_dir",
+    "_prepare_airootfs_image",
+    "_mkairootfs_",
+)
+
+# mkarchiso touches <mode>.<stage> in the work folder when a stage is done
+MARKER = re.compile(r"^[a-z0-9]+\.(_[A-Za-z0-9_+]+)$")
+
+
+def _hash_file(path):
+    if os.path.islink(path):
+        # a link is what it points to - the target may not exist on the host
+        return "link:" + os.readlink(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_tree(top):
+    # {relative path: sha256} of every file below top
+    hashes = {}
+    for root, dirs, files in os.walk(top):
+        # os.walk lists links to folders with the folders - they are files here
+        links = [name for name in dirs if os.path.islink(os.path.join(root, name))]
+        dirs[:] = [name for name in dirs if name != ".git" and name not in links]
+        for name in files + links:
+            path = os.path.join(root, name)
+            hashes[os.path.relpath(path, top)] = _hash_file(path)
+    return hashes
+
+
+def inputs(flavor, commit, profiles, packages):
+    """
+    The inputs of a build of flavor as a dict that can go to json.
+    profiles are the archiso profiles below the checkout, packages is
+    {profile: [file names]} - a profile pacman could not resolve is None.
+    """
+    top = flavor.checkout
+    return {
+        "command": flavor.command,
+        "url": flavor.url,
+        "commit": commit,
+        "packages": {
+            os.path.relpath(profile, top): (
+                None if packages.get(profile) is None else sorted(packages[profile])
+            )
+            for profile in profiles
+        },
+        "files": {os.path.relpath(profile, top): hash_tree(profile) for profile in profiles},
+    }
+
+
+def fingerprint(values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def complete(values):
+    # without the commit or the packages we can not tell what changed
+    if values.get("url") and not values.get("commit"):
+        return False
+    return all(names is not None for names in values.get("packages", {}).values())
+
+
+def _state_path(name):
+    return os.path.join(state_dir, name + ".json")
+
+
+def load(name):
+    try:
+        with open(_state_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(name, state):
+    os.makedirs(state_dir, mode=0o755, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + name + ".", dir=state_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp, _state_path(name))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def isos(target):
+    # {file name: size} of the isos in target
+    found = {}
+    try:
+        with os.scandir(target) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".iso"):
+                    found[entry.name] = entry.stat().st_size
+    except OSError:
+        pass
+    return found
+
+
+def up_to_date(name, values, target):
+    """
+    The last good build of name had these inputs and its isos are still in
+    target, untouched.
+    """
+    if not complete(values):
+        return False
+    last = load(name).get("success")
+    if not last or last.get("fingerprint") != fingerprint(values):
+        return False
+    if not last.get("isos") or last.get("target") != target:
+        return False
+    found = isos(target)
+    return all(found.get(iso) == size for iso, size in last["isos"].items())
+
+
+def record_success(name, values, target, built, phases=None, timeline=None):
+    # built - the isos of this build, see isos() - phases see phases.py
+    state = load(name)
+    state["success"] = {
+        "fingerprint": fingerprint(values),
+        "inputs": values,
+        "target": target,
+        "isos": built,
+        "phases": phases or {},
+        "timeline": timeline or [],
+        "time": int(time.time()),
+    }
+    _save(name, state)
+
+
+def last_phases(name):
+    # the phase breakdown of the last good build of name
+    return load(name).get("success", {}).get("phases") or {}
+
+
+def _changed(old, new):
+    # relative paths of the profile files that differ between two inputs
+    changed = set()
+    for profile in set(old) | set(new):
+        before = old.get(profile) or {}
+        after = new.get(profile) or {}
+        for path in set(before) | set(after):
+            if before.get(path) != after.get(path):
+                changed.add(path)
+    return changed
+
+
+def prepare_work(name, values, work):
+    """
+    Make the mkarchiso work folder fit values before the build starts.
+    Returns "kept", "partial" or "fresh". The inputs the folder is built
+    from are written down first - a build that breaks off leaves markers
+    for these inputs only.
+    """
+    state = load(name)
+    before = state.get("work")
+    # the last good build had these inputs - its iso is gone, so the stages
+    # that make the iso have to run again
+    finished = state.get("success", {}).get("fingerprint") == fingerprint(values)
+    state["work"] = values
+    _save(name, state)
+
+    if not os.path.isdir(work):
+        return "fresh"
+    if (
+        before is None
+        or not complete(values)
+        or not complete(before)
+        or before.get("command") != values.get("command")
+        or before.get("commit") != values.get("commit")
+        or before.get("packages") != values.get("packages")
+    ):
+        return _wipe(work)
+
+    changed = _changed(before.get("files", {}), values.get("files", {}))
+    if not changed and not finished:
+        # a build that broke off - mkarchiso goes on where it stopped
+        logging.info("Using the work folder %s as it is", work)
+        return "kept"
+    if any(path.startswith(AIROOTFS_FILES) for path in changed):
+        return _wipe(work)
+
+    removed = 0
+    for entry in os.listdir(work):
+        match = MARKER.match(entry)
+        if match and not match.group(1).startswith(AIROOTFS_STAGES):
+            os.unlink(os.path.join(work, entry))
+            removed += 1
+    logging.info(
+        "Kept the airootfs of %s - removed %d stage markers of the boot setup",
+        work,
+        removed,
+    )
+    return "partial"
+
+
+def _wipe(work):
+    logging.info("The inputs changed - starting %s from scratch", work)
+    shutil.rmtree(work, ignore_errors=True)
+    return "fresh"
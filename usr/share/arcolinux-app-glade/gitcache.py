@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Persistent git mirrors of the iso build repositories
+# The first build clones a bare mirror, every next build only fetches what
+# changed and checks the result out as a worktree in /tmp
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+
+cache_dir = "/var/cache/arcolinux-app-glade/git"
+
+
+class GitError(Exception):
+    pass
+
+
+def _git(*args):
+    command = ["git"] + list(args)
+    logging.info("Applying this command: %s", " ".join(command))
+    result = subprocess.run(
+        command,
+        shell=False,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise GitError(result.stdout.strip() or "git failed: " + " ".join(command))
+    return result.stdout
+
+
+def mirror_path(url):
+    # readable name plus a short hash so two urls never share a mirror
+    name = url.rstrip("/").rsplit("/", 1)[-1]
+    if name.endswith(".git"):
+        name = name[:-4]
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, name + "-" + digest + ".git")
+
+
+def update_mirror(url, depth=None):
+    """
+    Make sure there is an up to date bare mirror of url and return its path.
+
+    depth keeps the mirror shallow. When the fetch fails - no network - the
+    mirror we already have is used as it is.
+    """
+    path = mirror_path(url)
+    shallow = ["--depth", str(depth)] if depth else []
+
+    if os.path.isfile(os.path.join(path, "HEAD")):
+        try:
+            _git("--git-dir", path, "fetch", "--prune", *shallow, "origin")
+        except GitError as error:
+            logging.warning("Could not update the mirror of %s - using the cached copy", url)
+            logging.warning(error)
+        return path
+
+    # a half finished clone from an earlier run is of no use
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    _git("clone", "--mirror", *shallow, url, path)
+    return path
+
+
+def checkout(url, target, depth=None, sparse=None):
+    """
+    Check out the default branch of url into target - a git worktree of the
+    cached mirror. An existing target is replaced.
+
+    sparse is an optional list of paths; only those are checked out.
+    """
+    path = update_mirror(url, depth)
+
+    if os.path.lexists(target):
+        if os.path.isdir(target) and not os.path.islink(target):
+            shutil.rmtree(target)
+        else:
+            os.unlink(target)
+
+    # worktrees of earlier runs were deleted with /tmp - forget about them
+    _git("--git-dir", path, "worktree", "prune")
+
+    if sparse:
+        _git("--git-dir", path, "worktree", "add", "--force", "--detach", "--no-checkout", target, "HEAD")
+        _git("-C", target, "sparse-checkout", "set", "--no-cone", *sparse)
+        _git("-C", target, "read-tree", "-mu", "HEAD")
+    else:
+        _git("--git-dir", path, "worktree", "add", "--force", "--detach", target, "HEAD")
+
+    logging.info("Checked out %s in %s", url, target)
+    return target
+
+
+def commit(target):
+    # the commit that is checked out in target
+    return _git("-C", target, "rev-parse", "HEAD").strip()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Background jobs - the click handlers hand their work to this executor
+# so the GTK main loop keeps drawing while pacman, git and the iso builds run
+
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    State of one unit of background work.
+
+    The executor updates the attributes from the worker thread; the
+    callbacks registered by the GUI are always called on the main loop.
+    """
+
+    def __init__(self, name, func, args, kwargs):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = PENDING
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.on_progress = None
+        self.on_done = None
+
+    @property
+    def active(self):
+        return self.state in (PENDING, RUNNING)
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def __repr__(self):
+        return "<Job {} {}>".format(self.name, self.state)
+
+
+class JobExecutor:
+    """
+    Thread pool that runs jobs and reports back on the main loop.
+
+    dispatch is the function used to get a callback onto the main loop,
+    GLib.idle_add by default. Passing another callable (for example one
+    that calls the function directly) lets the executor run without GTK.
+    """
+
+    def __init__(self, max_workers=2, dispatch=None):
+        if dispatch is None:
+            from gi.repository import GLib
+
+            dispatch = GLib.idle_add
+        self.dispatch = dispatch
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="aag-job"
+        )
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def add_listener(self, callback):
+        # callback(job) is called on the main loop whenever a job changes state
+        self.listeners.append(callback)
+
+    def submit(self, name, func, *args, on_progress=None, on_done=None, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return its Job.
+
+        If a job with the same name is still pending or running, that job is
+        returned and nothing new is queued - a second click on the same
+        button does not start the same build twice.
+
+        When func accepts a "job" keyword it receives the Job, so it can call
+        report_progress() while it runs.
+        """
+        with self.lock:
+            current = self.jobs.get(name)
+            if current is not None and current.active:
+                logging.info("Job '%s' is already %s - not starting it again", name, current.state)
+                return current
+            job = Job(name, func, args, kwargs)
+            job.on_progress = on_progress
+            job.on_done = on_done
+            self.jobs[name] = job
+
+        logging.info("Queued job '%s'", name)
+        job.future = self.pool.submit(self._run, job)
+        return job
+
+    def report_progress(self, job, fraction, message=""):
+        # callable from the worker thread - the callbacks run on the main loop
+        job.progress = max(0.0, min(1.0, fraction))
+        job.message = message
+        if job.on_progress is not None:
+            self.dispatch(self._call, job.on_progress, job)
+
+    def is_running(self, name):
+        job = self.jobs.get(name)
+        return job is not None and job.active
+
+    def active_jobs(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if job.active]
+
+    def shutdown(self, wait=False):
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job):
+        job.state = RUNNING
+        job.started = time.monotonic()
+        self._notify(job)
+        try:
+            if _accepts_job(job.func):
+                job.kwargs["job"] = job
+            job.result = job.func(*job.args, **job.kwargs)
+            job.state = DONE
+            job.progress = 1.0
+        except Exception as error:
+            job.error = error
+            job.state = FAILED
+            logging.exception("Job '%s' failed: %s", job.name, error)
+        finally:
+            job.finished = time.monotonic()
+            logging.info(
+                "Job '%s' %s after %.1f seconds", job.name, job.state, job.duration
+            )
+            self._notify(job)
+            if job.on_done is not None:
+                self.dispatch(self._call, job.on_done, job)
+        return job.result
+
+    def _notify(self, job):
+        for listener in self.listeners:
+            self.dispatch(self._call, listener, job)
+
+    @staticmethod
+    def _call(callback, job):
+        try:
+            callback(job)
+        except Exception as error:
+            logging.error(error)
+        # returning False removes the GLib idle source again
+        return False
+
+
+def _accepts_job(func):
+    code = getattr(getattr(func, "__func__", func), "__code__", None)
+    if code is None:
+        return False
+    return "job" in code.co_varnames[: code.co_argcount + code.co_kwonlyargcount]
+
+
+def in_background(name):
+    """
+    Decorator for Main's signal handlers.
+
+    The decorated handler is submitted to self.executor under the given job
+    name instead of running on the GTK thread. The handler then runs on a
+    worker thread, so it must not touch widgets - read widget state in a
+    plain handler and submit the work explicitly instead.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, *args, **kwargs):
+            return self.executor.submit(name, handler, self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
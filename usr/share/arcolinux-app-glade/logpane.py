@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The window with the output of the running builds
+# Only the last max_lines lines are kept - the whole output is in the log
+# files, see buildlog.py. The build threads hand their lines over in
+# batches and the main loop takes them at most every flush_ms
+
+import threading
+from collections import deque
+
+import buildlog
+import resources
+from gi.repository import GLib
+
+# constant values
+GUI_UI_FILE = "logpane.ui"
+
+max_lines = 5000
+flush_ms = 200
+
+
+class LogPane:
+    def __init__(self):
+        # what the window shows - also while it is closed
+        self.lines = deque(maxlen=max_lines)
+        # lines the main loop has not taken yet
+        self.pending = deque(maxlen=max_lines)
+        self.total = 0
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.builder = None
+        self.window = None
+
+    def append(self, name, lines):
+        # called from the build threads - see buildlog.BuildLog
+        with self.lock:
+            for line in lines:
+                line = "[" + name + "] " + line
+                self.lines.append(line)
+                self.pending.append(line)
+            self.total += len(lines)
+            if not self.scheduled:
+                self.scheduled = True
+                GLib.timeout_add(flush_ms, self.flush)
+
+    def flush(self):
+        # on the main loop - one insert for everything since the last flush
+        with self.lock:
+            batch = list(self.pending)
+            self.pending.clear()
+            self.scheduled = False
+            total = self.total
+        if self.window is None or not batch:
+            return False
+
+        buffer = self.builder.get_object("buildlog_buffer")
+        adjustment = self.builder.get_object("buildlog_scroll").get_vadjustment()
+        # only scroll along when the reader is at the end already
+        bottom = adjustment.get_upper() - adjustment.get_page_size()
+        following = adjustment.get_value() >= bottom - 50
+
+        if len(batch) >= max_lines:
+            buffer.set_text("\n".join(batch))
+        else:
+            text = "\n".join(batch)
+            if buffer.get_char_count():
+                text = "\n" + text
+            buffer.insert(buffer.get_end_iter(), text)
+            extra = buffer.get_line_count() - max_lines
+            if extra > 0:
+                buffer.delete(buffer.get_start_iter(), buffer.get_iter_at_line(extra))
+
+        self._status(total)
+        if following:
+            buffer.place_cursor(buffer.get_end_iter())
+            self.builder.get_object("buildlog_view").scroll_mark_onscreen(buffer.get_insert())
+        return False
+
+    def _status(self, total):
+        label = self.builder.get_object("buildlog_status")
+        text = "{} lines of build output".format(total)
+        if total > max_lines:
+            text += " - the last {} are shown, all of them are in {}".format(
+                max_lines, buildlog.log_dir
+            )
+        label.set_text(text)
+
+    def show(self):
+        if self.window is None:
+            self.builder = resources.builder(GUI_UI_FILE)
+            self.builder.connect_signals(self)
+            self.window = self.builder.get_object("buildlog")
+            with self.lock:
+                text = "\n".join(self.lines)
+                self.pending.clear()
+                total = self.total
+            buffer = self.builder.get_object("buildlog_buffer")
+            buffer.set_text(text)
+            buffer.place_cursor(buffer.get_end_iter())
+            self._status(total)
+        self.window.present()
+
+    def on_buildlog_delete(self, window, event):
+        # closing forgets the widgets - the lines stay for the next show
+        window.destroy()
+        self.window = None
+        self.builder = None
+        return True
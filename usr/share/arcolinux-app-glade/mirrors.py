@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Rank Arch Linux mirrors in two passes - every candidate is asked for the
+# headers of the same small file, the quickest ones to answer download it
+# a few at a time so they do not share the line while they are measured
+# The fastest ones end up in /etc/pacman.d/mirrorlist
+
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+mirrorlist = "/etc/pacman.d/mirrorlist"
+
+# pacman-mirrorlist ships every known mirror - commented out - in here
+# the .bak is the backup the app makes at start, before any ranking
+candidate_files = [
+    "/etc/pacman.d/mirrorlist.pacnew",
+    "/etc/pacman.d/mirrorlist.bak",
+    "/etc/pacman.d/mirrorlist",
+]
+
+# the servers the old best-arch-servers script always wrote
+default_servers = [
+    "https://mirror.osbeck.com/archlinux/$repo/os/$arch",
+    "http://mirror.osbeck.com/archlinux/$repo/os/$arch",
+    "https://mirrors.kernel.org/archlinux/$repo/os/$arch",
+    "https://geo.mirror.pkgbuild.com/$repo/os/$arch",
+    "http://mirror.rackspace.com/archlinux/$repo/os/$arch",
+    "https://mirror.rackspace.com/archlinux/$repo/os/$arch",
+]
+
+# the mirrors that are tried at all - enabled ones and the defaults first
+max_candidates = 200
+# first pass - headers only, many at a time
+latency_concurrency = 32
+latency_timeout = 3.0
+# second pass - the quickest to answer download the probe file
+finalists = 20
+download_concurrency = 2
+
+# the file every mirror has to serve - core.db is small and always there
+probe_repo = "core"
+probe_arch = "x86_64"
+probe_file = "core.db"
+
+SERVER = re.compile(r"^\s*(#?)\s*Server\s*=\s*(\S+)")
+USER_AGENT = "arcolinux-app-glade"
+
+
+class HttpError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body, first_byte, elapsed):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        # seconds until the status line arrived and until the body was read
+        self.first_byte = first_byte
+        self.elapsed = elapsed
+
+
+async def _read_body(reader, headers, limit):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        size = 0
+        while True:
+            line = await reader.readline()
+            length = int(line.split(b";")[0].strip() or b"0", 16)
+            if length == 0:
+                await reader.readline()
+                break
+            chunk = await reader.readexactly(length)
+            await reader.readline()
+            size += length
+            if limit is not None and size > limit:
+                raise HttpError("response larger than {} bytes".format(limit))
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    if "content-length" in headers:
+        length = int(headers["content-length"])
+        if limit is not None and length > limit:
+            raise HttpError("response larger than {} bytes".format(limit))
+        return await reader.readexactly(length)
+
+    body = await reader.read(-1 if limit is None else limit + 1)
+    if limit is not None and len(body) > limit:
+        raise HttpError("response larger than {} bytes".format(limit))
+    return body
+
+
+async def fetch(url, limit=None, redirects=3, sink=None, on_headers=None, method="GET"):
+    """
+    GET url with a plain HTTP/1.1 request and return a Response.
+    method "HEAD" reads the headers only.
+
+    Only the standard library is used so the app needs no extra dependency.
+    Redirects are followed. When sink is given, the body is passed to
+    sink(chunk) as it arrives instead of being kept in memory.
+    on_headers(status, headers) is called before the body is read.
+    """
+    start = time.monotonic()
+    for _ in range(redirects + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise HttpError("unsupported url " + url)
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        context = None
+        if https:
+            import ssl
+
+            context = ssl.create_default_context()
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=context)
+        try:
+            request = (
+                "{} {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\n"
+                "Accept-Encoding: identity\r\nConnection: close\r\n\r\n"
+            ).format(method, path, parts.netloc, USER_AGENT)
+            writer.write(request.encode("ascii"))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            first_byte = time.monotonic() - start
+            fields = status_line.decode("latin-1").split(" ", 2)
+            if len(fields) < 2 or not fields[1].isdigit():
+                raise HttpError("bad status line from " + url)
+            status = int(fields[1])
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if status in (301, 302, 303, 307, 308) and "location" in headers:
+                url = urljoin(url, headers["location"])
+                continue
+
+            if on_headers is not None:
+                on_headers(status, headers)
+            if method == "HEAD":
+                body = b""
+            elif sink is None:
+                body = await _read_body(reader, headers, limit)
+            else:
+                body = b""
+                await _stream_body(reader, headers, sink)
+            return Response(status, headers, body, first_byte, time.monotonic() - start)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    raise HttpError("too many redirects for " + url)
+
+
+async def _stream_body(reader, headers, sink, chunk_size=1 << 16):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            line = await reader.readline()
+            length = int(line.split(b";")[0].strip() or b"0", 16)
+            if length == 0:
+                await reader.readline()
+                return
+            sink(await reader.readexactly(length))
+            await reader.readline()
+
+    remaining = int(headers["content-length"]) if "content-length" in headers else None
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = await reader.read(size)
+        if not chunk:
+            if remaining:
+                raise HttpError("connection closed before the end of the body")
+            return
+        sink(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+
+
+def server_url(server, repo, arch, filename):
+    return (
+        server.replace("$repo", repo).replace("$arch", arch).rstrip("/")
+        + "/"
+        + filename
+    )
+
+
+class Result:
+    def __init__(
+        self, server, latency=None, throughput=0.0, size=0, elapsed=None, error=None
+    ):
+        self.server = server
+        self.latency = latency
+        # bytes per second for the probe file
+        self.throughput = throughput
+        self.size = size
+        # seconds for the whole probe file - the number we rank on
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if not self.ok:
+            return "<Result {} failed: {}>".format(self.server, self.error)
+        return "<Result {} {:.0f} ms {:.0f} KiB/s>".format(
+            self.server, self.latency * 1000, self.throughput / 1024
+        )
+
+
+async def probe_latency(server, semaphore, timeout):
+    # the time until the headers of the probe file came - connect included
+    url = server_url(server, probe_repo, probe_arch, probe_file)
+    async with semaphore:
+        try:
+            response = await asyncio.wait_for(fetch(url, method="HEAD"), timeout)
+        except asyncio.TimeoutError:
+            return Result(server, error="timeout")
+        except Exception as error:
+            return Result(server, error=str(error) or type(error).__name__)
+    if response.status != 200:
+        return Result(server, error="HTTP {}".format(response.status))
+    return Result(server, response.first_byte)
+
+
+async def probe(server, semaphore, timeout, limit):
+    url = server_url(server, probe_repo, probe_arch, probe_file)
+    async with semaphore:
+        try:
+            response = await asyncio.wait_for(fetch(url, limit=limit), timeout)
+        except asyncio.TimeoutError:
+            return Result(server, error="timeout")
+        except Exception as error:
+            return Result(server, error=str(error) or type(error).__name__)
+
+    if response.status != 200:
+        return Result(server, error="HTTP {}".format(response.status))
+    size = len(response.body)
+    transfer = max(response.elapsed - response.first_byte, 1e-6)
+    return Result(
+        server, response.first_byte, size / transfer, size, response.elapsed
+    )
+
+
+async def rank_async(servers, concurrency=None, timeout=10.0, limit=16 << 20, top=None):
+    semaphore = asyncio.Semaphore(latency_concurrency)
+    answers = await asyncio.gather(
+        *(probe_latency(server, semaphore, min(timeout, latency_timeout)) for server in servers)
+    )
+    failed = [result for result in answers if not result.ok]
+    quickest = sorted((result for result in answers if result.ok), key=lambda r: r.latency)
+    quickest = quickest[: top or finalists]
+
+    semaphore = asyncio.Semaphore(concurrency or download_concurrency)
+    results = await asyncio.gather(
+        *(probe(result.server, semaphore, timeout, limit) for result in quickest)
+    )
+    good = [result for result in results if result.ok]
+    # latency and throughput both count - rank on the time the file took
+    good.sort(key=lambda result: result.elapsed)
+    return good, failed + [result for result in results if not result.ok]
+
+
+def rank(servers, concurrency=None, timeout=10.0, top=None):
+    """
+    Ask all servers for the headers of the probe file, then let the top
+    quickest download it - at most concurrency at a time. Returns
+    (working results fastest first, failed results).
+    """
+    return asyncio.run(rank_async(servers, concurrency, timeout, top=top))
+
+
+def read_servers(path, include_disabled=True):
+    # every "Server =" line, commented out or not, in file order
+    servers = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = SERVER.match(line)
+                if match and (include_disabled or not match.group(1)):
+                    servers.append(match.group(2))
+    except FileNotFoundError:
+        pass
+    return servers
+
+
+def candidate_servers(files=None, https_only=False, limit=None):
+    """
+    The mirrors to rank - the enabled ones of files and the defaults first,
+    then the commented out ones, at most limit of them.
+    """
+    files = files or candidate_files
+    enabled = [server for path in files for server in read_servers(path, include_disabled=False)]
+    others = [server for path in files for server in read_servers(path)]
+    servers = []
+    seen = set()
+    for server in enabled + default_servers + others:
+        if server in seen or (https_only and not server.startswith("https://")):
+            continue
+        seen.add(server)
+        servers.append(server)
+    return servers[: limit or max_candidates]
+
+
+def write_mirrorlist(results, path=mirrorlist):
+    lines = [
+        "##\n",
+        "## Arch Linux repository mirrorlist\n",
+        "## Ranked by the ArcoLinux App on {}\n".format(
+            datetime.now().strftime("%Y-%m-%d %H:%M")
+        ),
+        "##\n\n",
+    ]
+    for result in results:
+        lines.append(
+            "# {:.0f} ms - {:.0f} KiB/s\n".format(
+                result.latency * 1000, result.throughput / 1024
+            )
+        )
+        lines.append("Server = " + result.server + "\n")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".mirrorlist.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def rank_mirrors(
+    count=10, servers=None, path=mirrorlist, concurrency=None, timeout=10.0, https_only=False
+):
+    """
+    Rank the candidate mirrors and write the fastest count to path.
+    Returns the written results - an empty list leaves path untouched.
+    """
+    servers = servers or candidate_servers(https_only=https_only)
+    logging.info(
+        "Ranking %d mirrors - the %d quickest to answer download %s",
+        len(servers),
+        max(finalists, count),
+        probe_file,
+    )
+    good, failed = rank(servers, concurrency, timeout, top=max(finalists, count))
+    logging.info("%d mirrors answered - %d failed", len(good), len(failed))
+    best = good[:count]
+    if best:
+        write_mirrorlist(best, path)
+    return best
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Model of a pacman.conf - read once, edit in memory, write once
+# Every line is kept as it is, so comments, blank lines and the order of
+# the sections survive an edit untouched
+
+import os
+import re
+import tempfile
+
+HEADER = re.compile(r"^\s*(#\s*)?\[([^\]]+)\]\s*$")
+DIRECTIVE = re.compile(r"^\s*([A-Za-z]+)\s*(?:=\s*(.*?))?\s*$")
+COMMENTED_DIRECTIVE = re.compile(r"^\s*#\s*([A-Za-z]+)\s*=\s*(.*?)\s*$")
+
+
+class PacmanConf:
+    """
+    A pacman.conf as a list of lines plus an index of its sections.
+
+    Sections are "[name]" headers, disabled sections are "#[name]" headers
+    like the testing repos in the default Arch Linux pacman.conf. Looking up
+    a section is a dictionary lookup; the index is rebuilt after each edit.
+    """
+
+    def __init__(self, lines=None, path=None):
+        self.path = path
+        self.lines = list(lines or [])
+        if self.lines and not self.lines[-1].endswith("\n"):
+            self.lines[-1] += "\n"
+        self._reindex()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.readlines(), path)
+
+    def _reindex(self):
+        # name -> (line of the header, enabled)
+        self._sections = {}
+        self._order = []
+        for number, line in enumerate(self.lines):
+            match = HEADER.match(line)
+            if match is None:
+                continue
+            name = match.group(2).strip()
+            enabled = match.group(1) is None
+            current = self._sections.get(name)
+            # an enabled header wins over a commented one with the same name
+            if current is None or (enabled and not current[1]):
+                self._sections[name] = (number, enabled)
+            if current is None:
+                self._order.append(name)
+
+    # ---------------------------------------------------------------
+    # lookups
+    # ---------------------------------------------------------------
+
+    def has_section(self, name, include_disabled=True):
+        section = self._sections.get(name)
+        if section is None:
+            return False
+        return include_disabled or section[1]
+
+    def is_enabled(self, name):
+        section = self._sections.get(name)
+        return section is not None and section[1]
+
+    def sections(self):
+        # [(name, enabled)] in file order
+        return [(name, self._sections[name][1]) for name in self._order]
+
+    def _body(self, name):
+        # the header line and everything up to the next header
+        start = self._sections[name][0]
+        end = start + 1
+        while end < len(self.lines) and not HEADER.match(self.lines[end]):
+            end += 1
+        return start, end
+
+    def _span(self, name):
+        # the header line plus the directives and blank lines that follow it
+        # comments that are not directives stay - they describe what follows
+        start = self._sections[name][0]
+        end = start + 1
+        while end < len(self.lines):
+            line = self.lines[end]
+            if HEADER.match(line):
+                break
+            if line.strip() == "":
+                end += 1
+                continue
+            if line.lstrip().startswith("#"):
+                if COMMENTED_DIRECTIVE.match(line) is None:
+                    break
+            elif DIRECTIVE.match(line) is None:
+                break
+            end += 1
+        # keep one blank line between what is left above and below
+        while end > start + 1 and self.lines[end - 1].strip() == "":
+            end -= 1
+        if end == len(self.lines):
+            while start > 0 and self.lines[start - 1].strip() == "":
+                start -= 1
+        elif start == 0 or self.lines[start - 1].strip() == "":
+            while end < len(self.lines) and self.lines[end].strip() == "":
+                end += 1
+        return start, end
+
+    def get_values(self, name, key):
+        # values of key in an enabled section - Server and Include can repeat
+        if not self.is_enabled(name):
+            return []
+        start, end = self._body(name)
+        values = []
+        for line in self.lines[start + 1 : end]:
+            match = DIRECTIVE.match(line)
+            if match and match.group(1) == key:
+                values.append(match.group(2) or "")
+        return values
+
+    def get_value(self, name, key, default=None):
+        values = self.get_values(name, key)
+        return values[0] if values else default
+
+    # ---------------------------------------------------------------
+    # edits
+    # ---------------------------------------------------------------
+
+    @staticmethod
+    def format_section(name, directives, enabled=True):
+        prefix = "" if enabled else "#"
+        lines = [prefix + "[" + name + "]\n"]
+        for key, value in directives:
+            if value is None:
+                lines.append(prefix + key + "\n")
+            else:
+                lines.append(prefix + key + " = " + value + "\n")
+        return lines
+
+    def add_section(self, name, directives, enabled=True, before=None):
+        """
+        Add a section, at the end or in front of the section named before.
+
+        When before is given, the new section goes above the comments that
+        introduce that section. Returns False if the section already exists.
+        """
+        if self.has_section(name):
+            return False
+
+        block = self.format_section(name, directives, enabled)
+        if before is not None and self.has_section(before):
+            position = self._sections[before][0]
+            # step over the comment paragraph that introduces that section
+            above = position
+            while above > 0 and self.lines[above - 1].strip() == "":
+                above -= 1
+            if self._is_comment(above - 1):
+                while self._is_comment(above - 1):
+                    above -= 1
+                position = above
+            self.lines[position:position] = block + ["\n"]
+        else:
+            if self.lines and self.lines[-1].strip() != "":
+                self.lines.append("\n")
+            self.lines.extend(block)
+        self._reindex()
+        return True
+
+    def _is_comment(self, number):
+        if number < 0:
+            return False
+        line = self.lines[number]
+        return (
+            line.lstrip().startswith("#")
+            and HEADER.match(line) is None
+            and COMMENTED_DIRECTIVE.match(line) is None
+        )
+
+    def remove_section(self, name):
+        if not self.has_section(name):
+            return False
+        start, end = self._span(name)
+        del self.lines[start:end]
+        self._reindex()
+        return True
+
+    def set_enabled(self, name, enabled):
+        # comment or uncomment the header and its directives
+        if not self.has_section(name) or self.is_enabled(name) == enabled:
+            return False
+        start, end = self._span(name)
+        for number in range(start, end):
+            line = self.lines[number]
+            if line.strip() == "":
+                continue
+            if enabled:
+                self.lines[number] = re.sub(r"^(\s*)#\s*", r"\1", line, count=1)
+            else:
+                self.lines[number] = "#" + line
+        self._reindex()
+        return True
+
+    def set_value(self, name, key, value):
+        # replace the first key in an enabled section or add it after the header
+        if not self.is_enabled(name):
+            return False
+        start, end = self._body(name)
+        line = key + " = " + value + "\n"
+        for number in range(start + 1, end):
+            match = DIRECTIVE.match(self.lines[number])
+            if match and match.group(1) == key:
+                self.lines[number] = line
+                return True
+        self.lines.insert(start + 1, line)
+        self._reindex()
+        return True
+
+    # ---------------------------------------------------------------
+    # writing
+    # ---------------------------------------------------------------
+
+    def text(self):
+        return "".join(self.lines)
+
+    def save(self, path=None):
+        """
+        Write the file atomically - a temporary file next to the target is
+        renamed over it, so pacman never sees a half written pacman.conf.
+        """
+        path = path or self.path
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o644
+
+        fd, tmp = tempfile.mkstemp(prefix=".pacman.conf.", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.text())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.path = path
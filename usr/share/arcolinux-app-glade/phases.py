@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Where the time of a build went - the output of mkarchiso, pacman and the
+# build scripts is matched line by line against the patterns below and cut
+# into phases. A phase runs until the next one starts, a phase that comes
+# back - pacman downloads for more than one transaction - adds up
+# The breakdown is kept with the build, see fingerprint.record_success, and
+# compared with the one of the previous build of the same flavor
+
+import logging
+import re
+import threading
+import time
+
+# the first pattern that matches a line starts its phase
+PATTERNS = [
+    # pacman - also inside pacstrap
+    ("download", re.compile(r"^:: Retrieving packages")),
+    ("download", re.compile(r"^\s*downloading \S+\.db\b|^:: Synchronizing package databases")),
+    ("install", re.compile(r"^:: Processing package changes|^\(\s*\d+/\d+\) installing ")),
+    ("hooks", re.compile(r"^:: Running post-transaction hooks")),
+    # mkinitcpio as a pacman hook or on its own
+    ("mkinitcpio", re.compile(r"^==> (Starting build|Building image from preset)")),
+    # mkarchiso
+    ("airootfs", re.compile(r"^\[mkarchiso\] INFO: Copying custom airootfs files")),
+    ("install", re.compile(r"^\[mkarchiso\] INFO: Installing packages to")),
+    ("customize", re.compile(r"^\[mkarchiso\] INFO: Running customize_airootfs\.sh")),
+    ("boot", re.compile(r"^\[mkarchiso\] INFO: (Setting up|Preparing|Creating (a )?FAT image)")),
+    ("squashfs", re.compile(r"^\[mkarchiso\] INFO: Creating (a|an) (squashfs|erofs|ext4)")),
+    ("squashfs", re.compile(r"^Parallel mksquashfs")),
+    ("iso", re.compile(r"^\[mkarchiso\] INFO: Creating ISO image|^xorriso \d")),
+    ("checksum", re.compile(r"^\[mkarchiso\] INFO: Creating checksum file")),
+    # the ArcoLinux build scripts - "Phase 3 :"
+    ("script-phase-{}", re.compile(r"^Phase (\d+)\s*:")),
+]
+
+# the steps of builds.build that are phases of their own
+STEPS = ("prepare", "checkout", "resolve", "prefetch", "build", "move", "checksums", "delta")
+
+# a phase is a regression when it took this much longer than last time
+regression_ratio = 1.25
+regression_seconds = 30.0
+
+ESCAPES = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b\(B")
+
+
+def classify(line):
+    # the phase line starts - or None
+    line = ESCAPES.sub("", line).strip()
+    if not line:
+        return None
+    for phase, pattern in PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return phase.format(*match.groups()) if "{}" in phase else phase
+    return None
+
+
+class Tracker:
+    """
+    The phases of one build. enter(phase) starts a phase, feed(name, lines)
+    - a listener of buildlog.BuildLog - starts the phases the output shows.
+    Build threads and log followers call in, so it takes a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None
+        self.since = None
+        # phase -> seconds, in the order the phases first came
+        self.seconds = {}
+        # (phase, start, end) in wall clock seconds
+        self.spans = []
+
+    def enter(self, phase, now=None):
+        with self.lock:
+            self._enter(phase, now or time.time())
+
+    def _enter(self, phase, now):
+        if phase == self.current:
+            return
+        if self.current is not None:
+            # phase None ends the last one - see finish()
+            self.seconds[self.current] = self.seconds.get(self.current, 0.0) + now - self.since
+            self.spans.append((self.current, self.since, now))
+        self.current = phase
+        self.since = now
+
+    def feed(self, name, lines):
+        now = time.time()
+        with self.lock:
+            for line in lines:
+                phase = classify(line)
+                if phase is not None:
+                    self._enter(phase, now)
+
+    def finish(self):
+        # end the phase that runs - returns {phase: seconds}
+        with self.lock:
+            if self.current is not None:
+                self._enter(None, time.time())
+            return {phase: round(seconds, 1) for phase, seconds in self.seconds.items()}
+
+    def timeline(self):
+        # every stretch of every phase with its start and end
+        with self.lock:
+            return [
+                {"phase": phase, "start": round(start, 1), "end": round(end, 1)}
+                for phase, start, end in self.spans
+            ]
+
+
+def compare(current, previous, ratio=None, seconds=None):
+    """
+    The phases of current that took more than ratio times as long as in
+    previous and at least seconds more - as dicts, the largest first.
+    """
+    ratio = regression_ratio if ratio is None else ratio
+    seconds = regression_seconds if seconds is None else seconds
+    regressions = []
+    for phase, now in current.items():
+        before = (previous or {}).get(phase)
+        if before is None:
+            continue
+        if now > before * ratio and now - before >= seconds:
+            regressions.append(
+                {
+                    "phase": phase,
+                    "seconds": now,
+                    "previous": before,
+                    "change": round(now / before, 2) if before else None,
+                }
+            )
+    regressions.sort(key=lambda item: item["seconds"] - item["previous"], reverse=True)
+    return regressions
+
+
+def summary(durations):
+    # one line for the log - "download 120 s, install 300 s, ..."
+    return ", ".join("{} {:.0f} s".format(phase, value) for phase, value in durations.items())
+
+
+def log_regressions(name, regressions):
+    for item in regressions:
+        logging.warning(
+            "The %s phase of the %s build took %.0f s - %.0f s the last time",
+            item["phase"],
+            name,
+            item["seconds"],
+            item["previous"],
+        )
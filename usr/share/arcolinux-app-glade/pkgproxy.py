@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# A caching package proxy for the machines on the LAN that build the same isos
+# pacman asks it for $repo/os/$arch/<file> - it answers from its store and
+# fetches what it does not have once from the upstream mirrors
+# Requests for a file that is being fetched wait for that one fetch and get
+# the bytes as they come in
+
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote, urlsplit
+
+import mirrors
+
+store_dir = "/var/cache/arcolinux-app-glade/proxy"
+default_port = 7878
+# least recently used files go when the store grows beyond this
+max_bytes = 50 << 30
+# the repo databases change - they are fetched again after this many seconds
+db_ttl = 60
+# no byte from upstream for this long and the fetch is given up
+idle_timeout = 30.0
+
+DB_SUFFIXES = (".db", ".db.sig", ".files", ".files.sig")
+NAME = r"[A-Za-z0-9@._+:-]+"
+REQUEST_PATH = re.compile(r"^/({0})/os/({0})/({0})$".format(NAME))
+MARKER = "## Package proxy of the ArcoLinux App"
+RANGE = re.compile(r"^bytes=(\d+)-(\d*)$")
+REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    502: "Bad Gateway",
+}
+
+
+class Download:
+    # one upstream fetch - every request for the same file follows it
+    def __init__(self, path):
+        self.path = path
+        self.tmp = None
+        self.status = None
+        self.length = None
+        self.modified = None
+        self.written = 0
+        self.done = False
+        self.error = None
+        self.active = time.monotonic()
+        self.task = None
+        self.pulse = asyncio.get_running_loop().create_future()
+
+    def changed(self):
+        # wake up everyone that waits for more bytes or the end
+        self.active = time.monotonic()
+        if not self.pulse.done():
+            self.pulse.set_result(None)
+        self.pulse = asyncio.get_running_loop().create_future()
+
+    async def wait(self):
+        await asyncio.shield(self.pulse)
+
+
+class PackageProxy:
+    """
+    Serves $repo/os/$arch/<file> from store and fetches misses from the
+    upstreams - mirror urls like the ones in the mirrorlist - in order.
+
+    The store is a plain folder tree, so a restarted proxy keeps its cache.
+    """
+
+    def __init__(self, upstreams, store=store_dir, max_bytes=max_bytes, db_ttl=db_ttl):
+        self.upstreams = list(upstreams)
+        self.store = store
+        self.max_bytes = max_bytes
+        self.db_ttl = db_ttl
+        # path -> size, least recently used first
+        self.entries = OrderedDict()
+        self.total = 0
+        self.downloads = {}
+        self.server = None
+        self.stats = {"hits": 0, "misses": 0, "joined": 0, "evicted": 0, "errors": 0}
+
+    # ---------------------------------------------------------------
+    # the store
+    # ---------------------------------------------------------------
+
+    def scan(self):
+        # what an earlier run left in the store - oldest access first
+        found = []
+        for root, dirs, files in os.walk(self.store):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".part"):
+                    # a fetch that never finished
+                    os.unlink(path)
+                    continue
+                info = os.stat(path)
+                found.append((info.st_atime, path, info.st_size))
+        found.sort()
+        self.entries = OrderedDict((path, size) for _, path, size in found)
+        self.total = sum(self.entries.values())
+        logging.info(
+            "Package proxy store %s : %d files, %.2f GiB",
+            self.store,
+            len(self.entries),
+            self.total / (1 << 30),
+        )
+
+    def _fresh(self, path, name):
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if name.endswith(DB_SUFFIXES):
+            # the mtime is the Last-Modified of upstream - the ctime is when
+            # we fetched it
+            return time.time() - info.st_ctime < self.db_ttl
+        # packages never change under the same name
+        return True
+
+    def _touch(self, path, size=None):
+        if size is None:
+            size = self.entries.get(path, 0)
+        self.total += size - self.entries.get(path, 0)
+        self.entries[path] = size
+        self.entries.move_to_end(path)
+
+    def _evict(self):
+        while self.total > self.max_bytes and self.entries:
+            path, size = self.entries.popitem(last=False)
+            self.total -= size
+            try:
+                # a request that is still sending it keeps its open file
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.stats["evicted"] += 1
+            logging.info("Evicted %s from the package proxy", path)
+
+    # ---------------------------------------------------------------
+    # fetching
+    # ---------------------------------------------------------------
+
+    async def _fetch(self, download, repo, arch, name):
+        directory = os.path.dirname(download.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, download.tmp = tempfile.mkstemp(prefix="." + name + ".", suffix=".part", dir=directory)
+        out = os.fdopen(fd, "wb")
+        last_status = None
+        try:
+            for server in self.upstreams:
+                url = mirrors.server_url(server, repo, arch, name)
+                state = {}
+
+                def on_headers(status, headers):
+                    state["status"] = status
+                    if status == 200:
+                        # from here on clients get these bytes - no other upstream
+                        download.status = 200
+                        if "content-length" in headers:
+                            download.length = int(headers["content-length"])
+                        download.modified = headers.get("last-modified")
+                        download.changed()
+
+                def sink(chunk):
+                    if state.get("status") != 200:
+                        return
+                    out.write(chunk)
+                    out.flush()
+                    download.written += len(chunk)
+                    download.changed()
+
+                task = asyncio.ensure_future(mirrors.fetch(url, sink=sink, on_headers=on_headers))
+                try:
+                    while not task.done():
+                        await asyncio.wait({task}, timeout=idle_timeout)
+                        if not task.done() and time.monotonic() - download.active > idle_timeout:
+                            task.cancel()
+                            raise asyncio.TimeoutError("no data from " + url)
+                    task.result()
+                except Exception as error:
+                    if download.status == 200:
+                        # clients already got part of it - nothing to fall back to
+                        raise
+                    logging.warning("Package proxy: %s failed : %s", url, error or type(error).__name__)
+                    continue
+                if state.get("status") == 200:
+                    break
+                last_status = state.get("status")
+                logging.info("Package proxy: %s answered %s", url, last_status)
+
+            out.close()
+            if download.status != 200:
+                download.status = 404 if last_status == 404 else 502
+                os.unlink(download.tmp)
+                return
+
+            if download.length is not None and download.written != download.length:
+                raise mirrors.HttpError("short body for " + name)
+            if download.modified:
+                try:
+                    stamp = parsedate_to_datetime(download.modified).timestamp()
+                    os.utime(download.tmp, (stamp, stamp))
+                except (TypeError, ValueError, OverflowError):
+                    pass
+            os.chmod(download.tmp, 0o644)
+            os.replace(download.tmp, download.path)
+            download.tmp = download.path
+            self._touch(download.path, download.written)
+            self._evict()
+            logging.info("Package proxy fetched %s (%d bytes)", name, download.written)
+        except Exception as error:
+            download.error = error
+            self.stats["errors"] += 1
+            logging.error("Package proxy could not fetch %s : %s", name, error)
+            if not out.closed:
+                out.close()
+            if download.tmp != download.path and os.path.exists(download.tmp):
+                os.unlink(download.tmp)
+            if download.status is None:
+                download.status = 502
+        finally:
+            download.done = True
+            self.downloads.pop(download.path, None)
+            download.changed()
+
+    # ---------------------------------------------------------------
+    # serving
+    # ---------------------------------------------------------------
+
+    @staticmethod
+    def _head(writer, status, headers=()):
+        lines = ["HTTP/1.1 {} {}".format(status, REASONS[status])]
+        lines.extend("{}: {}".format(key, value) for key, value in headers)
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_stored(self, writer, method, path, request):
+        with open(path, "rb") as f:
+            info = os.fstat(f.fileno())
+            size = info.st_size
+            headers = [
+                ("Content-Type", "application/octet-stream"),
+                ("Last-Modified", formatdate(info.st_mtime, usegmt=True)),
+                ("Accept-Ranges", "bytes"),
+            ]
+
+            since = request.get("if-modified-since")
+            if since:
+                try:
+                    if int(info.st_mtime) <= parsedate_to_datetime(since).timestamp():
+                        self._head(writer, 304, headers)
+                        return
+                except (TypeError, ValueError, OverflowError):
+                    pass
+
+            start, end, status = 0, size - 1, 200
+            match = RANGE.match(request.get("range", ""))
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                # past the end or backwards - nothing of the file to send
+                if start >= size or end < start:
+                    self._head(writer, 416, [("Content-Range", "bytes */{}".format(size))])
+                    return
+                status = 206
+                headers.append(("Content-Range", "bytes {}-{}/{}".format(start, end, size)))
+            length = end - start + 1
+            headers.append(("Content-Length", str(length)))
+            self._head(writer, status, headers)
+            if method == "HEAD" or length <= 0:
+                return
+            await writer.drain()
+            # sendfile where the kernel can - no copy through python
+            await asyncio.get_running_loop().sendfile(writer.transport, f, start, length)
+
+    async def _send_download(self, writer, method, download, request):
+        while download.status is None and not download.done:
+            await download.wait()
+        if download.status != 200:
+            self._head(writer, download.status)
+            return
+        if request.get("range") or request.get("if-modified-since") or method == "HEAD":
+            # the rare cases - wait for the whole file
+            while not download.done:
+                await download.wait()
+            if download.error is not None:
+                self._head(writer, 502)
+                return
+            await self._send_stored(writer, method, download.path, request)
+            return
+
+        headers = [("Content-Type", "application/octet-stream")]
+        if download.length is not None:
+            headers.append(("Content-Length", str(download.length)))
+        if download.modified:
+            headers.append(("Last-Modified", download.modified))
+        self._head(writer, 200, headers)
+        with open(download.tmp, "rb") as f:
+            offset = 0
+            while True:
+                if offset < download.written:
+                    chunk = f.read(download.written - offset)
+                    offset += len(chunk)
+                    writer.write(chunk)
+                    await writer.drain()
+                    continue
+                if download.done:
+                    break
+                await download.wait()
+        if download.error is not None:
+            # cut the connection - the client must not take a short file
+            writer.transport.abort()
+
+    async def serve_file(self, writer, method, repo, arch, name, request):
+        path = os.path.join(self.store, repo, arch, name)
+        if path not in self.downloads and self._fresh(path, name):
+            self.stats["hits"] += 1
+            self._touch(path, os.path.getsize(path))
+            await self._send_stored(writer, method, path, request)
+            return
+
+        download = self.downloads.get(path)
+        if download is None:
+            self.stats["misses"] += 1
+            download = Download(path)
+            self.downloads[path] = download
+            download.task = asyncio.ensure_future(self._fetch(download, repo, arch, name))
+        else:
+            self.stats["joined"] += 1
+        await self._send_download(writer, method, download, request)
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            request = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                request[key.strip().lower()] = value.strip()
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3:
+                self._head(writer, 400)
+                return
+            method, target = parts[0], parts[1]
+            if method not in ("GET", "HEAD"):
+                self._head(writer, 405, [("Allow", "GET, HEAD")])
+                return
+            match = REQUEST_PATH.match(unquote(urlsplit(target).path))
+            if not match or any(part in (".", "..") for part in match.groups()):
+                self._head(writer, 404)
+                return
+            logging.debug("Package proxy: %s %s", method, target)
+            await self.serve_file(writer, method, *match.groups(), request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as error:
+            logging.error("Package proxy: %s", error)
+        finally:
+            try:
+                if not writer.transport.is_closing():
+                    await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (Exception, asyncio.CancelledError):
+                pass
+
+    async def start(self, host="0.0.0.0", port=default_port):
+        os.makedirs(self.store, exist_ok=True)
+        self.scan()
+        self.server = await asyncio.start_server(self.handle, host, port)
+        logging.info(
+            "Package proxy on %s:%d - upstream %s",
+            host,
+            port,
+            ", ".join(self.upstreams) or "none",
+        )
+        return self.server
+
+    async def serve(self, host="0.0.0.0", port=default_port):
+        await self.start(host, port)
+        async with self.server:
+            await self.server.serve_forever()
+
+
+def proxy_server(url):
+    # the mirrorlist line for a proxy at url, like http://buildhost:7878
+    return url.rstrip("/") + "/$repo/os/$arch"
+
+
+def upstream_servers(path=mirrors.mirrorlist, exclude=()):
+    """
+    The enabled servers of the mirrorlist - without the proxies in exclude,
+    a proxy must not fetch from itself. Falls back to the default servers.
+    """
+    excluded = [proxy_server(url) for url in exclude]
+    servers = [
+        server
+        for server in mirrors.read_servers(path, include_disabled=False)
+        if server not in excluded
+    ]
+    return servers or list(mirrors.default_servers)
+
+
+def _write_lines(path, lines):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".mirrorlist.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _without_proxy(lines, server):
+    # lines without the proxy block - the blank line under it goes as well
+    kept = [line for line in lines if line.strip() not in ("Server = " + server, MARKER)]
+    if kept and not kept[0].strip() and len(kept) < len(lines):
+        kept.pop(0)
+    return kept
+
+
+def point_mirrorlist(url, path=mirrors.mirrorlist):
+    """
+    Put the proxy at url on top of the mirrorlist. The other servers stay
+    below it - pacman falls back to them when the proxy is not there.
+    """
+    server = proxy_server(url)
+    with open(path, "r", encoding="utf-8") as f:
+        # pointing twice leaves one block
+        lines = _without_proxy(f.readlines(), server)
+    lines[0:0] = [
+        MARKER + "\n",
+        "Server = " + server + "\n",
+        "\n",
+    ]
+    _write_lines(path, lines)
+    logging.info("%s now starts with %s", path, server)
+
+
+def unpoint_mirrorlist(url, path=mirrors.mirrorlist):
+    # take the proxy at url out of the mirrorlist again
+    server = proxy_server(url)
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    _write_lines(path, _without_proxy(lines, server))
+    logging.info("Removed %s from %s", server, path)
+
+
+def serve(upstreams=None, store=store_dir, host="0.0.0.0", port=default_port, size=max_bytes):
+    # run the proxy until it is interrupted
+    if upstreams is None:
+        upstreams = upstream_servers(
+            exclude=["http://127.0.0.1:{}".format(port), "http://localhost:{}".format(port)]
+        )
+    proxy = PackageProxy(upstreams, store=store, max_bytes=size)
+    try:
+        asyncio.run(proxy.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info("Package proxy stopped : %s", proxy.stats)
+    return proxy
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Download the packages of an archiso profile before mkarchiso runs
+# pacman resolves the package list of the profile against its own repos in a
+# private database folder - the host database is not touched - and we
+# download what the cache does not have yet, a few files at a time
+# Every file is checked against the sha256 of the repo database
+# mkarchiso then finds everything in the shared cache
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+
+import core
+import mirrors
+import pacman_conf as pconf
+
+# files downloaded at the same time
+concurrency = 4
+# seconds without a byte from a server before the next one is tried
+idle_timeout = 30.0
+
+packages_file = "packages.x86_64"
+
+
+class PrefetchError(Exception):
+    pass
+
+
+class Package:
+    # one file to have in the cache - sha256 and size from the repo database
+    def __init__(self, name, repo, filename, urls, sha256=None, size=None):
+        self.name = name
+        self.repo = repo
+        self.filename = filename
+        self.urls = list(urls)
+        self.sha256 = sha256
+        self.size = size
+        # the path when a cache folder has it already
+        self.cached = None
+
+
+class Result:
+    def __init__(self):
+        self.reused = []
+        self.fetched = []
+        self.failed = []
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "reused": len(self.reused),
+            "fetched": len(self.fetched),
+            "failed": len(self.failed),
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 1),
+        }
+
+
+def _pacman(config, dbpath, *args):
+    return subprocess.run(
+        ["pacman", "--config", config, "--dbpath", dbpath, "--noconfirm"] + list(args),
+        shell=False,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def sync_databases(config, dbpath):
+    # pacman -Sy into dbpath - an empty local database, so -Sp below
+    # resolves everything a fresh iso root needs
+    os.makedirs(os.path.join(dbpath, "local"), exist_ok=True)
+    result = _pacman(config, dbpath, "-Sy")
+    if result.returncode != 0:
+        raise PrefetchError("pacman -Sy failed : " + result.stdout.strip())
+
+
+def resolve(config, dbpath, packages):
+    """
+    The packages and all their dependencies as (repo, name, url) - in the
+    order pacman would install them. Names pacman does not know are left
+    out, like install_packages in core does.
+    """
+    todo = list(packages)
+    while todo:
+        result = _pacman(config, dbpath, "-Sp", "--print-format", "%r %n %l", "--", *todo)
+        if result.returncode == 0:
+            break
+        unknown = [
+            line.rsplit(":", 1)[1].strip()
+            for line in result.stdout.splitlines()
+            if "target not found:" in line
+        ]
+        unknown = [name for name in unknown if name in todo]
+        if not unknown:
+            raise PrefetchError("pacman -Sp failed : " + result.stdout.strip())
+        for name in unknown:
+            logging.warning("Package not found in the repositories: %s", name)
+        todo = [name for name in todo if name not in unknown]
+    else:
+        return []
+
+    resolved = []
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and "://" in fields[2]:
+            resolved.append(tuple(fields))
+    return resolved
+
+
+def read_sync_db(path):
+    """
+    {filename: (sha256, size)} from a repo database. The databases of the
+    Arch repos are gzip tar files - a format tarfile can not open gives an
+    empty dict and those packages are only checked on their size by pacman.
+    """
+    found = {}
+    try:
+        with tarfile.open(path, "r:*") as db:
+            for member in db:
+                if not member.isfile() or not member.name.endswith("/desc"):
+                    continue
+                fields = {}
+                key = None
+                for line in db.extractfile(member).read().decode("utf-8", "replace").splitlines():
+                    if line.startswith("%") and line.endswith("%"):
+                        key = line
+                    elif line and key and key not in fields:
+                        fields[key] = line
+                if "%FILENAME%" in fields:
+                    size = fields.get("%CSIZE%")
+                    found[fields["%FILENAME%"]] = (
+                        fields.get("%SHA256SUM%"),
+                        int(size) if size and size.isdigit() else None,
+                    )
+    except (OSError, tarfile.TarError) as error:
+        logging.warning("Can not read %s : %s", path, error)
+    return found
+
+
+def repo_servers(conf, repo):
+    # the Server urls of repo - from the section and the files it includes
+    arch = conf.get_value("options", "Architecture", "auto")
+    if arch == "auto":
+        arch = os.uname().machine
+    servers = list(conf.get_values(repo, "Server"))
+    for include in conf.get_values(repo, "Include"):
+        try:
+            servers.extend(mirrors.read_servers(include, include_disabled=False))
+        except OSError as error:
+            logging.warning("Can not read %s : %s", include, error)
+    return [server.replace("$repo", repo).replace("$arch", arch) for server in servers]
+
+
+def cache_dirs(conf):
+    # CacheDir of the profile - the first one is where we download to
+    dirs = []
+    for value in conf.get_values("options", "CacheDir"):
+        dirs.extend(value.split())
+    # without one pacman uses its default cache
+    return dirs or [core.pacman_cache]
+
+
+def _cached(package, dirs):
+    # a file of the right size counts - pacman checks it again when it installs
+    for directory in dirs:
+        path = os.path.join(directory, package.filename)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        if package.size is None or size == package.size:
+            return path
+    return None
+
+
+async def _fetch(package, target, semaphore, result):
+    async with semaphore:
+        for url in package.urls:
+            # builds side by side may fetch the same file - each into its own part
+            fd, part = tempfile.mkstemp(prefix="." + package.filename + ".", suffix=".part", dir=target)
+            digest = hashlib.sha256()
+            written = 0
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    state = {"active": time.monotonic()}
+
+                    def on_headers(status, headers):
+                        state["status"] = status
+                        state["active"] = time.monotonic()
+
+                    def sink(chunk):
+                        nonlocal written
+                        state["active"] = time.monotonic()
+                        if state.get("status") == 200:
+                            # hashed as it arrives - no second read of the file
+                            digest.update(chunk)
+                            out.write(chunk)
+                            written += len(chunk)
+
+                    # a server that stops answering is given up, not waited for
+                    task = asyncio.ensure_future(mirrors.fetch(url, sink=sink, on_headers=on_headers))
+                    while not task.done():
+                        await asyncio.wait({task}, timeout=idle_timeout)
+                        if not task.done() and time.monotonic() - state["active"] > idle_timeout:
+                            task.cancel()
+                            raise asyncio.TimeoutError("no data for {} seconds".format(idle_timeout))
+                    task.result()
+                if state.get("status") != 200:
+                    raise mirrors.HttpError("status {}".format(state.get("status")))
+                if package.size is not None and written != package.size:
+                    raise mirrors.HttpError(
+                        "{} bytes instead of {}".format(written, package.size)
+                    )
+                if package.sha256 and digest.hexdigest() != package.sha256:
+                    raise mirrors.HttpError("sha256 does not match the repo database")
+                os.chmod(part, 0o644)
+                os.replace(part, os.path.join(target, package.filename))
+                result.fetched.append(package.filename)
+                result.bytes += written
+                return
+            except Exception as error:
+                logging.warning(
+                    "Prefetch %s from %s failed : %s", package.filename, url, error or type(error).__name__
+                )
+                if os.path.exists(part):
+                    os.unlink(part)
+        result.failed.append(package.filename)
+
+
+async def _download(packages, target, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    result = Result()
+    todo = []
+    for package in packages:
+        if package.cached:
+            result.reused.append(package.filename)
+        else:
+            todo.append(package)
+    await asyncio.gather(*[_fetch(package, target, semaphore, result) for package in todo])
+    return result
+
+
+def download(packages, dirs, concurrency=concurrency):
+    """
+    Make sure every package is in one of the cache folders dirs - missing
+    ones are downloaded into the first one, concurrency at a time.
+    Returns a Result.
+    """
+    started = time.monotonic()
+    target = dirs[0]
+    os.makedirs(target, mode=0o755, exist_ok=True)
+    for package in packages:
+        package.cached = _cached(package, dirs)
+    result = asyncio.run(_download(packages, target, concurrency))
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def resolve_profile(profile):
+    """
+    Every package file the archiso profile installs, as Package - with the
+    urls of its repo, sha256 and size.
+    """
+    config = os.path.join(profile, "pacman.conf")
+    listing = os.path.join(profile, packages_file)
+    if not os.path.isfile(config) or not os.path.isfile(listing):
+        raise PrefetchError("{} has no pacman.conf or {}".format(profile, packages_file))
+
+    conf = pconf.PacmanConf.load(config)
+    dbpath = tempfile.mkdtemp(prefix="aag-prefetch-")
+    try:
+        sync_databases(config, dbpath)
+        resolved = resolve(config, dbpath, core.read_package_list(listing))
+
+        checksums = {}
+        servers = {}
+        packages = []
+        for repo, name, url in resolved:
+            if repo not in checksums:
+                checksums[repo] = read_sync_db(os.path.join(dbpath, "sync", repo + ".db"))
+                servers[repo] = repo_servers(conf, repo)
+            filename = url.rsplit("/", 1)[1]
+            # the url of pacman first, the other servers of the repo after it
+            others = [server.rstrip("/") + "/" + filename for server in servers[repo]]
+            urls = [url] + [other for other in others if other != url]
+            sha256, size = checksums[repo].get(filename, (None, None))
+            packages.append(Package(name, repo, filename, urls, sha256, size))
+        logging.info("%s needs %d packages", profile, len(packages))
+        return packages
+    finally:
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+def prefetch_profile(profile, concurrency=concurrency, packages=None):
+    """
+    Download the packages of the archiso profile into its cache - packages
+    from resolve_profile when the caller has them already.
+    Returns a Result - packages that failed are left to mkarchiso.
+    """
+    if packages is None:
+        packages = resolve_profile(profile)
+    conf = pconf.PacmanConf.load(os.path.join(profile, "pacman.conf"))
+    return download(packages, cache_dirs(conf), concurrency)
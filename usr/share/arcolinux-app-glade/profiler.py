@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Startup timeline - where does the time go before the window is usable
+# Start the app with --profile-startup or AAG_PROFILE_STARTUP=1
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+FLAG = "--profile-startup"
+ENV = "AAG_PROFILE_STARTUP"
+
+# imported first by the main module - this is as close to the start as we get
+STARTED = time.perf_counter()
+
+
+class StartupProfiler:
+    """
+    Records phases as (name, start, end) in seconds since STARTED.
+
+    Phases may overlap - the non-GUI work runs on a worker thread while the
+    main loop draws the window - so every phase has its own start and end.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self.lock = threading.Lock()
+
+    def record(self, name, start, end=None):
+        if not self.enabled:
+            return
+        end = time.perf_counter() if end is None else end
+        with self.lock:
+            self.phases.append((name, start - STARTED, end - STARTED))
+
+    def since_start(self, name):
+        # a phase that began when the process imported this module
+        self.record(name, STARTED)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def report(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        logging.info(
+            "---------------------------------------------------------------------------"
+        )
+        logging.info("Startup timeline (ms)      start      end   duration")
+        for name, start, end in phases:
+            logging.info(
+                "  %-22s %8.1f %8.1f %10.1f",
+                name,
+                start * 1000,
+                end * 1000,
+                (end - start) * 1000,
+            )
+        if phases:
+            logging.info(
+                "  %-22s %28.1f", "total", max(end for _, _, end in phases) * 1000
+            )
+        logging.info(
+            "---------------------------------------------------------------------------"
+        )
+
+
+def enabled():
+    return FLAG in sys.argv[1:] or os.environ.get(ENV, "") not in ("", "0")
+
+
+profiler = StartupProfiler(enabled())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# The ui files and the images live in one .gresource bundle
+# Gio maps the bundle into memory - one file, no scattered small reads
+# The bundle is made by make-resources.sh from arcolinux-app-glade.gresource.xml
+# Without a bundle - or with one older than the ui files - the files on disk are used
+
+import logging
+import os
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf, Gio, GLib, Gtk  # noqa
+
+base_dir = os.path.dirname(os.path.realpath(__file__))
+bundle = os.path.join(base_dir, "arcolinux-app-glade.gresource")
+prefix = "/org/arcolinux/app-glade"
+
+# a bundle older than one of these is out of date
+ui_files = [
+    "gGui.ui",
+    "pages/installing.ui",
+    "pages/scripting.ui",
+    "pages/history.ui",
+    "about.ui",
+    "logpane.ui",
+]
+
+_registered = None
+
+
+def _up_to_date():
+    try:
+        built = os.stat(bundle).st_mtime
+    except FileNotFoundError:
+        return False
+    for name in ui_files:
+        try:
+            if os.stat(os.path.join(base_dir, name)).st_mtime > built:
+                logging.warning("%s is older than %s - not using it", bundle, name)
+                return False
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def register():
+    # load and register the bundle once - returns True when it is in use
+    global _registered
+    if _registered is None:
+        _registered = False
+        if _up_to_date():
+            try:
+                Gio.Resource.load(bundle)._register()
+                _registered = True
+            except GLib.Error as error:
+                logging.warning("Could not load %s : %s", bundle, error.message)
+    return _registered
+
+
+def builder(name):
+    # a Gtk.Builder for one of the ui files - relative image paths in the
+    # ui file resolve inside the bundle as well as on disk
+    if register():
+        return Gtk.Builder.new_from_resource(prefix + "/" + name)
+    return Gtk.Builder.new_from_file(os.path.join(base_dir, name))
+
+
+def pixbuf(name):
+    # the images are stored at the size they are shown - no scaling here
+    if register():
+        return GdkPixbuf.Pixbuf.new_from_resource(prefix + "/" + name)
+    return GdkPixbuf.Pixbuf.new_from_file(os.path.join(base_dir, name))
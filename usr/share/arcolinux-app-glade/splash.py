@@ -5,12 +5,10 @@
 
 
 import gi
-import functions as fn
+import resources
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GdkPixbuf
-
-base_dir = fn.path.dirname(fn.path.realpath(__file__))
+from gi.repository import Gtk
 
 
 class splashScreen(Gtk.Window):
@@ -25,10 +23,8 @@ class splashScreen(Gtk.Window):
         self.add(main_vbox)
 
         self.image = Gtk.Image()
-        pimage = GdkPixbuf.Pixbuf().new_from_file_at_size(
-            base_dir + "/images/splash.png", 600, 400
-        )
-        self.image.set_from_pixbuf(pimage)
+        # stored at 600x400 in the resource bundle - nothing to scale
+        self.image.set_from_pixbuf(resources.pixbuf("images/splash.png"))
 
         main_vbox.pack_start(self.image, True, True, 0)
 
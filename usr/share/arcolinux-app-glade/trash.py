@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# ArcoLinux App - https://www.arcolinuxiso.com/arcolinux-app/
+# Copyright (C) 2023 EriK Dubois
+#
+# ArcoLinux App is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# ArcoLinux App is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Gufw; if not, see http://www.gnu.org/licenses for more
+# information.
+
+# Old build folders are renamed into a trash folder at start - that is
+# instant - and deleted later by a low priority thread in the background
+
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TRASH_NAME = ".arcolinux-app-glade-trash"
+
+# retention policy - trashed folders are kept this many hours ...
+# short - a trashed build folder is gigabytes nobody goes back to
+keep_hours = 1
+# ... unless the filesystem they are on has less free space than this
+min_free_bytes = 20 << 30
+
+# threads deleting the subfolders of one trashed folder at the same time
+workers = 4
+
+
+def trash_dir_for(path):
+    # next to the folder itself - so the rename never crosses a filesystem
+    parent = os.path.dirname(os.path.abspath(path).rstrip("/"))
+    return os.path.join(parent, TRASH_NAME)
+
+
+def move_to_trash(path):
+    """
+    Rename path into the trash folder next to it and return the new path.
+    Returns None when path does not exist or could not be renamed.
+    """
+    path = os.path.abspath(path).rstrip("/")
+    if not os.path.isdir(path) or os.path.islink(path):
+        return None
+
+    trash_dir = trash_dir_for(path)
+    target = os.path.join(
+        trash_dir, "{}-{}".format(int(time.time() * 1000), os.path.basename(path))
+    )
+    try:
+        os.makedirs(trash_dir, mode=0o700, exist_ok=True)
+        os.rename(path, target)
+        logging.info("Moved %s to the trash", path)
+        return target
+    except OSError as error:
+        logging.error("Could not move %s to the trash: %s", path, error)
+        return None
+
+
+def _stamp(name):
+    # the trash entries start with the time they were trashed in ms
+    head = name.split("-", 1)[0]
+    return int(head) / 1000 if head.isdigit() else 0
+
+
+def entries(trash_dirs):
+    # [(path, trashed at)] oldest first
+    found = []
+    for trash_dir in trash_dirs:
+        try:
+            with os.scandir(trash_dir) as items:
+                for item in items:
+                    found.append((item.path, _stamp(item.name)))
+        except FileNotFoundError:
+            continue
+    found.sort(key=lambda entry: entry[1])
+    return found
+
+
+def _old(stamp, now=None):
+    return (now or time.time()) - stamp >= keep_hours * 3600
+
+
+def _short_on_space(path):
+    try:
+        return shutil.disk_usage(os.path.dirname(path)).free < min_free_bytes
+    except OSError:
+        return False
+
+
+def expired(trash_dirs, now=None):
+    """
+    The trash entries the retention policy lets go for sure: older than
+    keep_hours. The others go - oldest first - while their filesystem is
+    short on space, see purge().
+    """
+    return [path for path, stamp in entries(trash_dirs) if _old(stamp, now)]
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove(path, pool):
+    # the subfolders of one trashed folder are deleted in parallel
+    try:
+        with os.scandir(path) as items:
+            children = [item.path for item in items]
+    except NotADirectoryError:
+        children = []
+    list(pool.map(_remove, children))
+    _remove(path)
+
+
+def _lower_priority():
+    # idle scheduling for this thread only - the desktop always goes first
+    # threads started from here inherit it
+    try:
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+
+def purge(trash_dirs, progress=None):
+    """
+    Delete the expired trash entries. progress(left, total) is called before
+    every entry and once more when all are gone.
+    """
+    _lower_priority()
+    candidates = entries(trash_dirs)
+    # the free space is looked at again after every removal - no need to
+    # walk a tree first to know what it gives back
+    selected = [path for path, stamp in candidates if _old(stamp) or _short_on_space(path)]
+    total = len(selected)
+    removed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aag-trash") as pool:
+        for path, stamp in candidates:
+            if not _old(stamp) and not _short_on_space(path):
+                continue
+            if progress is not None:
+                progress(max(total - removed, 1), total)
+            started = time.monotonic()
+            remove(path, pool)
+            removed += 1
+            logging.info("Removed %s in %.1f seconds", path, time.monotonic() - started)
+    if progress is not None:
+        progress(0, removed)
+    for trash_dir in trash_dirs:
+        try:
+            os.rmdir(trash_dir)
+        except OSError:
+            pass
+    return removed
+
+
+def start_purge(trash_dirs, progress=None):
+    # run purge() on a background thread and return the thread
+    thread = threading.Thread(
+        target=purge, args=(trash_dirs, progress), name="aag-trash", daemon=True
+    )
+    thread.start()
+    return thread